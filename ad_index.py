@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Index de déduplication des publicités Facebook Ads Library.
+
+Les publicités sont indexées par leur "ID dans la bibliothèque" / "Library ID"
+affiché sur la page. À défaut d'ID, une empreinte SHA-256 du texte de la
+carte sert de clé. Le coût d'un test de doublon est constant (dict/set),
+quelle que soit la taille du run.
+"""
+
+import hashlib
+import itertools
+import re
+from typing import Dict, Iterator, List, Optional
+
+
+LIBRARY_ID_PATTERN = re.compile(
+    r'(?:ID dans la biblioth[èe]que|Library ID)\s*:\s*(\d+)',
+    re.IGNORECASE
+)
+
+
+def extract_library_id(text: str) -> Optional[str]:
+    """Extrait le premier ID de bibliothèque présent dans un texte"""
+    if not text:
+        return None
+    match = LIBRARY_ID_PATTERN.search(text)
+    return match.group(1) if match else None
+
+
+def content_digest(text: str) -> str:
+    """Empreinte stable du contenu d'une carte (accents et emoji compris)"""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()[:32]
+
+
+class AdIndex:
+    """Index des publicités déjà vues, indexé par ID de bibliothèque"""
+
+    def __init__(self, ads: Optional[List[Dict]] = None, keep_ads: bool = True, compact: bool = False):
+        """
+        Args:
+            ads: Publicités à indexer
+            keep_ads: Conserver les publicités (sinon seules les clés sont gardées,
+                      par exemple quand elles sont écrites au fil de l'eau)
+            compact: Stocker les publicités en AdRecord (voir ad_record.py) ;
+                     ads() et l'itération renvoient des dicts reconstruits
+        """
+        self.keep_ads = keep_ads
+        self.compact = compact
+        self._ads: Dict[str, object] = {}
+        for ad in ads or []:
+            self.add(ad)
+
+    @staticmethod
+    def key_for(ad: Dict) -> str:
+        """
+        Clé de déduplication d'une publicité
+
+        Priorité : library_id, puis un ID numérique, puis ID extrait du texte,
+        et en dernier recours une empreinte du contenu.
+        """
+        library_id = ad.get("library_id")
+        if library_id:
+            return str(library_id)
+
+        ad_id = ad.get("id")
+        if ad_id and str(ad_id).isdigit():
+            return str(ad_id)
+
+        text = ad.get("full_text") or ad.get("full_section") or ""
+        library_id = extract_library_id(text)
+        if library_id:
+            return library_id
+
+        return ad_id or content_digest(text)
+
+    def add(self, ad: Dict) -> bool:
+        """Ajoute une publicité ; retourne False si elle était déjà connue"""
+        key = self.key_for(ad)
+        if key in self._ads:
+            return False
+        if not self.keep_ads:
+            ad = None
+        elif self.compact:
+            from ad_record import AdRecord
+            ad = AdRecord.from_dict(ad)
+        self._ads[key] = ad
+        return True
+
+    def add_key(self, key: str) -> bool:
+        """Marque une clé comme connue sans conserver la publicité (reprise de run)"""
+        if key in self._ads:
+            return False
+        self._ads[key] = None
+        return True
+
+    def __contains__(self, ad_or_key) -> bool:
+        if isinstance(ad_or_key, dict):
+            ad_or_key = self.key_for(ad_or_key)
+        return ad_or_key in self._ads
+
+    def __len__(self) -> int:
+        return len(self._ads)
+
+    def __iter__(self) -> Iterator[Dict]:
+        if self.compact:
+            return (ad.to_dict() for ad in self._ads.values() if ad is not None)
+        return (ad for ad in self._ads.values() if ad is not None)
+
+    def keys(self) -> List[str]:
+        """Liste des clés connues, dans l'ordre d'insertion"""
+        return list(self._ads.keys())
+
+    def ads(self) -> List[Dict]:
+        """Liste des publicités, dans l'ordre d'insertion"""
+        return list(self)
+
+    def entries_since(self, position: int) -> List[tuple]:
+        """(clé, publicité ou None) ajoutées après les `position` premières, dans l'ordre d'insertion"""
+        entries = itertools.islice(self._ads.items(), position, None)
+        if self.compact:
+            return [(key, ad.to_dict() if ad is not None else None) for key, ad in entries]
+        return list(entries)
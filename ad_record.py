@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Représentation compacte d'une publicité en mémoire.
+
+Un dict par pub coûte cher sur les gros runs : table de hachage par pub,
+listes, petits dicts par image, et les mêmes chaînes (plateformes, CTAs,
+textes des variantes d'une créa) répétées d'une pub à l'autre. AdRecord
+range les champs connus (schéma de columnar_export) dans des slots :
+- les listes deviennent des tuples, leurs chaînes sont internées (une seule
+  copie de "Instagram" ou "En savoir plus" pour tout le run) ;
+- images / vidéos deviennent des tuples de valeurs ;
+- le texte brut des cartes (full_text, full_section) est gardé compressé et
+  décompressé à la lecture, ou abandonné (RAW_TEXT_DROP).
+
+to_dict() restitue exactement le dict d'origine (ordre des clés compris) ;
+to_dict("v1") / to_dict("v2") convertissent vers le schéma de l'autre scraper.
+"""
+
+import sys
+import zlib
+from typing import Dict, Optional
+
+from ads_db import normalize_date
+from columnar_export import (
+    BOOL_FIELDS,
+    INT_FIELDS,
+    LIST_FIELDS,
+    NESTED_FIELDS,
+    STRING_FIELDS,
+    _conforms,
+)
+
+
+RAW_TEXT_KEEP = "keep"
+RAW_TEXT_LAZY = "lazy"
+RAW_TEXT_DROP = "drop"
+
+RAW_FIELDS = ("full_text", "full_section")
+
+# Champs à valeurs répétées d'une pub à l'autre (internés)
+INTERNED_FIELDS = {
+    "source", "page_id", "page_name", "date_started", "date_start", "date_end",
+    "display_format", "collation_id",
+}
+
+FIELDS = STRING_FIELDS + INT_FIELDS + BOOL_FIELDS + LIST_FIELDS + tuple(NESTED_FIELDS)
+NESTED_KEYS = {field: tuple(subkeys) for field, subkeys in NESTED_FIELDS.items()}
+
+# Ordre des clés : un tuple partagé par toutes les pubs d'un même schéma
+_KEY_ORDERS: Dict[tuple, tuple] = {}
+
+
+def _shared_keys(keys: tuple) -> tuple:
+    return _KEY_ORDERS.setdefault(keys, keys)
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class AdRecord:
+    """Publicité à champs fixes (slots), convertible en dict sans perte"""
+
+    __slots__ = FIELDS + ("_keys", "_extra")
+
+    def __init__(self):
+        for name in FIELDS:
+            setattr(self, name, None)
+        self._keys = ()
+        self._extra = None
+
+    @classmethod
+    def from_dict(cls, ad: Dict, raw_text: str = RAW_TEXT_LAZY) -> "AdRecord":
+        """
+        Args:
+            ad: Publicité (DOM v1, réseau, v2)
+            raw_text: Texte brut des cartes : 'keep', 'lazy' (compressé) ou 'drop'
+        """
+        record = cls()
+        keys = []
+        extra = {}
+
+        for key, value in ad.items():
+            if raw_text == RAW_TEXT_DROP and key in RAW_FIELDS:
+                continue
+            keys.append(key)
+
+            if key not in FIELDS or not _conforms(key, value):
+                # Champ hors schéma (API Graph...) ou de type inattendu : gardé tel quel
+                extra[key] = value
+            elif value is None:
+                continue
+            elif key in NESTED_KEYS:
+                subkeys = NESTED_KEYS[key]
+                setattr(record, key, tuple(
+                    tuple(_intern(item.get(subkey)) for subkey in subkeys) for item in value
+                ))
+            elif key in LIST_FIELDS:
+                setattr(record, key, tuple(sys.intern(item) for item in value))
+            elif key in RAW_FIELDS and raw_text == RAW_TEXT_LAZY:
+                setattr(record, key, zlib.compress(value.encode("utf-8")))
+            elif key in INTERNED_FIELDS:
+                setattr(record, key, sys.intern(value))
+            else:
+                setattr(record, key, value)
+
+        record._keys = _shared_keys(tuple(keys))
+        record._extra = extra or None
+        return record
+
+    def _value(self, key: str):
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        if key not in FIELDS:
+            return None
+
+        value = getattr(self, key)
+        if value is None:
+            return None
+        if key in NESTED_KEYS:
+            subkeys = NESTED_KEYS[key]
+            return [
+                {subkey: item[i] for i, subkey in enumerate(subkeys) if item[i] is not None}
+                for item in value
+            ]
+        if key in LIST_FIELDS:
+            return list(value)
+        if key in RAW_FIELDS and isinstance(value, bytes):
+            return zlib.decompress(value).decode("utf-8")
+        return value
+
+    def get(self, key: str, default=None):
+        """Accès à la manière d'un dict (valeur reconstruite)"""
+        if key not in self._keys:
+            return default
+        return self._value(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    @property
+    def start_date(self) -> Optional[str]:
+        """Début de diffusion (YYYY-MM-DD), quel que soit le schéma"""
+        return normalize_date(self.date_start or self.date_started)
+
+    @property
+    def end_date(self) -> Optional[str]:
+        return normalize_date(self.date_end)
+
+    def to_dict(self, schema: Optional[str] = None) -> Dict:
+        """
+        Dict de la publicité
+
+        Args:
+            schema: None (schéma d'origine, à l'identique), 'v1' (scraper
+                    principal : date_started, headlines, body_texts, full_text)
+                    ou 'v2' (date_start / date_end, text_lines, full_section)
+        """
+        if schema is None:
+            return {key: self._value(key) for key in self._keys}
+        if schema == "v1":
+            return self._to_v1()
+        if schema == "v2":
+            return self._to_v2()
+        raise ValueError(f"Schéma inconnu : {schema} (choix: v1, v2)")
+
+    def _to_v1(self) -> Dict:
+        ad = self.to_dict()
+        if "date_started" not in ad and self.start_date:
+            # Format affiché par la bibliothèque en anglais ("January 5, 2025")
+            from datetime import datetime
+            date = datetime.strptime(self.start_date, "%Y-%m-%d")
+            ad["date_started"] = f"{date.strftime('%B')} {date.day}, {date.year}"
+        if "text_lines" in ad:
+            lines = ad.pop("text_lines") or []
+            ad.setdefault("headlines", lines[:1])
+            ad.setdefault("body_texts", lines[1:])
+        if "full_section" in ad:
+            ad.setdefault("full_text", ad.pop("full_section"))
+        ad.pop("text_preview", None)
+        ad.setdefault("library_id", ad.get("id"))
+        return ad
+
+    def _to_v2(self) -> Dict:
+        ad = self.to_dict()
+        lines = ad.get("text_lines")
+        if lines is None:
+            lines = list(ad.get("headlines") or []) + list(ad.get("body_texts") or [])
+        full_section = ad.get("full_section") or ad.get("full_text") or ""
+        return {
+            "id": ad.get("id") or ad.get("library_id"),
+            "date_start": ad.get("date_start") or self.start_date,
+            "date_end": ad.get("date_end"),
+            "platforms": ad.get("platforms") or [],
+            "text_preview": ad.get("text_preview") if "text_preview" in ad else "\n".join(lines)[:200],
+            "text_lines": lines[:10],
+            "full_section": full_section[:1000],
+        }
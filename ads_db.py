@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Stockage SQLite des publicités scrapées.
+
+Les runs successifs s'accumulent dans une même base : chaque pub est
+insérée ou mise à jour (upsert) par sa clé de déduplication, et les
+colonnes de filtrage (page, pays, dates, statut, plateformes) sont indexées.
+Les analyses interrogent la base au lieu de recharger des fichiers JSON
+entiers. L'enregistrement d'origine est conservé tel quel (colonne data).
+"""
+
+import json
+import re
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from ad_index import AdIndex
+from delta_store import ad_is_active
+
+
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ads (
+    ad_id TEXT PRIMARY KEY,
+    page_id TEXT,
+    page_name TEXT,
+    search_term TEXT,
+    date_start TEXT,
+    date_end TEXT,
+    is_active INTEGER,
+    source TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ads_page_id ON ads (page_id);
+CREATE INDEX IF NOT EXISTS idx_ads_date_start ON ads (date_start);
+CREATE INDEX IF NOT EXISTS idx_ads_date_end ON ads (date_end);
+
+CREATE TABLE IF NOT EXISTS ad_platforms (
+    ad_id TEXT NOT NULL REFERENCES ads (ad_id) ON DELETE CASCADE,
+    platform TEXT NOT NULL,
+    PRIMARY KEY (ad_id, platform)
+);
+CREATE INDEX IF NOT EXISTS idx_ad_platforms_platform ON ad_platforms (platform);
+
+-- Une pub peut être diffusée (et recherchée) dans plusieurs pays
+CREATE TABLE IF NOT EXISTS ad_countries (
+    ad_id TEXT NOT NULL REFERENCES ads (ad_id) ON DELETE CASCADE,
+    country TEXT NOT NULL,
+    PRIMARY KEY (ad_id, country)
+);
+CREATE INDEX IF NOT EXISTS idx_ad_countries_country ON ad_countries (country);
+
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scraped_at TEXT,
+    query TEXT,
+    total_ads INTEGER,
+    summary TEXT
+);
+"""
+
+# Mois affichés par la bibliothèque en français ("22 déc 2025", "3 janvier 2025")
+FRENCH_MONTHS = {
+    "jan": 1, "janv": 1, "janvier": 1, "fév": 2, "fev": 2, "févr": 2, "fevr": 2, "février": 2, "fevrier": 2,
+    "mar": 3, "mars": 3, "avr": 4, "avril": 4, "mai": 5, "juin": 6,
+    "juil": 7, "juillet": 7, "aoû": 8, "août": 8, "aout": 8,
+    "sep": 9, "sept": 9, "septembre": 9, "oct": 10, "octobre": 10,
+    "nov": 11, "novembre": 11, "déc": 12, "dec": 12, "décembre": 12, "decembre": 12,
+}
+FRENCH_DATE_PATTERN = re.compile(r'(\d{1,2})\s+([a-zéèûô]+)\.?\s+(\d{4})', re.IGNORECASE)
+
+
+def is_sqlite(filename: str) -> bool:
+    """Indique si un fichier de sortie est une base SQLite"""
+    return filename.lower().endswith(SQLITE_EXTENSIONS)
+
+
+def normalize_date(value) -> Optional[str]:
+    """
+    Date d'une pub au format YYYY-MM-DD, quelle que soit sa source
+
+    ISO (réseau, API Graph), "January 1, 2025" (DOM) ou "22 déc 2025" (v2).
+    """
+    if not value or not isinstance(value, str):
+        return None
+
+    if re.match(r'\d{4}-\d{2}-\d{2}', value):
+        return value[:10]
+
+    try:
+        return datetime.strptime(value.strip(), "%B %d, %Y").strftime("%Y-%m-%d")
+    except ValueError:
+        pass
+
+    match = FRENCH_DATE_PATTERN.search(value)
+    if match:
+        month = FRENCH_MONTHS.get(match.group(2).lower())
+        if month:
+            return f"{int(match.group(3)):04d}-{month:02d}-{int(match.group(1)):02d}"
+    return None
+
+
+def ad_platforms(ad: Dict) -> List[str]:
+    """Plateformes de diffusion (noms affichés : Facebook, Instagram...)"""
+    from network_capture import PLATFORM_NAMES
+
+    platforms = []
+    for platform in ad.get("platforms") or ad.get("publisher_platforms") or []:
+        name = PLATFORM_NAMES.get(str(platform).upper(), str(platform).title())
+        if name not in platforms:
+            platforms.append(name)
+    return platforms
+
+
+class AdsDatabase:
+    """Base SQLite de publicités (upsert par ID, requêtes indexées)"""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.conn = sqlite3.connect(filename)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def upsert_ads(self, ads: Iterable[Dict], query: Optional[Dict] = None) -> int:
+        """
+        Insère ou met à jour des publicités
+
+        Args:
+            ads: Publicités (n'importe quel format de sortie des scrapers / de l'API)
+            query: Recherche d'origine, pour les champs absents des pubs (page, pays)
+
+        Returns:
+            Nombre de publicités écrites
+        """
+        query = query or {}
+        now = datetime.now().isoformat()
+        count = 0
+
+        with self.conn:
+            for ad in ads:
+                ad_id = AdIndex.key_for(ad)
+                active = ad_is_active(ad)
+                self.conn.execute(
+                    """
+                    INSERT INTO ads (ad_id, page_id, page_name, search_term, date_start,
+                                     date_end, is_active, source, first_seen, last_seen, data)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (ad_id) DO UPDATE SET
+                        page_id = COALESCE(excluded.page_id, page_id),
+                        page_name = COALESCE(excluded.page_name, page_name),
+                        search_term = COALESCE(excluded.search_term, search_term),
+                        date_start = COALESCE(excluded.date_start, date_start),
+                        date_end = COALESCE(excluded.date_end, date_end),
+                        is_active = COALESCE(excluded.is_active, is_active),
+                        source = excluded.source,
+                        last_seen = excluded.last_seen,
+                        data = excluded.data
+                    """,
+                    (
+                        ad_id,
+                        str(ad.get("page_id") or query.get("page_id") or "") or None,
+                        ad.get("page_name") or None,
+                        query.get("search_term") or None,
+                        normalize_date(ad.get("date_start") or ad.get("ad_delivery_start_time") or ad.get("date_started")),
+                        normalize_date(ad.get("date_end") or ad.get("ad_delivery_stop_time")),
+                        None if active is None else int(active),
+                        ad.get("source") or ("api" if "ad_delivery_start_time" in ad else "dom"),
+                        now,
+                        now,
+                        json.dumps(ad, ensure_ascii=False),
+                    )
+                )
+                self.conn.execute("DELETE FROM ad_platforms WHERE ad_id = ?", (ad_id,))
+                self.conn.executemany(
+                    "INSERT INTO ad_platforms (ad_id, platform) VALUES (?, ?)",
+                    [(ad_id, platform) for platform in ad_platforms(ad)]
+                )
+                # Les pays s'accumulent d'une recherche à l'autre
+                if query.get("country"):
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO ad_countries (ad_id, country) VALUES (?, ?)",
+                        (ad_id, query["country"])
+                    )
+                count += 1
+
+        return count
+
+    def upsert_result(self, result: Dict, query: Optional[Dict] = None) -> int:
+        """
+        Enregistre un résultat de scraping (publicités + résumé du run)
+
+        Un résultat agrégé (mode batch, recherches API multiples) n'a pas de
+        requête unique : chaque pub est enregistrée avec la requête (page,
+        pays) de chacune des recherches qui l'ont trouvée.
+        """
+        searches = result.get("jobs") or result.get("results")
+        if query is None and "query" not in result and searches:
+            ads = {AdIndex.key_for(ad): ad for ad in result.get("ads") or []}
+            found = set()
+            for search in searches:
+                keys = [key for key in search.get("ad_ids") or [] if key in ads]
+                self.upsert_ads([ads[key] for key in keys], search.get("query") or {})
+                found.update(keys)
+            # Pubs sans recherche connue (résultat d'une version antérieure)
+            self.upsert_ads([ad for key, ad in ads.items() if key not in found], {})
+            query = [search.get("query") for search in searches]
+            count = len(ads)
+        else:
+            query = query or result.get("query") or {}
+            count = self.upsert_ads(result.get("ads") or [], query)
+
+        summary = {key: value for key, value in result.items() if key not in ("ads", "creative_angles")}
+        for key in ("jobs", "results"):
+            if isinstance(summary.get(key), list):
+                summary[key] = [
+                    {name: value for name, value in search.items() if name != "ad_ids"}
+                    for search in summary[key]
+                ]
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO runs (scraped_at, query, total_ads, summary) VALUES (?, ?, ?, ?)",
+                (
+                    result.get("scraped_at") or datetime.now().isoformat(),
+                    json.dumps(query, ensure_ascii=False),
+                    count,
+                    json.dumps(summary, ensure_ascii=False, default=str),
+                )
+            )
+        return count
+
+    @staticmethod
+    def _where(
+        page_id: Optional[str] = None,
+        country: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        platform: Optional[str] = None,
+        active: Optional[bool] = None
+    ):
+        clauses, params = [], []
+        if page_id:
+            clauses.append("page_id = ?")
+            params.append(str(page_id))
+        if country:
+            clauses.append("ad_id IN (SELECT ad_id FROM ad_countries WHERE country = ?)")
+            params.append(country)
+        # Pubs diffusées dans la période : commencées avant sa fin, terminées
+        # après son début (sans date de fin : encore en cours)
+        if start_date:
+            if start_date <= datetime.now().strftime("%Y-%m-%d"):
+                clauses.append("(date_end >= ? OR date_end IS NULL)")
+            else:
+                clauses.append("date_end >= ?")
+            params.append(start_date)
+        if end_date:
+            clauses.append("date_start <= ?")
+            params.append(end_date)
+        if platform:
+            clauses.append("ad_id IN (SELECT ad_id FROM ad_platforms WHERE platform = ?)")
+            params.append(platform)
+        if active is not None:
+            clauses.append("is_active = ?")
+            params.append(int(active))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def iter_ads(self, **filters) -> Iterator[Dict]:
+        """
+        Publicités correspondant aux filtres, des plus récentes aux plus anciennes
+
+        Filtres: page_id, country, start_date / end_date (période de
+        diffusion, YYYY-MM-DD), platform, active.
+        """
+        where, params = self._where(**filters)
+        cursor = self.conn.execute(f"SELECT data FROM ads{where} ORDER BY date_start DESC", params)
+        for (data,) in cursor:
+            yield json.loads(data)
+
+    def count_ads(self, **filters) -> int:
+        where, params = self._where(**filters)
+        return self.conn.execute(f"SELECT COUNT(*) FROM ads{where}", params).fetchone()[0]
+
+    def platform_counts(self, **filters) -> Dict[str, int]:
+        """Nombre de pubs par plateforme (agrégat SQL, sans charger les pubs)"""
+        where, params = self._where(**filters)
+        rows = self.conn.execute(
+            f"SELECT platform, COUNT(*) FROM ad_platforms WHERE ad_id IN (SELECT ad_id FROM ads{where}) "
+            "GROUP BY platform ORDER BY COUNT(*) DESC",
+            params
+        )
+        return dict(rows.fetchall())
+
+    def load_result(self, **filters) -> Dict:
+        """Résultat au format JSON des scrapers, pour les scripts d'analyse"""
+        ads = list(self.iter_ads(**filters))
+        return {
+            "success": True,
+            "total_ads": len(ads),
+            "ads": ads,
+            "query": {
+                "page_id": filters.get("page_id"),
+                "country": filters.get("country"),
+                "start_date": filters.get("start_date"),
+                "end_date": filters.get("end_date"),
+            },
+            "stats": {
+                "ads_in_range": len(ads),
+                "platforms": self.platform_counts(**filters),
+            },
+            "source_database": self.filename,
+        }
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Entrées/sorties des résultats de scraping.
+
+Format JSONL (une publicité par ligne) écrit au fil de l'eau : un crash en
+cours de run ne perd que la ligne en cours d'écriture, et la mémoire ne
+dépend plus du nombre de pubs. Le résumé du run (statistiques, angles
+créatifs...) est écrit en dernière ligne, marqué par "_record": "summary".
+
+Les fichiers JSON classiques peuvent être lus en flux : le tableau "ads" est
+décodé pub par pub, sans charger tout le document, et les champs volumineux
+(full_section, full_text) peuvent être écartés à la lecture. orjson est
+utilisé s'il est installé (pip install orjson), json sinon.
+"""
+
+import json
+import os
+import re
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+SUMMARY_RECORD = "summary"
+JSONL_EXTENSIONS = (".jsonl", ".ndjson")
+
+# Texte brut des cartes : l'essentiel du volume, inutile aux analyses
+HEAVY_FIELDS = ("full_section", "full_text")
+
+STREAM_CHUNK_SIZE = 1 << 20
+
+
+def json_loads(data):
+    """Décode un document JSON (orjson si disponible)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj) -> str:
+    """Encode en JSON compact, caractères non ASCII conservés"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            pass  # Types non gérés par orjson (clés non textuelles, entiers > 64 bits)
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def load_json(filename: str):
+    """Charge un fichier JSON entier avec le décodeur le plus rapide disponible"""
+    if orjson is not None:
+        with open(filename, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _slim(ad: Dict, drop_fields: Iterable[str]) -> Dict:
+    for field in drop_fields:
+        ad.pop(field, None)
+    return ad
+
+
+def is_jsonl(filename: str) -> bool:
+    """Indique si un fichier de sortie doit être écrit en JSONL"""
+    return filename.lower().endswith(JSONL_EXTENSIONS)
+
+
+class JsonlSink:
+    """Écrit chaque publicité dès son extraction, puis le résumé du run"""
+
+    def __init__(self, filename: str, mode: str = "w"):
+        """
+        Args:
+            filename: Fichier JSONL de sortie
+            mode: 'w' pour un nouveau fichier, 'a' pour compléter un flux existant
+        """
+        self.filename = filename
+        self.count = 0
+        self._file = open(filename, mode, encoding="utf-8")
+
+        # Reprise après un crash : la dernière ligne peut être tronquée
+        if mode == "a" and self._file.tell() > 0:
+            with open(filename, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")
+
+    def write_ad(self, ad: Dict):
+        self._file.write(json_dumps(ad) + "\n")
+        self.count += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def write_summary(self, result: Dict):
+        """Écrit le résumé du run (tout le résultat sauf les publicités)"""
+        record = {key: value for key, value in result.items() if key != "ads"}
+        record["_record"] = SUMMARY_RECORD
+        record.setdefault("total_ads", self.count)
+        self._file.write(json_dumps(record) + "\n")
+        self.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_jsonl(filename: str) -> Iterator[Dict]:
+    """Lit un flux JSONL ligne à ligne (ligne tronquée par un crash ignorée)"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json_loads(line)
+            except ValueError:
+                continue
+
+
+def iter_jsonl_ads(filename: str, drop_fields: Iterable[str] = ()) -> Iterator[Dict]:
+    """Publicités d'un flux JSONL, sans le charger entièrement"""
+    for record in iter_jsonl(filename):
+        if record.get("_record") != SUMMARY_RECORD:
+            yield _slim(record, drop_fields)
+
+
+def load_jsonl_results(filename: str, drop_fields: Iterable[str] = ()) -> Dict:
+    """
+    Reconstitue un résultat au format JSON classique depuis un flux JSONL
+
+    Sans ligne de résumé (run interrompu), le résultat est marqué "incomplete".
+    """
+    ads = []
+    summary: Optional[Dict] = None
+
+    for record in iter_jsonl(filename):
+        if record.get("_record") == SUMMARY_RECORD:
+            summary = record
+        else:
+            ads.append(_slim(record, drop_fields))
+
+    if summary is None:
+        return {
+            "success": True,
+            "incomplete": True,
+            "total_ads": len(ads),
+            "ads": ads
+        }
+
+    result = {key: value for key, value in summary.items() if key != "_record"}
+    result["ads"] = ads
+    result["total_ads"] = len(ads)
+    return result
+
+
+class _StreamReader:
+    """Lecture d'un document JSON par morceaux, une valeur à la fois"""
+
+    _decoder = json.JSONDecoder()
+    _whitespace = re.compile(r'[ \t\n\r]*')
+
+    def __init__(self, f, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Ajoute un morceau au tampon (au moins autant que ce qui reste, pour
+        qu'une valeur longue ne soit pas redécodée un grand nombre de fois)"""
+        chunk = self.f.read(max(self.chunk_size, len(self.buf) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Prochain caractère significatif ('' en fin de fichier)"""
+        while True:
+            self.pos = self._whitespace.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(f"'{chars}' attendu", self.buf, self.pos)
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Décode la valeur suivante (objet, tableau, chaîne, nombre...)"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+                # Un nombre en fin de tampon peut continuer dans le morceau suivant
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def iter_json_document(filename: str, array_key: str = "ads") -> Iterator[Tuple[str, object]]:
+    """
+    Parcourt un document JSON {...} sans le charger entièrement
+
+    Yields:
+        ("array", array_key) au début du tableau `array_key`,
+        ("item", élément) pour chacun de ses éléments,
+        ("field", (clé, valeur)) pour les autres clés de premier niveau
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        reader = _StreamReader(f)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            if key == array_key and reader.peek() == "[":
+                reader.expect("[")
+                yield "array", key
+                if reader.peek() == "]":
+                    reader.expect("]")
+                else:
+                    while True:
+                        yield "item", reader.value()
+                        if reader.expect(",]") == "]":
+                            break
+            else:
+                yield "field", (key, reader.value())
+
+            if reader.expect(",}") == "}":
+                return
+
+
+def iter_json_ads(filename: str, drop_fields: Iterable[str] = ()) -> Iterator[Dict]:
+    """Publicités d'un résultat JSON, décodées une à une"""
+    for kind, value in iter_json_document(filename):
+        if kind == "item":
+            yield _slim(value, drop_fields)
+
+
+def load_json_results(filename: str, drop_fields: Iterable[str] = ()) -> Dict:
+    """
+    Charge un résultat JSON en lisant les pubs en flux
+
+    Avec drop_fields (ex. HEAVY_FIELDS), la mémoire utilisée ne dépend plus
+    que des champs conservés : le document complet n'est jamais en mémoire.
+    """
+    result = {}
+    ads = []
+    for kind, value in iter_json_document(filename):
+        if kind == "item":
+            ads.append(_slim(value, drop_fields))
+        elif kind == "array":
+            result[value] = ads
+        else:
+            key, field_value = value
+            result[key] = field_value
+    return result
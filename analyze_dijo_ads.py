@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """
-Analyseur spécifique pour les publicités DIJO / probiotiques
-Avec exemples de créa pour chaque angle identifié
+Analyseur d'angles créatifs avec exemples de créa pour chaque angle identifié
+
+Les angles (promotionnels, produits, bénéfices) sont définis dans un fichier
+de règles (angle_rules.py) ; par défaut celles de DIJO / probiotiques.
 """
 
 import json
@@ -9,10 +11,23 @@ import re
 from collections import Counter
 from typing import Dict, List
 
-def load_data(filename="facebook_ads_v2.json"):
-    """Charge les données"""
-    with open(filename, 'r', encoding='utf-8') as f:
-        return json.load(f)
+from ads_db import AdsDatabase, is_sqlite
+from ads_io import is_jsonl, load_json_results, load_jsonl_results
+from angle_rules import DEFAULT_RULES_FILE, AngleRules
+
+def load_data(filename="facebook_ads_v2.json", page_id=None):
+    """
+    Charge les données (fichier JSON ou JSONL, ou base SQLite filtrée par page)
+
+    Les pubs sont décodées une à une, sans charger le document entier en
+    mémoire (full_section est gardé : il figure dans les exemples exportés)
+    """
+    if is_sqlite(filename):
+        with AdsDatabase(filename) as db:
+            return db.load_result(page_id=page_id)
+    if is_jsonl(filename):
+        return load_jsonl_results(filename)
+    return load_json_results(filename)
 
 def format_ad_example(ad: Dict, indent="    ") -> str:
     """Formate un exemple de publicité"""
@@ -32,13 +47,14 @@ def format_ad_example(ad: Dict, indent="    ") -> str:
 
     return "\n".join(lines)
 
-def analyze_creative_angles(data: Dict):
+def analyze_creative_angles(data: Dict, rules: AngleRules = None):
     """Analyse approfondie des angles créatifs avec exemples"""
 
     ads = data.get('ads', [])
+    rules = rules or AngleRules.load(DEFAULT_RULES_FILE)
 
     print(f"\n{'='*70}")
-    print(f"  ANALYSE DES ANGLES CRÉATIFS - DIJO PROBIOTIQUES")
+    print(f"  ANALYSE DES ANGLES CRÉATIFS - {rules.name}")
     print(f"{'='*70}\n")
 
     print(f"📊 Vue d'ensemble")
@@ -56,71 +72,29 @@ def analyze_creative_angles(data: Dict):
     product_examples = {}
     benefit_examples = {}
 
+    angle_lists = {
+        "promotional": (promotional_angles, promo_examples),
+        "product": (product_angles, product_examples),
+        "benefit": (benefit_angles, benefit_examples),
+    }
+
     for ad in ads:
         text_lines = ad.get('text_lines', [])
-        full_text = ' '.join(text_lines).lower()
-
-        # Angles promotionnels
-        if '-' in full_text and '%' in full_text:
-            promo_match = re.search(r'(-\d+%)', ' '.join(text_lines))
-            if promo_match:
-                promo_key = promo_match.group(1)
-                promotional_angles.append(promo_key)
-                if promo_key not in promo_examples:
-                    promo_examples[promo_key] = ad
-
-        # Angles produit
-        if 'probiotiques' in full_text and 'indispensable' in full_text:
-            product_angles.append("Focus Probiotiques")
-            if "Focus Probiotiques" not in product_examples:
-                product_examples["Focus Probiotiques"] = ad
-
-        if 'glutamine' in full_text:
-            product_angles.append("Focus Glutamine")
-            if "Focus Glutamine" not in product_examples:
-                product_examples["Focus Glutamine"] = ad
-
-        if 'reset' in full_text:
-            product_angles.append("DIJO RESET")
-            if "DIJO RESET" not in product_examples:
-                product_examples["DIJO RESET"] = ad
-
-        if ('pack' in full_text or 'associez' in full_text) and not 'pack' in product_examples:
-            product_angles.append("Pack/Bundle")
-            if "Pack/Bundle" not in product_examples:
-                product_examples["Pack/Bundle"] = ad
-
-        # Bénéfices mentionnés
-        if 'microbiote' in full_text:
-            benefit_angles.append("Équilibre microbiote")
-            if "Équilibre microbiote" not in benefit_examples:
-                benefit_examples["Équilibre microbiote"] = ad
-
-        if 'flore intestinale' in full_text:
-            benefit_angles.append("Flore intestinale")
-            if "Flore intestinale" not in benefit_examples:
-                benefit_examples["Flore intestinale"] = ad
-
-        if 'ventre gonflé' in full_text or 'ballonnement' in full_text:
-            benefit_angles.append("Anti-ballonnements")
-            if "Anti-ballonnements" not in benefit_examples:
-                benefit_examples["Anti-ballonnements"] = ad
-
-        if 'poids' in full_text or 'minceur' in full_text or 'métabolisme' in full_text:
-            benefit_angles.append("Perte de poids / Métabolisme")
-            if "Perte de poids / Métabolisme" not in benefit_examples:
-                benefit_examples["Perte de poids / Métabolisme"] = ad
-
-        if 'stress' in full_text or 'anxiété' in full_text:
-            benefit_angles.append("Anti-stress")
-            if "Anti-stress" not in benefit_examples:
-                benefit_examples["Anti-stress"] = ad
+
+        # Toutes les règles en un passage sur le texte de la pub
+        for category, angles in rules.classify(' '.join(text_lines)).items():
+            if category not in angle_lists:
+                continue
+            found_angles, examples = angle_lists[category]
+            for angle in angles:
+                found_angles.append(angle)
+                if angle not in examples:
+                    examples[angle] = ad
 
         # CTAs
         for line in text_lines:
-            if any(word in line.lower() for word in ['learn more', 'découvrez', 'profitez', 'prenez soin']):
-                if 5 < len(line) < 60:
-                    all_ctas.append(line)
+            if 5 < len(line) < 60 and rules.is_cta(line):
+                all_ctas.append(line)
 
     # Compteurs
     promo_counter = Counter(promotional_angles)
@@ -282,10 +256,16 @@ def export_summary(summary: Dict, filename="dijo_angles_summary.json"):
 
 
 if __name__ == "__main__":
-    import sys
-
-    input_file = sys.argv[1] if len(sys.argv) > 1 else "examples/facebook_ads_v2.json"
-
-    data = load_data(input_file)
-    summary = analyze_creative_angles(data)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Analyse des angles créatifs avec exemples de créa")
+    parser.add_argument('input', nargs='?', default="examples/facebook_ads_v2.json",
+                        help='Fichier JSON / JSONL ou base SQLite (défaut: examples/facebook_ads_v2.json)')
+    parser.add_argument('page_id', nargs='?', help='Base SQLite : pubs de cette page uniquement')
+    parser.add_argument('--rules', default=DEFAULT_RULES_FILE,
+                        help=f'Fichier de règles d\'angles (défaut: {DEFAULT_RULES_FILE})')
+    args = parser.parse_args()
+
+    data = load_data(args.input, args.page_id)
+    summary = analyze_creative_angles(data, AngleRules.load(args.rules))
     export_summary(summary)
@@ -4,23 +4,71 @@ Script d'analyse des résultats du scraping Facebook Ads.
 Affiche un résumé des angles créatifs testés.
 """
 
+import glob
 import json
+import os
 import sys
-from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, Optional
 from collections import Counter
 
+from ad_index import AdIndex
+from ads_db import SQLITE_EXTENSIONS, AdsDatabase, is_sqlite, normalize_date
+from ads_io import HEAVY_FIELDS, JSONL_EXTENSIONS, is_jsonl, load_json_results, load_jsonl_results
+from columnar_export import ARROW_EXTENSIONS, PARQUET_EXTENSIONS, is_columnar, load_columnar_result
+from creative_angles import COMMON_THEMES_LIMIT, CreativeAnglesAccumulator, analyze_creative_angles
+from creative_clusters import cluster_creatives
 
-def load_results(filename: str) -> Dict:
-    """Charge le fichier JSON de résultats"""
+
+# Fichiers retenus dans un dossier passé en entrée
+RESULT_EXTENSIONS = (".json",) + JSONL_EXTENSIONS + PARQUET_EXTENSIONS + ARROW_EXTENSIONS + SQLITE_EXTENSIONS
+
+# Fichiers de travail des scrapers, jamais des résultats
+IGNORED_SUFFIXES = (".checkpoint.json", ".checkpoint.ads.jsonl", ".tmp")
+
+
+def load_from_database(filename: str, filters: Optional[Dict] = None) -> Dict:
+    """Charge les pubs d'une base SQLite (requête indexée sur les filtres)"""
+    with AdsDatabase(filename) as db:
+        data = db.load_result(**(filters or {}))
+    data['creative_angles'] = analyze_creative_angles(data['ads'])
+    return data
+
+
+def read_results(filename: str, filters: Optional[Dict] = None) -> Dict:
+    """Charge un fichier de résultats, quel que soit son format (lève les erreurs)"""
+    if is_sqlite(filename):
+        if not os.path.exists(filename):
+            raise FileNotFoundError(filename)
+        return load_from_database(filename, filters)
+    if is_jsonl(filename):
+        return load_jsonl_results(filename, drop_fields=HEAVY_FIELDS)
+    if is_columnar(filename):
+        return load_columnar_result(filename)
+    return load_json_results(filename, drop_fields=HEAVY_FIELDS)
+
+
+def load_results(filename: str, filters: Optional[Dict] = None) -> Dict:
+    """
+    Charge le fichier JSON de résultats (ou un flux JSONL, lu ligne à ligne)
+
+    Les pubs sont lues une à une, sans leur texte brut (full_section,
+    full_text) : la mémoire ne dépend pas de la taille du fichier.
+    Pour une base SQLite, seules les pubs correspondant aux filtres sont lues
+    (page_id, country, start_date, end_date, platform).
+    """
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return read_results(filename, filters)
     except FileNotFoundError:
         print(f"❌ Fichier non trouvé : {filename}")
         sys.exit(1)
     except json.JSONDecodeError:
         print(f"❌ Erreur de parsing JSON : {filename}")
         sys.exit(1)
+    except ImportError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
 
 
 def print_header(title: str):
@@ -78,6 +126,20 @@ def analyze_ads(data: Dict):
     for i, cta in enumerate(ctas, 1):
         print(f"  {i}. {cta}")
 
+    # Familles de créas (variantes quasi identiques regroupées)
+    print_header("🧬 FAMILLES DE CRÉAS")
+    families = cluster_creatives(ads)
+    data['creative_families'] = families
+    unique_texts = sum(family['variants_count'] for family in families)
+    print(f"Familles de créas distinctes : {len(families)} (pour {unique_texts} textes exactement uniques)\n")
+    for i, family in enumerate(families[:10], 1):
+        preview = family['representative_text'][:70].replace('\n', ' ')
+        period = f"{family['first_date'] or '?'} → {family['last_date'] or '?'}"
+        print(f"  {i:2d}. {family['ads_count']:3d} pubs, {family['variants_count']:3d} variantes | {period}")
+        print(f"      {preview}{'...' if len(family['representative_text']) > 70 else ''}")
+    if len(families) > 10:
+        print(f"  ... et {len(families) - 10} autres")
+
     # Formats
     print_header("📹 FORMATS PUBLICITAIRES")
     formats = angles.get('formats', {})
@@ -180,7 +242,11 @@ def export_summary(data: Dict, output_file: str):
         },
         "formats": data.get('creative_angles', {}).get('formats', {}),
         "platforms": data.get('creative_angles', {}).get('platforms', {}),
-        "top_themes": data.get('creative_angles', {}).get('common_themes', [])[:10]
+        "top_themes": data.get('creative_angles', {}).get('common_themes', [])[:10],
+        "creative_families": [
+            {key: value for key, value in family.items() if key != 'ad_ids'}
+            for family in data.get('creative_families', [])
+        ]
     }
 
     with open(output_file, 'w', encoding='utf-8') as f:
@@ -189,26 +255,304 @@ def export_summary(data: Dict, output_file: str):
     print(f"📄 Résumé exporté vers : {output_file}")
 
 
+def expand_inputs(inputs: List[str]) -> List[str]:
+    """
+    Fichiers de résultats désignés par des chemins, motifs glob ou dossiers
+
+    Un dossier est parcouru récursivement (fichiers JSON, JSONL, Parquet,
+    Arrow et SQLite). L'ordre est stable et chaque fichier n'apparaît qu'une fois.
+    """
+    files = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            matches = [
+                path for path in glob.glob(os.path.join(pattern, "**", "*"), recursive=True)
+                if path.lower().endswith(RESULT_EXTENSIONS)
+            ]
+        elif glob.has_magic(pattern):
+            matches = glob.glob(pattern, recursive=True)
+        else:
+            matches = [pattern]
+
+        for path in sorted(matches):
+            if path.endswith(IGNORED_SUFFIXES) or os.path.isdir(path):
+                continue
+            if path not in files:
+                files.append(path)
+    return files
+
+
+def advertiser_of(data: Dict, filename: str) -> str:
+    """Annonceur d'un résultat : page ciblée, sinon page des pubs, sinon terme de recherche"""
+    query = data.get('query') or {}
+    ads = data.get('ads') or []
+    page_names = [ad.get('page_name') for ad in ads[:20] if ad.get('page_name')]
+    if page_names:
+        return Counter(page_names).most_common(1)[0][0]
+    if query.get('page_id'):
+        return str(query['page_id'])
+    if query.get('search_term'):
+        return query['search_term']
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def analyze_file(filename: str, filters: Optional[Dict] = None, skip_keys: Optional[set] = None) -> Dict:
+    """
+    Analyse d'un fichier dans un processus du pool
+
+    Seul un résumé compact revient au processus principal (état des angles,
+    dates, compteurs, clés des pubs), jamais les pubs elles-mêmes.
+
+    Args:
+        skip_keys: Pubs (clés AdIndex) déjà comptées dans un fichier précédent
+    """
+    try:
+        data = read_results(filename, filters)
+    except Exception as e:
+        return {"file": filename, "error": f"{type(e).__name__}: {e}"}
+
+    if not data.get('success') or not isinstance(data.get('ads'), list):
+        return {"file": filename, "error": data.get('message') or "pas un fichier de résultats"}
+
+    keys = [AdIndex.key_for(ad) for ad in data['ads']]
+    ads = [ad for ad, key in zip(data['ads'], keys) if key not in skip_keys] if skip_keys else data['ads']
+    dates = sorted(filter(None, (
+        normalize_date(ad.get('date_started') or ad.get('date_start') or ad.get('ad_delivery_start_time'))
+        for ad in ads
+    )))
+    return {
+        "file": filename,
+        "advertiser": advertiser_of(data, filename),
+        "total_ads": len(ads),
+        "first_date": dates[0] if dates else None,
+        "last_date": dates[-1] if dates else None,
+        "angles_state": CreativeAnglesAccumulator().add_many(ads).to_dict(),
+        "ad_keys": keys,
+        "duplicate_ads": len(data['ads']) - len(ads),
+    }
+
+
+def analyze_files(files: List[str], filters: Optional[Dict] = None, workers: Optional[int] = None) -> Dict:
+    """
+    Analyse plusieurs fichiers en parallèle puis agrège un rapport par annonceur
+
+    Les fichiers d'un même annonceur sont fusionnés (CreativeAnglesAccumulator).
+    Une pub présente dans plusieurs fichiers (re-scrapes quotidiens, fenêtres
+    qui se chevauchent) n'est comptée que dans le premier, comme dans
+    batch_scraper._aggregate : les fichiers qui reprennent des pubs déjà vues
+    sont analysés une seconde fois sans elles.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files)))
+    # Des lots de fichiers par processus : moins d'allers-retours pour les petits fichiers
+    chunksize = max(1, len(files) // (workers * 4))
+
+    def run(files, skips):
+        if workers == 1:
+            return [analyze_file(filename, filters, skip) for filename, skip in zip(files, skips)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(analyze_file, files, repeat(filters), skips, chunksize=chunksize))
+
+    file_results = run(files, repeat(None))
+
+    # Déduplication par ID dans l'ordre des fichiers
+    seen = set()
+    overlaps = {}
+    for i, file_result in enumerate(file_results):
+        keys = set(file_result.pop("ad_keys", ()))
+        if keys & seen:
+            overlaps[i] = keys & seen
+        seen |= keys
+    if overlaps:
+        indexes = list(overlaps)
+        rerun = run([files[i] for i in indexes], [overlaps[i] for i in indexes])
+        for i, file_result in zip(indexes, rerun):
+            file_result.pop("ad_keys", None)
+            file_results[i] = file_result
+
+    advertisers: Dict[str, Dict] = {}
+    overall = CreativeAnglesAccumulator()
+    errors = []
+
+    # Réduction dans l'ordre des fichiers : rapport identique quel que soit le nombre de processus
+    for file_result in file_results:
+        if "error" in file_result:
+            errors.append({"file": file_result["file"], "error": file_result["error"]})
+            continue
+
+        state = CreativeAnglesAccumulator.from_dict(file_result["angles_state"])
+        overall.merge(state)
+
+        entry = advertisers.setdefault(file_result["advertiser"], {
+            "files": [],
+            "angles": CreativeAnglesAccumulator(),
+            "first_date": None,
+            "last_date": None,
+        })
+        entry["files"].append(file_result["file"])
+        entry["angles"].merge(state)
+        if file_result["first_date"] and (not entry["first_date"] or file_result["first_date"] < entry["first_date"]):
+            entry["first_date"] = file_result["first_date"]
+        if file_result["last_date"] and (not entry["last_date"] or file_result["last_date"] > entry["last_date"]):
+            entry["last_date"] = file_result["last_date"]
+
+    # CTAs partagés : nombre d'annonceurs qui utilisent chaque CTA
+    cta_advertisers = Counter()
+    for entry in advertisers.values():
+        cta_advertisers.update(entry["angles"].ctas.values)
+
+    report_advertisers = []
+    for name, entry in advertisers.items():
+        angles = entry["angles"].result()
+        formats = angles["formats"]
+        report_advertisers.append({
+            "advertiser": name,
+            "files": len(entry["files"]),
+            "total_ads": entry["angles"].ads_count,
+            "first_date": entry["first_date"],
+            "last_date": entry["last_date"],
+            "headlines_count": angles["total_unique_headlines"],
+            "body_texts_count": angles["total_unique_body_texts"],
+            "ctas_count": angles["total_unique_ctas"],
+            "top_format": max(formats.items(), key=lambda x: x[1])[0] if any(formats.values()) else None,
+            "formats": formats,
+            "platforms": angles["platforms"],
+            "ctas": angles["unique_ctas"],
+            "top_themes": angles["common_themes"][:10],
+        })
+    report_advertisers.sort(key=lambda x: x["total_ads"], reverse=True)
+
+    overall_angles = overall.result()
+    return {
+        "files_analyzed": len(files) - len(errors),
+        "files_failed": errors,
+        "total_ads": overall.ads_count,
+        "duplicate_ads": sum(file_result.get("duplicate_ads", 0) for file_result in file_results),
+        "total_advertisers": len(report_advertisers),
+        "advertisers": report_advertisers,
+        "formats": overall_angles["formats"],
+        "platforms": overall_angles["platforms"],
+        "shared_ctas": [
+            {"cta": cta, "advertisers": count}
+            for cta, count in cta_advertisers.most_common() if count > 1
+        ],
+        "top_themes": overall_angles["common_themes"][:COMMON_THEMES_LIMIT],
+        "creative_angles_state": overall.summary_state(),
+    }
+
+
+def print_report(report: Dict):
+    """Affiche le rapport multi-annonceurs"""
+    print_header("📊 VUE D'ENSEMBLE (MULTI-FICHIERS)")
+    print(f"Fichiers analysés              : {report['files_analyzed']}")
+    print(f"Annonceurs                     : {report['total_advertisers']}")
+    print(f"Total de publicités            : {report['total_ads']}")
+    if report.get('duplicate_ads'):
+        print(f"Doublons entre fichiers ignorés : {report['duplicate_ads']}")
+    for failure in report['files_failed'][:10]:
+        print(f"  ⚠ {failure['file']} ignoré : {failure['error']}")
+    if len(report['files_failed']) > 10:
+        print(f"  ⚠ ... et {len(report['files_failed']) - 10} autres fichiers ignorés")
+
+    print_header("🏢 ANNONCEURS")
+    print(f"  {'Annonceur':30s} | {'Pubs':>6} | {'Headl.':>6} | {'Textes':>6} | {'CTAs':>4} | {'Format principal':18s} | Période")
+    print(f"  {'-'*30}-+-{'-'*6}-+-{'-'*6}-+-{'-'*6}-+-{'-'*4}-+-{'-'*18}-+-{'-'*23}")
+    for entry in report['advertisers']:
+        period = f"{entry['first_date'] or '?'} → {entry['last_date'] or '?'}"
+        print(f"  {entry['advertiser'][:30]:30s} | {entry['total_ads']:6d} | {entry['headlines_count']:6d} | "
+              f"{entry['body_texts_count']:6d} | {entry['ctas_count']:4d} | {entry['top_format'] or '-':18s} | {period}")
+
+    print_header("🎯 CTAs PARTAGÉS ENTRE ANNONCEURS")
+    if report['shared_ctas']:
+        for item in report['shared_ctas'][:15]:
+            print(f"  {item['cta'][:40]:40s} : {item['advertisers']:3d} annonceurs")
+    else:
+        print("Aucun CTA commun à plusieurs annonceurs")
+
+    print_header("📹 FORMATS ET 📱 PLATEFORMES")
+    total_formats = sum(report['formats'].values())
+    for format_type, count in sorted(report['formats'].items(), key=lambda x: x[1], reverse=True):
+        if total_formats > 0:
+            percentage = (count / total_formats) * 100
+            bar = '█' * int(percentage / 5)
+            print(f"  {format_type:20s} : {count:6d} ({percentage:5.1f}%) {bar}")
+    print()
+    for platform, count in sorted(report['platforms'].items(), key=lambda x: x[1], reverse=True):
+        print(f"  {platform:20s} : {count:6d}")
+
+    print_header("🔤 THÈMES ET MOTS-CLÉS PRINCIPAUX (TOUS ANNONCEURS)")
+    for i, theme in enumerate(report['top_themes'][:15], 1):
+        print(f"  {i:2d}. {theme['word']:20s} : {theme['count']:6d}")
+
+    print("\n" + "="*70 + "\n")
+
+
+def export_report(report: Dict, output_file: str):
+    """Exporte le rapport multi-annonceurs"""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"📄 Rapport exporté vers : {output_file}")
+
+
 def main():
     import argparse
 
     parser = argparse.ArgumentParser(description="Analyse des résultats Facebook Ads")
     parser.add_argument(
-        'input',
-        nargs='?',
-        default='facebook_ads.json',
-        help='Fichier JSON à analyser (défaut: facebook_ads.json)'
+        'inputs',
+        nargs='*',
+        default=['facebook_ads.json'],
+        help='Fichiers JSON, JSONL, Parquet/Arrow ou bases SQLite, motifs glob ("resultats/*.json") '
+             'ou dossiers (défaut: facebook_ads.json)'
     )
     parser.add_argument(
         '--export',
-        help='Exporter un résumé vers un fichier JSON'
+        help='Exporter un résumé (ou le rapport multi-annonceurs) vers un fichier JSON'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Plusieurs fichiers : nombre de processus (défaut: nombre de coeurs)'
     )
 
+    # Filtres (base SQLite uniquement)
+    parser.add_argument('--page-id', help='Base SQLite : pubs de cette page uniquement')
+    parser.add_argument('--country', help='Base SQLite : pubs de ce pays uniquement')
+    parser.add_argument('--since', help='Base SQLite : pubs diffusées à partir de cette date (YYYY-MM-DD)')
+    parser.add_argument('--until', help="Base SQLite : pubs diffusées jusqu'à cette date (YYYY-MM-DD)")
+    parser.add_argument('--platform', help='Base SQLite : pubs diffusées sur cette plateforme (ex: Instagram)')
+
     args = parser.parse_args()
 
     print("\n🎯 Facebook Ads Creative Angles Analyzer")
 
-    data = load_results(args.input)
+    filters = {
+        'page_id': args.page_id,
+        'country': args.country,
+        'start_date': args.since,
+        'end_date': args.until,
+        'platform': args.platform,
+    }
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print(f"❌ Aucun fichier de résultats : {' '.join(args.inputs)}")
+        sys.exit(1)
+
+    unfiltered = [filename for filename in files if not is_sqlite(filename)]
+    if any(filters.values()) and unfiltered:
+        print(f"⚠ Filtres --page-id/--country/--since/--until/--platform appliqués aux bases SQLite "
+              f"uniquement : {len(unfiltered)} fichier(s) analysé(s) sans filtre")
+
+    if len(files) > 1:
+        print(f"🔄 Analyse de {len(files)} fichiers...")
+        report = analyze_files(files, filters, args.workers)
+        print_report(report)
+        if args.export:
+            export_report(report, args.export)
+        return
+
+    data = load_results(files[0], filters)
     analyze_ads(data)
 
     if args.export:
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Moteur de règles d'angles créatifs, décrit dans un fichier JSON.
+
+Chaque catégorie (promotional, product, benefit...) liste des règles :
+
+    {"angle": "Focus Glutamine", "any": ["glutamine"]}
+    {"angle": "Focus Probiotiques", "all": ["probiotiques", "indispensable"]}
+    {"pattern": "-\\d+%"}
+
+Les mots-clés de toutes les règles sont compilés en une seule expression
+régulière, construite sur leur arbre des préfixes : le texte d'une pub est
+parcouru une fois, quel que soit le nombre de règles, et seules les règles
+dont un mot-clé apparaît sont évaluées. Les mots-clés sont cherchés comme
+sous-chaînes du texte en minuscules. Une règle "pattern" (expression
+régulière sur le texte d'origine) donne pour angle le texte trouvé, sauf si
+"angle" est fourni.
+"""
+
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+
+# À côté des scripts, quel que soit le répertoire courant
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "angle_rules.dijo.json")
+
+
+class KeywordMatcher:
+    """Recherche simultanée de mots-clés (sous-chaînes, chevauchements compris)"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = sorted({keyword.lower() for keyword in keywords if keyword})
+
+        # Arbre des préfixes : l'expression régulière qui en découle ne teste
+        # qu'une branche par caractère, quel que soit le nombre de mots-clés
+        self._trie: Dict = {}
+        for keyword in self.keywords:
+            node = self._trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = True
+
+        self.pattern = None
+        if self.keywords:
+            # Lookahead : une correspondance possible à chaque position, même
+            # à l'intérieur d'un mot-clé déjà trouvé (la plus longue)
+            self.pattern = re.compile(f"(?=({self._trie_pattern(self._trie)}))")
+
+        # Mots-clés présents dès qu'un plus long l'est à la même position
+        self.prefixes = {keyword: self._keyword_prefixes(keyword) for keyword in self.keywords}
+
+    @classmethod
+    def _trie_pattern(cls, node: Dict) -> str:
+        branches = [re.escape(char) + cls._trie_pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        pattern = "(?:" + "|".join(branches) + ")"
+        # Mot-clé complet ici : la suite est facultative (gloutonne, donc le plus long d'abord)
+        return pattern + "?" if "" in node else pattern
+
+    def _keyword_prefixes(self, keyword: str) -> List[str]:
+        prefixes = []
+        node = self._trie
+        for i, char in enumerate(keyword, 1):
+            node = node[char]
+            if "" in node:
+                prefixes.append(keyword[:i])
+        return prefixes
+
+    def found(self, text: str) -> set:
+        """Mots-clés présents dans un texte déjà en minuscules"""
+        if self.pattern is None:
+            return set()
+        found = set()
+        for longest in set(self.pattern.findall(text)):
+            found.update(self.prefixes[longest])
+        return found
+
+    def search(self, text: str) -> bool:
+        """Indique si au moins un mot-clé est présent"""
+        return self.pattern is not None and self.pattern.search(text) is not None
+
+
+class AngleRules:
+    """Règles d'angles compilées"""
+
+    def __init__(self, config: Dict):
+        self.name = config.get("name", "")
+        self.categories: Dict[str, List[Dict]] = {}
+
+        keywords = []
+        # Mot-clé -> règles concernées (catégorie, position)
+        self._rules_by_keyword: Dict[str, List] = {}
+        self._patterns = []
+
+        for category, rules in config.get("angles", {}).items():
+            compiled_rules = []
+            for position, rule in enumerate(rules):
+                if "pattern" in rule:
+                    compiled = {"angle": rule.get("angle"), "pattern": re.compile(rule["pattern"])}
+                    self._patterns.append((category, position, compiled))
+                else:
+                    terms = [term.lower() for term in rule.get("all") or rule.get("any") or []]
+                    if not terms:
+                        raise ValueError(f"Règle sans mot-clé dans '{category}' : {rule}")
+                    compiled = {"angle": rule["angle"], "all": "all" in rule, "terms": terms}
+                    keywords.extend(terms)
+                    for term in set(terms):
+                        self._rules_by_keyword.setdefault(term, []).append((category, position))
+                compiled_rules.append(compiled)
+            self.categories[category] = compiled_rules
+
+        self.matcher = KeywordMatcher(keywords)
+        self.cta_matcher = KeywordMatcher(config.get("ctas", []))
+
+    @classmethod
+    def load(cls, filename: str = DEFAULT_RULES_FILE) -> "AngleRules":
+        with open(filename, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def classify(self, text: str, lowered: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        Angles d'un texte, par catégorie (dans l'ordre des règles)
+
+        Args:
+            text: Texte de la publicité
+            lowered: Même texte en minuscules, s'il est déjà calculé
+        """
+        found = self.matcher.found(lowered if lowered is not None else text.lower())
+
+        matched = {category: {} for category in self.categories}
+        candidates = set()
+        for keyword in found:
+            candidates.update(self._rules_by_keyword[keyword])
+
+        for category, position in candidates:
+            rule = self.categories[category][position]
+            if not rule["all"] or all(term in found for term in rule["terms"]):
+                matched[category][position] = rule["angle"]
+
+        for category, position, rule in self._patterns:
+            match = rule["pattern"].search(text)
+            if match:
+                matched[category][position] = rule["angle"] or match.group(0)
+
+        return {
+            category: [angles[position] for position in sorted(angles)]
+            for category, angles in matched.items()
+        }
+
+    def is_cta(self, line: str) -> bool:
+        """Indique si une ligne contient un mot-clé de call-to-action"""
+        return self.cta_matcher.search(line.lower())
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Client asynchrone de l'API Facebook Ads Library (Graph API ads_archive).
+
+Une seule session HTTP (aiohttp) est partagée par toutes les requêtes :
+connexions keep-alive réutilisées, et plusieurs recherches page_id/pays
+peuvent tourner en parallèle sous une limite de concurrence. La pagination
+d'une même recherche reste séquentielle (chaque page donne le curseur suivant).
+
+Les envois passent par un RateLimitScheduler partagé : une page en erreur
+transitoire (429, 5xx, limitation Graph) est réessayée seule, sans perdre
+les pages déjà récupérées. Avec un HttpCache, les pages déjà récupérées
+récemment sont relues depuis le disque, sans requête.
+"""
+
+import asyncio
+import json
+import urllib.parse
+from typing import Dict, List, Optional
+
+from ad_index import AdIndex
+from checkpoint import Checkpoint
+from delta_store import DeltaTracker
+from http_cache import HttpCache
+from rate_limit import RateLimitScheduler, is_rate_limited, is_retryable
+
+
+GRAPH_API_URL = "https://graph.facebook.com/v18.0/ads_archive"
+
+AD_ARCHIVE_FIELDS = [
+    "id",
+    "ad_creation_time",
+    "ad_creative_bodies",
+    "ad_creative_link_captions",
+    "ad_creative_link_descriptions",
+    "ad_creative_link_titles",
+    "ad_delivery_start_time",
+    "ad_delivery_stop_time",
+    "ad_snapshot_url",
+    "age_country_gender_reach_breakdown",
+    "beneficiary_payers",
+    "bylines",
+    "currency",
+    "delivery_by_region",
+    "demographic_distribution",
+    "estimated_audience_size",
+    "eu_total_reach",
+    "impressions",
+    "languages",
+    "page_id",
+    "page_name",
+    "publisher_platforms",
+    "spend",
+    "target_ages",
+    "target_gender",
+]
+
+
+def build_search_params(
+    access_token: str,
+    page_id: str,
+    search_term: str,
+    country: str = "FR",
+    limit: int = 500,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> Dict:
+    """Paramètres de la première page d'une recherche ads_archive"""
+    params = {
+        "access_token": access_token,
+        "search_page_ids": page_id,
+        "search_terms": search_term,
+        "ad_reached_countries": country,
+        "ad_active_status": "ALL",
+        "fields": ",".join(AD_ARCHIVE_FIELDS),
+        "limit": limit,
+    }
+    # Fenêtre de diffusion (YYYY-MM-DD)
+    if start_date:
+        params["ad_delivery_date_min"] = start_date
+    if end_date:
+        params["ad_delivery_date_max"] = end_date
+    return params
+
+
+def strip_access_token(url: str) -> str:
+    """Retire le token d'une URL de pagination (avant de l'écrire sur disque)"""
+    parsed = urllib.parse.urlparse(url)
+    query = [
+        (key, value) for key, value in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)
+        if key != "access_token"
+    ]
+    return urllib.parse.urlunparse(parsed._replace(query=urllib.parse.urlencode(query)))
+
+
+def with_access_token(url: str, access_token: str) -> str:
+    """Remet le token dans une URL de pagination relue depuis le disque"""
+    parsed = urllib.parse.urlparse(strip_access_token(url))
+    query = urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)
+    query.append(("access_token", access_token))
+    return urllib.parse.urlunparse(parsed._replace(query=urllib.parse.urlencode(query)))
+
+
+class AsyncFacebookAdsLibraryAPI:
+    """Client asynchrone avec session HTTP mutualisée"""
+
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str = GRAPH_API_URL,
+        concurrency: int = 8,
+        timeout: float = 60.0,
+        verbose: bool = True,
+        scheduler: Optional[RateLimitScheduler] = None,
+        cache: Optional[HttpCache] = None
+    ):
+        """
+        Args:
+            access_token: Token d'accès Facebook
+            base_url: URL de l'endpoint ads_archive (remplaçable par un serveur local)
+            concurrency: Nombre maximum de requêtes HTTP simultanées
+            timeout: Délai maximum par requête (secondes)
+            verbose: Afficher la progression
+            scheduler: Ordonnanceur de débit (partagé entre toutes les recherches)
+            cache: Cache disque des réponses (aucun par défaut)
+        """
+        self.access_token = access_token
+        self.base_url = base_url
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.verbose = verbose
+        self.scheduler = scheduler or RateLimitScheduler()
+        self.cache = cache
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        """Ouvre la session HTTP (pool de connexions keep-alive)"""
+        import aiohttp
+
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get_json(self, url: str, params: Optional[Dict] = None) -> Dict:
+        """GET avec respect du quota et nouveaux essais de cette seule page"""
+        import aiohttp
+
+        if self.cache:
+            cached = self.cache.get(url, params)
+            if cached is not None:
+                return cached
+
+        attempt = 0
+        while True:
+            await self.scheduler.acquire()
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    async with self._session.get(url, params=params) as response:
+                        self.scheduler.observe(response.headers)
+                        if response.status < 400:
+                            try:
+                                body = await response.json(content_type=None)
+                            except ValueError:
+                                # Corps tronqué ou page d'erreur HTML : transitoire, comme un 5xx
+                                if attempt >= self.scheduler.max_retries:
+                                    raise aiohttp.ClientPayloadError(
+                                        f"Réponse JSON invalide (HTTP {response.status})"
+                                    )
+                                reason = f"Réponse JSON invalide (HTTP {response.status})"
+                            else:
+                                if self.cache and isinstance(body, dict) and "error" not in body:
+                                    self.cache.put(url, params, body)
+                                return body
+
+                        else:
+                            try:
+                                body = json.loads(await response.text())
+                            except ValueError:
+                                body = None
+                            if not is_retryable(response.status, body) or attempt >= self.scheduler.max_retries:
+                                response.raise_for_status()
+                            if is_rate_limited(response.status, body):
+                                self.scheduler.penalize()
+                            retry_after = response.headers.get("Retry-After")
+                            reason = f"HTTP {response.status}"
+
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.scheduler.max_retries:
+                    raise
+                reason = str(e) or e.__class__.__name__
+
+            delay = self.scheduler.retry_delay(attempt, retry_after)
+            if self.verbose:
+                print(f"  ⚠ {reason} - nouvel essai {attempt + 1}/{self.scheduler.max_retries} dans {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def search_ads(
+        self,
+        page_id: str,
+        search_term: str,
+        start_date: str,
+        end_date: str,
+        country: str = "FR",
+        limit: int = 500,
+        checkpoint: Optional[Checkpoint] = None,
+        resume: bool = False,
+        delta: Optional[DeltaTracker] = None
+    ) -> Dict:
+        """
+        Recherche des publicités via l'API Facebook (toutes les pages de résultats)
+
+        Args:
+            checkpoint: Point de reprise (curseur de pagination et pubs récupérées)
+            resume: Reprendre depuis le point de reprise existant
+            delta: Ne garder que les pubs nouvelles ou modifiées, et arrêter la
+                   pagination sur une suite de pubs connues et inactives
+
+        Returns:
+            Dict au même format que FacebookAdsLibraryAPI.search_ads
+        """
+        import aiohttp
+
+        await self.open()
+
+        query = {
+            "page_id": page_id,
+            "search_term": search_term,
+            "start_date": start_date,
+            "end_date": end_date,
+            "country": country
+        }
+        params = build_search_params(
+            self.access_token, page_id, search_term, country, limit,
+            start_date=start_date, end_date=end_date
+        )
+        all_ads = []
+        pages = 0
+        url = self.base_url
+
+        state = checkpoint.load("api", query) if checkpoint and resume else None
+        if state and state.get("next_url"):
+            all_ads = state.get("ads", [])
+            pages = state.get("pages", 0)
+            url = with_access_token(state["next_url"], self.access_token)
+            params = None
+            if self.verbose:
+                print(f"[{page_id}/{country}] ↻ Reprise après {pages} pages ({len(all_ads)} publicités)")
+        elif state:
+            checkpoint.clear()
+
+        def save_checkpoint():
+            # Seules les pubs reçues depuis la sauvegarde précédente sont écrites
+            checkpoint.save("api", query, {
+                "next_url": strip_access_token(url),
+                "pages": pages
+            }, new_ads=all_ads[checkpoint.ads_saved:])
+
+        try:
+            while url:
+                data = await self._get_json(url, params)
+                pages += 1
+
+                if "data" in data:
+                    if delta:
+                        all_ads.extend(
+                            ad for ad in data["data"]
+                            if delta.observe(ad) != DeltaTracker.UNCHANGED
+                        )
+                    else:
+                        all_ads.extend(data["data"])
+                    if self.verbose:
+                        print(f"[{page_id}/{country}] Récupéré {len(all_ads)} publicités...")
+
+                # Pagination
+                url = data.get("paging", {}).get("next")
+                params = None  # Les paramètres sont dans l'URL next
+
+                if delta and delta.should_stop:
+                    if self.verbose:
+                        print(f"[{page_id}/{country}] ✓ Pubs déjà connues et inactives - fin de la pagination")
+                    url = None
+
+                if url and checkpoint and checkpoint.due(pages):
+                    save_checkpoint()
+
+            if checkpoint:
+                checkpoint.clear()
+
+            result = {
+                "success": True,
+                "total_ads": len(all_ads),
+                "ads": all_ads,
+                "query": query
+            }
+            if delta:
+                result["delta"] = delta.stats()
+            return result
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Les pages déjà récupérées sont conservées, avec le curseur en échec
+            result = {
+                "success": False,
+                "error": str(e) or e.__class__.__name__,
+                "message": "Erreur lors de la requête à l'API Facebook",
+                "total_ads": len(all_ads),
+                "ads": all_ads,
+                "failed_page_url": strip_access_token(url),
+                "query": query
+            }
+            if checkpoint:
+                save_checkpoint()
+                result["checkpoint"] = checkpoint.filename
+            return result
+
+    async def search_many(self, queries: List[Dict]) -> List[Dict]:
+        """
+        Lance plusieurs recherches en parallèle
+
+        Args:
+            queries: Liste de dicts avec les arguments de search_ads
+                     (page_id, search_term, start_date, end_date, country, limit)
+
+        Returns:
+            Résultats dans l'ordre des requêtes
+        """
+        await self.open()
+        return list(await asyncio.gather(*[self.search_ads(**query) for query in queries]))
+
+
+def merge_results(results: List[Dict]) -> Dict:
+    """
+    Regroupe les résultats de plusieurs recherches
+
+    Les pubs déjà récupérées par une recherche en échec sont gardées ; ses
+    erreurs restent dans "error" et dans "results".
+    """
+    succeeded = [result for result in results if result.get("success")]
+    all_ads = [ad for result in results for ad in result.get("ads") or []]
+
+    merged = {
+        "success": len(succeeded) == len(results),
+        "total_ads": len(all_ads),
+        "ads": all_ads,
+        "queries_succeeded": len(succeeded),
+        "queries_failed": len(results) - len(succeeded),
+        # Pubs de chaque recherche (par clé) : une base SQLite les rattache à sa requête
+        "results": [
+            dict(
+                {key: value for key, value in result.items() if key != "ads"},
+                ad_ids=[AdIndex.key_for(ad) for ad in result.get("ads") or []]
+            )
+            for result in results
+        ],
+    }
+    if not merged["success"]:
+        merged["message"] = f"{merged['queries_failed']} recherche(s) en échec sur {len(results)}"
+        merged["error"] = "; ".join(result.get("error", "") for result in results if not result.get("success"))
+    return merged
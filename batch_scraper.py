@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Scraping de plusieurs pages / recherches en parallèle.
+
+Le manifeste reprend la forme de config.example.json, avec une liste de
+"search_params". Les jobs tournent sur un pool borné de contextes Playwright
+(API asynchrone) partageant un ou plusieurs navigateurs : chaque job a son
+propre contexte (cookies, cache, routage isolés), fermé à la fin du job.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from ad_index import AdIndex
+from creative_angles import CreativeAnglesAccumulator, compact_angles_state
+from delta_store import DEFAULT_STOP_AFTER, DeltaTracker, KnownAdsStore
+from browser_daemon import launch_browser_async
+from facebook_ads_scraper import (
+    EXPECTED_TOTAL_JS,
+    EXTRACT_ADS_JS,
+    FacebookAdsLibraryScraper,
+    ScrollSession,
+    parse_expected_total,
+    parse_url,
+)
+from network_capture import ResponseCapture
+from playwright_utils import MAX_BLOCKED_MEDIA_URLS, AsyncFeedWaiter, RequestBlocker
+
+
+PLAYWRIGHT_MISSING = {
+    "success": False,
+    "error": "Playwright non installé",
+    "message": "Installez Playwright avec: pip install playwright && playwright install"
+}
+
+DEFAULT_SCRAPER_CONFIG = {
+    "headless": True,
+    "max_scroll": 50,
+    "scroll_pause": 2.5,
+    "incremental": True,
+    "adaptive_wait": True,
+    "scroll_timeout": 10.0,
+    "extraction": "network",
+    "block_profile": "media",
+}
+
+
+def load_manifest(filename: str) -> Dict:
+    """Charge un manifeste de jobs (search_params : objet ou liste d'objets)"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    # Le mode batch ne pilote que le scraper navigateur
+    method = manifest.get("method", "scraper")
+    if method != "scraper":
+        raise ValueError(f"Méthode non prise en charge en mode batch : {method} (seule 'scraper' l'est)")
+
+    search_params = manifest.get("search_params", [])
+    if isinstance(search_params, dict):
+        search_params = [search_params]
+    manifest["search_params"] = search_params
+    return manifest
+
+
+def normalize_job(job: Dict) -> Dict:
+    """Complète un job défini par une URL Ads Library"""
+    job = dict(job)
+    if job.get("url"):
+        for key, value in parse_url(job["url"]).items():
+            job.setdefault(key, value)
+    job.setdefault("country", "FR")
+    return job
+
+
+def job_label(job: Dict) -> str:
+    return f"{job.get('page_id') or '-'}/{job.get('search_term') or '-'}/{job.get('country')}"
+
+
+class BatchScraper:
+    """Exécute des jobs de scraping sur un pool borné de contextes navigateur"""
+
+    def __init__(
+        self,
+        scraper_config: Optional[Dict] = None,
+        concurrency: int = 4,
+        browsers: int = 1,
+        output_dir: Optional[str] = None,
+        known_ads: Optional[KnownAdsStore] = None,
+        delta_stop_after: int = DEFAULT_STOP_AFTER,
+        pretty_print: bool = True
+    ):
+        """
+        Args:
+            scraper_config: Options de scraping (mêmes clés que search_ads)
+            concurrency: Nombre maximum de jobs (contextes) simultanés
+            browsers: Nombre de navigateurs Chromium partagés par les jobs
+            output_dir: Dossier où écrire le résultat de chaque job (optionnel)
+            known_ads: Stock des pubs déjà collectées (scraping différentiel des
+                       jobs qui ont un page_id)
+            delta_stop_after: Pubs connues et inactives consécutives avant d'arrêter un job
+            pretty_print: JSON indenté pour les résultats par job
+        """
+        self.config = dict(DEFAULT_SCRAPER_CONFIG)
+        self.config.update(scraper_config or {})
+        self.concurrency = max(1, concurrency)
+        self.browsers = max(1, browsers)
+        self.output_dir = output_dir
+        self.known_ads = known_ads
+        self.delta_stop_after = delta_stop_after
+        self.pretty_print = pretty_print
+        self.scraper = FacebookAdsLibraryScraper()
+
+    def run(self, jobs: List[Dict]) -> Dict:
+        """Lance tous les jobs et agrège les résultats"""
+        if not self.scraper.playwright_available:
+            return PLAYWRIGHT_MISSING
+        return self._aggregate(self.run_jobs(jobs))
+
+    def run_jobs(self, jobs: List[Dict]) -> List[Dict]:
+        """Lance tous les jobs et renvoie le résultat de chacun, dans l'ordre"""
+        if not self.scraper.playwright_available:
+            return [dict(PLAYWRIGHT_MISSING) for _ in jobs]
+        return asyncio.run(self._run(jobs))
+
+    async def _run(self, jobs: List[Dict]) -> List[Dict]:
+        from playwright.async_api import async_playwright
+
+        jobs = [normalize_job(job) for job in jobs]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with async_playwright() as p:
+            # Navigateur partagé (browser_daemon.py) s'il tourne, sinon lancés pour ce batch
+            launched = [
+                await launch_browser_async(p, headless=self.config["headless"])
+                for _ in range(min(self.browsers, len(jobs) or 1))
+            ]
+            browsers = [browser for browser, _ in launched]
+            self._context_options = launched[0][1]
+
+            async def run_bounded(job_num: int, job: Dict) -> Dict:
+                async with semaphore:
+                    browser = browsers[job_num % len(browsers)]
+                    return await self._run_job(browser, job_num, job)
+
+            results = await asyncio.gather(*[
+                run_bounded(job_num, job) for job_num, job in enumerate(jobs)
+            ], return_exceptions=True)
+            # Erreur hors du scraping lui-même (sauvegarde, fermeture du contexte...)
+            results = [
+                self._job_error(job, str(result), f"Erreur lors du job: {result}")
+                if isinstance(result, Exception) else result
+                for job, result in zip(jobs, results)
+            ]
+
+            for browser in browsers:
+                await browser.close()
+
+        if self.known_ads:
+            self.known_ads.save()
+        return list(results)
+
+    async def _run_job(self, browser, job_num: int, job: Dict) -> Dict:
+        """Scrape un job dans son propre contexte ; les erreurs restent locales au job"""
+        config = dict(self.config)
+        config.update(job.get("scraper_config", {}))
+        label = job_label(job)
+        print(f"[Job {job_num + 1}] Démarrage : {label}")
+
+        try:
+            start_dt = datetime.strptime(job["start_date"], "%Y-%m-%d")
+            end_dt = datetime.strptime(job["end_date"], "%Y-%m-%d")
+        except (KeyError, ValueError):
+            return self._job_error(job, "Format de date invalide", "Utilisez le format YYYY-MM-DD")
+
+        url = self.scraper._build_url(
+            job.get("page_id", ""), job.get("search_term", ""),
+            job["start_date"], job["end_date"], job["country"]
+        )
+        page_id = job.get("page_id")
+        delta = None
+        if self.known_ads and page_id:
+            delta = DeltaTracker(self.known_ads.known(page_id), stop_after=self.delta_stop_after)
+        session = ScrollSession(
+            start_dt, end_dt, self.scraper._parse_ad_date,
+            incremental=config["incremental"], verbose=False, delta=delta
+        )
+
+        context = None
+        try:
+            context = await browser.new_context(**self._context_options)
+            blocker = await RequestBlocker(config["block_profile"]).install_async(context)
+            page = await context.new_page()
+            waiter = AsyncFeedWaiter(page, timeout=config["scroll_timeout"]) if config["adaptive_wait"] else None
+            capture = ResponseCapture(page) if config["extraction"] == "network" else None
+
+            await page.goto(url, wait_until="networkidle", timeout=60000)
+            if waiter:
+                await waiter.wait(timeout=15.0, quiet=1.5)
+            else:
+                await asyncio.sleep(4)
+
+            session.expected_total = parse_expected_total(await page.evaluate(EXPECTED_TOTAL_JS))
+
+            for _ in range(config["max_scroll"]):
+                current_ads = await capture.drain_async() if capture else []
+                from_network = bool(current_ads)
+                if not from_network:
+                    current_ads = self.scraper._finalize_dom_ads(await page.evaluate(
+                        EXTRACT_ADS_JS,
+                        {
+                            "incremental": config["incremental"],
+                            "blockedMedia": blocker.drain_media_urls(),
+                            "maxBlockedMedia": MAX_BLOCKED_MEDIA_URLS,
+                        }
+                    ))
+
+                if not session.process(current_ads, from_network=from_network):
+                    break
+
+                await page.evaluate("window.scrollBy(0, window.innerHeight)")
+                if waiter:
+                    await waiter.wait()
+                else:
+                    await asyncio.sleep(config["scroll_pause"])
+
+            query = {
+                "page_id": job.get("page_id", ""),
+                "search_term": job.get("search_term", ""),
+                "start_date": job["start_date"],
+                "end_date": job["end_date"],
+                "country": job["country"],
+                "url": url
+            }
+            result = self.scraper._build_result(session, query, blocker)
+            if delta:
+                self.known_ads.update(page_id, delta)
+
+        except Exception as e:
+            import traceback
+            result = self._job_error(job, str(e), f"Erreur lors du scraping: {str(e)}")
+            result["traceback"] = traceback.format_exc()
+
+        finally:
+            if context:
+                await context.close()
+
+        status = f"{result.get('total_ads', 0)} pubs" if result.get("success") else f"échec ({result.get('error')})"
+        print(f"[Job {job_num + 1}] Terminé : {label} → {status}")
+
+        self._save_job_result(job_num, job, result)
+        return result
+
+    @staticmethod
+    def _job_error(job: Dict, error: str, message: str) -> Dict:
+        return {
+            "success": False,
+            "error": error,
+            "message": message,
+            "query": {key: job.get(key) for key in ("page_id", "search_term", "start_date", "end_date", "country")}
+        }
+
+    def _save_job_result(self, job_num: int, job: Dict, result: Dict):
+        if not self.output_dir:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        slug = re.sub(r'[^\w-]+', '_', f"{job.get('page_id') or job.get('search_term')}_{job['country']}")
+        filename = os.path.join(self.output_dir, f"{job_num + 1:03d}_{slug}.json")
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(compact_angles_state(result), f, indent=2 if self.pretty_print else None, ensure_ascii=False)
+
+    def _aggregate(self, results: List[Dict]) -> Dict:
+        """Résultat global : compteurs, publicités dédupliquées et angles créatifs"""
+        ad_index = AdIndex()
+        for result in results:
+            for ad in result.get("ads", []):
+                ad_index.add(ad)
+
+        all_ads = ad_index.ads()
+        succeeded = sum(1 for result in results if result.get("success"))
+        # Pubs dédupliquées entre jobs : l'état des angles est recalculé plutôt que fusionné
+        angles = CreativeAnglesAccumulator().add_many(all_ads)
+
+        return {
+            "success": succeeded == len(results),
+            "total_jobs": len(results),
+            "jobs_succeeded": succeeded,
+            "jobs_failed": len(results) - succeeded,
+            "total_ads": len(all_ads),
+            "ads": all_ads,
+            "creative_angles": angles.result(),
+            "creative_angles_state": angles.to_dict(),
+            "jobs": [
+                dict(
+                    {
+                        key: value for key, value in result.items()
+                        if key not in ("ads", "creative_angles", "creative_angles_state")
+                    },
+                    ad_ids=[AdIndex.key_for(ad) for ad in result.get("ads", [])]
+                )
+                for result in results
+            ],
+            "scraped_at": datetime.now().isoformat()
+        }
+
+
+def run_batch(
+    manifest: Dict,
+    concurrency: Optional[int] = None,
+    known_ads: Optional[KnownAdsStore] = None
+) -> Dict:
+    """Exécute un manifeste chargé par load_manifest"""
+    batch_config = manifest.get("batch", {})
+    output_config = manifest.get("output", {})
+    delta_config = manifest.get("delta", {})
+
+    if known_ads is None and delta_config.get("store"):
+        known_ads = KnownAdsStore(delta_config["store"])
+
+    batch = BatchScraper(
+        scraper_config=manifest.get("scraper_config"),
+        concurrency=concurrency or batch_config.get("concurrency", 4),
+        browsers=batch_config.get("browsers", 1),
+        output_dir=output_config.get("directory"),
+        known_ads=known_ads,
+        delta_stop_after=delta_config.get("stop_after", DEFAULT_STOP_AFTER),
+        pretty_print=output_config.get("pretty_print", True)
+    )
+    return batch.run(manifest["search_params"])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Scraping Facebook Ads Library de plusieurs pages en parallèle"
+    )
+    parser.add_argument(
+        "manifest",
+        help="Manifeste JSON (voir config.batch.example.json)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Nombre de jobs simultanés (défaut: batch.concurrency du manifeste, ou 4)"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="Fichier de sortie JSON agrégé (défaut: output.filename du manifeste)"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        manifest = load_manifest(args.manifest)
+    except ValueError as e:
+        print(f"✗ Manifeste invalide : {e}")
+        sys.exit(1)
+    output_config = manifest.get("output", {})
+    output = args.output or output_config.get("filename", "facebook_ads_batch.json")
+
+    result = run_batch(manifest, concurrency=args.concurrency)
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(compact_angles_state(result), f, indent=2 if output_config.get("pretty_print", True) else None, ensure_ascii=False)
+
+    if result.get("total_jobs"):
+        print(f"\n✓ {result['jobs_succeeded']}/{result['total_jobs']} jobs réussis, {result['total_ads']} publicités")
+        print(f"✓ Données sauvegardées dans: {output}")
+    else:
+        print(f"\n✗ Erreur: {result.get('message', 'Aucun job dans le manifeste')}")
+
+
+if __name__ == "__main__":
+    main()
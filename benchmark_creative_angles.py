@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'analyse des angles créatifs sur des pubs synthétiques.
+
+Compare analyze_creative_angles (un passage, ensembles ordonnés) à
+l'ancienne implémentation par listes, vérifie que les deux résultats sont
+identiques, et montre l'évolution du temps avec le nombre de pubs.
+
+    python benchmark_creative_angles.py
+    python benchmark_creative_angles.py --sizes 1000 10000 100000 --legacy-max 20000
+"""
+
+import argparse
+import random
+import re
+import time
+from collections import Counter
+from typing import Dict, List
+
+from creative_angles import analyze_creative_angles
+
+
+WORDS = [
+    "ventre", "probiotiques", "microbiote", "santé", "digestion", "cure",
+    "flore", "intestinale", "équilibre", "bien-être", "naturel", "offre",
+    "promo", "livraison", "gratuite", "découvrez", "pack", "glutamine",
+    "stress", "sommeil", "énergie", "minceur", "métabolisme", "immunité",
+]
+CTAS = ["En savoir plus", "Acheter", "S'inscrire", "Profiter de l'offre", "Learn More", "Shop Now"]
+PLATFORMS = ["Facebook", "Instagram", "Messenger", "Audience Network"]
+
+
+def synthetic_ads(count: int, seed: int = 42) -> List[Dict]:
+    """Pubs au format du scraper ; ~1/3 des headlines et textes sont uniques"""
+    rng = random.Random(seed)
+
+    def sentence(words: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+    headline_pool = [f"{sentence(4)} #{i}" for i in range(max(1, count // 3))]
+    body_pool = [f"{sentence(25)} {i}" for i in range(max(1, count // 3))]
+
+    ads = []
+    for i in range(count):
+        ads.append({
+            "id": str(10 ** 15 + i),
+            "headlines": rng.sample(headline_pool, k=min(2, len(headline_pool))),
+            "body_texts": [rng.choice(body_pool)],
+            "call_to_actions": [rng.choice(CTAS)],
+            "images": [{"src": f"https://example.com/{i}.jpg"}] if rng.random() < 0.7 else [],
+            "videos": [{"src": f"https://example.com/{i}.mp4"}] if rng.random() < 0.3 else [],
+            "platforms": rng.sample(PLATFORMS, k=rng.randint(1, 2)),
+        })
+    return ads
+
+
+def legacy_analyze_creative_angles(ads: List[Dict]) -> Dict:
+    """Ancienne implémentation (unicité par listes, quadratique), pour comparaison"""
+    angles = {
+        "unique_headlines": [],
+        "unique_body_texts": [],
+        "unique_ctas": [],
+        "formats": {
+            "image_only": 0,
+            "video_only": 0,
+            "image_and_text": 0,
+            "video_and_text": 0
+        },
+        "platforms": {},
+        "common_themes": []
+    }
+
+    all_text = []
+
+    for ad in ads:
+        for headline in ad.get("headlines", []):
+            if headline not in angles["unique_headlines"]:
+                angles["unique_headlines"].append(headline)
+
+        for body in ad.get("body_texts", []):
+            if body not in angles["unique_body_texts"]:
+                angles["unique_body_texts"].append(body)
+            all_text.append(body.lower())
+
+        for cta in ad.get("call_to_actions", []):
+            if cta not in angles["unique_ctas"]:
+                angles["unique_ctas"].append(cta)
+
+        has_image = len(ad.get("images", [])) > 0
+        has_video = len(ad.get("videos", [])) > 0
+        has_text = len(ad.get("body_texts", [])) > 0
+
+        if has_image and not has_video and not has_text:
+            angles["formats"]["image_only"] += 1
+        elif has_video and not has_image:
+            angles["formats"]["video_only"] += 1
+        elif has_image and has_text:
+            angles["formats"]["image_and_text"] += 1
+        elif has_video and has_text:
+            angles["formats"]["video_and_text"] += 1
+
+        for platform in ad.get("platforms", []):
+            angles["platforms"][platform] = angles["platforms"].get(platform, 0) + 1
+
+    words = []
+    for text in all_text:
+        words.extend(re.findall(r'\b\w{4,}\b', text))
+
+    common_words = Counter(words).most_common(20)
+    angles["common_themes"] = [
+        {"word": word, "count": count}
+        for word, count in common_words
+    ]
+
+    angles["total_unique_headlines"] = len(angles["unique_headlines"])
+    angles["total_unique_body_texts"] = len(angles["unique_body_texts"])
+    angles["total_unique_ctas"] = len(angles["unique_ctas"])
+
+    return angles
+
+
+def timed(func, ads: List[Dict]):
+    start = time.perf_counter()
+    result = func(ads)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'analyse des angles créatifs")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="Nombres de pubs synthétiques (défaut: 1000 10000 100000)"
+    )
+    parser.add_argument(
+        "--legacy-max",
+        type=int,
+        default=20000,
+        help="Taille maximale pour l'ancienne implémentation, quadratique (défaut: 20000)"
+    )
+    args = parser.parse_args()
+
+    print(f"{'Pubs':>10} | {'Linéaire':>10} | {'Ancienne':>10} | {'Gain':>8} | Résultats")
+    print("-" * 62)
+
+    for size in args.sizes:
+        ads = synthetic_ads(size)
+        result, duration = timed(analyze_creative_angles, ads)
+
+        if size <= args.legacy_max:
+            legacy_result, legacy_duration = timed(legacy_analyze_creative_angles, ads)
+            identical = "identiques" if result == legacy_result else "DIFFÉRENTS"
+            print(f"{size:>10} | {duration:>9.3f}s | {legacy_duration:>9.3f}s | "
+                  f"{legacy_duration / duration:>7.1f}x | {identical}")
+        else:
+            print(f"{size:>10} | {duration:>9.3f}s | {'-':>10} | {'-':>8} | -")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Navigateur Chromium partagé entre les runs de scraping.
+
+Lancer Chromium, créer le contexte et passer la première visite (bandeau de
+consentement, caches vides) coûte plusieurs secondes par commande. Le daemon
+garde un Chromium ouvert sur un profil persistant (cookies, cache HTTP),
+déjà passé par la bibliothèque publicitaire, et expose le protocole CDP en
+local. Les scrapers s'y attachent (connect_over_cdp) au lieu de lancer leur
+propre navigateur, et ouvrent un contexte à partir de son storage_state :
+quelques millisecondes au lieu de quelques secondes.
+
+    python browser_daemon.py start &     # une fois
+    python facebook_ads_scraper.py ...   # s'attache automatiquement
+    python browser_daemon.py stop
+
+Sans daemon en marche, les scrapers lancent leur navigateur comme avant.
+"""
+
+import json
+import os
+import signal
+import sys
+import time
+import urllib.request
+from datetime import datetime
+from typing import Dict, Optional
+
+from playwright_utils import CONTEXT_OPTIONS
+
+
+DEFAULT_ENDPOINT_FILE = ".browser_daemon.json"
+DEFAULT_PROFILE_DIR = ".browser_profile"
+DEFAULT_PORT = 9222
+WARMUP_URL = "https://www.facebook.com/ads/library/"
+
+# Sauvegarde périodique des cookies (consentement, session) pour les clients
+STORAGE_STATE_INTERVAL = 300
+
+# Désactive l'attachement au daemon (ex: FB_ADS_NO_DAEMON=1)
+NO_DAEMON_ENV = "FB_ADS_NO_DAEMON"
+
+
+def read_endpoint(endpoint_file: str = DEFAULT_ENDPOINT_FILE) -> Optional[Dict]:
+    """Adresse CDP du daemon s'il répond, sinon None"""
+    if os.environ.get(NO_DAEMON_ENV) or not os.path.exists(endpoint_file):
+        return None
+    try:
+        with open(endpoint_file, 'r', encoding='utf-8') as f:
+            endpoint = json.load(f)
+        with urllib.request.urlopen(endpoint["cdp_url"] + "/json/version", timeout=0.5):
+            return endpoint
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def context_options(endpoint: Optional[Dict] = None) -> Dict:
+    """Options de contexte, avec les cookies du daemon quand on s'y attache"""
+    options = dict(CONTEXT_OPTIONS)
+    if endpoint and endpoint.get("storage_state") and os.path.exists(endpoint["storage_state"]):
+        options["storage_state"] = endpoint["storage_state"]
+    return options
+
+
+def launch_browser(playwright, headless: bool = True, endpoint_file: str = DEFAULT_ENDPOINT_FILE):
+    """
+    Navigateur du daemon s'il tourne, sinon un Chromium lancé pour ce run
+
+    Returns:
+        (browser, options de contexte). browser.close() ne ferme que les
+        contextes du run quand le navigateur est celui du daemon.
+    """
+    endpoint = read_endpoint(endpoint_file)
+    if endpoint:
+        browser = playwright.chromium.connect_over_cdp(endpoint["cdp_url"])
+        print(f"↻ Navigateur du daemon ({endpoint['cdp_url']})")
+        return browser, context_options(endpoint)
+    return playwright.chromium.launch(headless=headless), context_options()
+
+
+async def launch_browser_async(playwright, headless: bool = True, endpoint_file: str = DEFAULT_ENDPOINT_FILE):
+    """launch_browser pour l'API asynchrone de Playwright"""
+    endpoint = read_endpoint(endpoint_file)
+    if endpoint:
+        browser = await playwright.chromium.connect_over_cdp(endpoint["cdp_url"])
+        print(f"↻ Navigateur du daemon ({endpoint['cdp_url']})")
+        return browser, context_options(endpoint)
+    return await playwright.chromium.launch(headless=headless), context_options()
+
+
+def serve(
+    port: int = DEFAULT_PORT,
+    profile_dir: str = DEFAULT_PROFILE_DIR,
+    headless: bool = True,
+    endpoint_file: str = DEFAULT_ENDPOINT_FILE,
+    warmup_url: str = WARMUP_URL
+):
+    """Lance le navigateur partagé et le garde ouvert jusqu'à SIGINT / SIGTERM"""
+    from playwright.sync_api import sync_playwright
+
+    storage_state = os.path.join(profile_dir, "storage_state.json")
+    running = True
+
+    def stop(signum, frame):
+        nonlocal running
+        running = False
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    with sync_playwright() as p:
+        context = p.chromium.launch_persistent_context(
+            profile_dir,
+            headless=headless,
+            args=[f"--remote-debugging-port={port}", "--remote-debugging-address=127.0.0.1"],
+            **CONTEXT_OPTIONS
+        )
+
+        # Première visite : consentement, cookies et caches prêts pour les clients
+        page = context.pages[0] if context.pages else context.new_page()
+        try:
+            page.goto(warmup_url, wait_until="networkidle", timeout=60000)
+        except Exception as e:
+            print(f"⚠ Préchauffage incomplet : {e}")
+        context.storage_state(path=storage_state)
+
+        endpoint = {
+            "cdp_url": f"http://127.0.0.1:{port}",
+            "pid": os.getpid(),
+            "profile_dir": profile_dir,
+            "storage_state": storage_state,
+            "started_at": datetime.now().isoformat(),
+        }
+        with open(endpoint_file, 'w', encoding='utf-8') as f:
+            json.dump(endpoint, f, indent=2)
+        print(f"✓ Navigateur prêt : {endpoint['cdp_url']} (profil {profile_dir})")
+
+        try:
+            last_save = time.monotonic()
+            while running:
+                time.sleep(1)
+                if time.monotonic() - last_save >= STORAGE_STATE_INTERVAL:
+                    context.storage_state(path=storage_state)
+                    last_save = time.monotonic()
+        finally:
+            if os.path.exists(endpoint_file):
+                os.remove(endpoint_file)
+            context.close()
+    print("✓ Navigateur arrêté")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Navigateur partagé (CDP) pour les scrapers Facebook Ads")
+    parser.add_argument("action", choices=["start", "status", "stop"])
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port CDP (défaut: {DEFAULT_PORT})")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE_DIR, help=f"Profil persistant (défaut: {DEFAULT_PROFILE_DIR})")
+    parser.add_argument("--endpoint-file", default=DEFAULT_ENDPOINT_FILE, help=f"Fichier d'adresse (défaut: {DEFAULT_ENDPOINT_FILE})")
+    parser.add_argument("--no-headless", action="store_true", help="Afficher le navigateur")
+    args = parser.parse_args()
+
+    endpoint = read_endpoint(args.endpoint_file)
+
+    if args.action == "start":
+        if endpoint:
+            print(f"✓ Déjà en marche : {endpoint['cdp_url']} (pid {endpoint['pid']})")
+            return
+        try:
+            serve(args.port, args.profile, headless=not args.no_headless, endpoint_file=args.endpoint_file)
+        except ImportError:
+            print("✗ Playwright non installé : pip install playwright && playwright install")
+            sys.exit(1)
+
+    elif args.action == "status":
+        if endpoint:
+            print(f"✓ En marche : {endpoint['cdp_url']} (pid {endpoint['pid']}, depuis {endpoint['started_at']})")
+        else:
+            print("✗ Aucun navigateur partagé en marche")
+            sys.exit(1)
+
+    else:
+        if not endpoint:
+            print("✗ Aucun navigateur partagé en marche")
+            sys.exit(1)
+        os.kill(endpoint["pid"], signal.SIGTERM)
+        print(f"✓ Arrêt demandé (pid {endpoint['pid']})")
+
+
+if __name__ == "__main__":
+    main()
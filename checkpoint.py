@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Points de reprise pour les runs longs (scraper et API).
+
+L'état est écrit périodiquement dans un fichier JSON (écriture atomique) :
+- scraper : nombre de scrolls et pubs hors période déjà vues ;
+- API : curseur paging.next (sans le token) et nombre de pages lues.
+
+Les pubs collectées (ou leurs seules clés, en sortie JSONL où le flux fait
+foi) vont dans un fichier JSONL à côté, complété à chaque sauvegarde au lieu
+d'être réécrit : le coût d'une sauvegarde ne grandit pas avec le run.
+
+Avec --resume, le run repart de ce point au lieu de tout recommencer.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+
+# Champs de la requête qui doivent correspondre pour reprendre un run
+QUERY_KEYS = ("page_id", "search_term", "start_date", "end_date", "country")
+
+
+def default_checkpoint_path(output_file: str) -> str:
+    """Fichier de reprise associé à un fichier de sortie"""
+    return output_file + ".checkpoint.json"
+
+
+class Checkpoint:
+    """Sauvegarde et relecture de l'état d'un run"""
+
+    def __init__(self, filename: str, interval: int = 5):
+        """
+        Args:
+            filename: Fichier de reprise
+            interval: Sauvegarde tous les `interval` scrolls / pages d'API
+        """
+        self.filename = filename
+        self.ads_filename = os.path.splitext(filename)[0] + ".ads.jsonl"
+        self.interval = max(1, interval)
+        # Pubs déjà écrites dans ads_filename
+        self.ads_saved = 0
+
+    def load(self, kind: str, query: Dict) -> Optional[Dict]:
+        """
+        Relit l'état sauvegardé s'il correspond au même type de run et à la même requête
+
+        Returns:
+            L'état (pubs sauvegardées dans "ads"), ou None s'il n'y a rien à reprendre
+        """
+        if not os.path.exists(self.filename):
+            return None
+
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            print(f"⚠ Point de reprise illisible, ignoré : {self.filename}")
+            return None
+
+        saved_query = state.get("query", {})
+        if state.get("kind") != kind or any(
+            str(saved_query.get(key) or "") != str(query.get(key) or "") for key in QUERY_KEYS
+        ):
+            print(f"⚠ Point de reprise pour une autre recherche, ignoré : {self.filename}")
+            return None
+
+        try:
+            state["ads"] = self._load_ads(state.pop("ads_saved", 0))
+        except (OSError, ValueError):
+            print(f"⚠ Pubs du point de reprise illisibles, ignoré : {self.ads_filename}")
+            return None
+        return state
+
+    def _load_ads(self, count: int) -> List[Dict]:
+        """
+        Relit les `count` pubs de la dernière sauvegarde
+
+        Les lignes ajoutées ensuite (run interrompu entre l'ajout des pubs et
+        l'écriture de l'état) sont coupées : les prochains ajouts suivent l'état.
+        """
+        if not count:
+            return []
+        ads = []
+        with open(self.ads_filename, 'rb+') as f:
+            while len(ads) < count:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    raise ValueError("fichier des pubs incomplet")
+                ads.append(json.loads(line))
+            f.truncate(f.tell())
+        self.ads_saved = count
+        return ads
+
+    def save(self, kind: str, query: Dict, state: Dict, new_ads: Iterable[Dict] = ()):
+        """
+        Écrit l'état (fichier temporaire puis renommage, jamais de fichier à moitié écrit)
+
+        Args:
+            new_ads: Pubs collectées depuis la sauvegarde précédente, ajoutées
+                     au fichier des pubs
+        """
+        # Premier point de reprise du run : un fichier des pubs d'un run précédent est écrasé
+        with open(self.ads_filename, 'a' if self.ads_saved else 'w', encoding='utf-8') as f:
+            for ad in new_ads:
+                f.write(json.dumps(ad, ensure_ascii=False) + "\n")
+                self.ads_saved += 1
+
+        record = dict(state)
+        record["ads_saved"] = self.ads_saved
+        record["kind"] = kind
+        record["query"] = {key: query.get(key) for key in QUERY_KEYS}
+        record["saved_at"] = datetime.now().isoformat()
+
+        tmp_filename = self.filename + ".tmp"
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_filename, self.filename)
+
+    def due(self, counter: int) -> bool:
+        """Indique si une sauvegarde est prévue après `counter` scrolls / pages"""
+        return counter > 0 and counter % self.interval == 0
+
+    def clear(self):
+        """Supprime le point de reprise (run terminé)"""
+        for filename in (self.filename, self.ads_filename):
+            if os.path.exists(filename):
+                os.remove(filename)
+        self.ads_saved = 0
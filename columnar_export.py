@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Export / import des publicités au format colonnes (Parquet ou Arrow IPC).
+
+Une ligne par publicité ; les listes imbriquées sont aplaties en colonnes
+typées (images -> image_src / image_alt / image_width / image_height,
+vidéos -> video_src / video_poster, plateformes, call-to-actions...). Une
+analyse ne charge ainsi que les colonnes dont elle a besoin. Les champs
+hors schéma (API Graph...) sont gardés en JSON dans la colonne `extra`, et
+le reste du résultat (query, stats, angles) dans les métadonnées du
+fichier : la conversion JSON -> Parquet -> JSON restitue le même résultat.
+
+pyarrow est optionnel : pip install pyarrow
+"""
+
+import json
+import sys
+from typing import Dict, List, Optional
+
+
+PYARROW_MISSING = "pyarrow non installé : pip install pyarrow"
+
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".feather")
+
+RESULT_METADATA_KEY = b"facebook_ads_result"
+
+# Colonnes scalaires, par type
+STRING_FIELDS = (
+    "id", "library_id", "source", "page_id", "page_name", "date_started",
+    "date_start", "date_end", "display_format", "collation_id",
+    "ad_library_url", "text_preview", "full_text", "full_section",
+)
+INT_FIELDS = ("timestamp", "collation_count")
+BOOL_FIELDS = ("is_active",)
+
+# Colonnes listes de chaînes
+LIST_FIELDS = (
+    "headlines", "body_texts", "call_to_actions", "external_links",
+    "platforms", "link_descriptions", "captions", "text_lines",
+)
+
+# Listes d'objets aplaties en colonnes parallèles : champ -> {sous-clé: colonne}
+NESTED_FIELDS = {
+    "images": {"src": "image_src", "alt": "image_alt", "width": "image_width", "height": "image_height"},
+    "videos": {"src": "video_src", "poster": "video_poster"},
+}
+NESTED_INT_KEYS = {"width", "height"}
+
+KNOWN_FIELDS = set(STRING_FIELDS) | set(INT_FIELDS) | set(BOOL_FIELDS) | set(LIST_FIELDS) | set(NESTED_FIELDS)
+
+
+def is_columnar(filename: str) -> bool:
+    """Indique si un fichier est au format Parquet ou Arrow"""
+    return filename.lower().endswith(PARQUET_EXTENSIONS + ARROW_EXTENSIONS)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError(PYARROW_MISSING)
+    return pyarrow
+
+
+def arrow_schema():
+    """Schéma Arrow d'une publicité aplatie"""
+    pa = _require_pyarrow()
+
+    fields = [pa.field(name, pa.string()) for name in STRING_FIELDS]
+    fields += [pa.field(name, pa.int64()) for name in INT_FIELDS]
+    fields += [pa.field(name, pa.bool_()) for name in BOOL_FIELDS]
+    fields += [pa.field(name, pa.list_(pa.string())) for name in LIST_FIELDS]
+    for subkeys in NESTED_FIELDS.values():
+        for subkey, column in subkeys.items():
+            value_type = pa.int32() if subkey in NESTED_INT_KEYS else pa.string()
+            fields.append(pa.field(column, pa.list_(value_type)))
+    fields += [
+        pa.field("extra", pa.string()),
+        pa.field("_keys", pa.list_(pa.string())),
+    ]
+    return pa.schema(fields)
+
+
+def _conforms(name: str, value) -> bool:
+    """Indique si une valeur tient dans la colonne typée de son champ"""
+    if value is None:
+        return True
+    if name in STRING_FIELDS:
+        return isinstance(value, str)
+    if name in INT_FIELDS:
+        return isinstance(value, int) and not isinstance(value, bool)
+    if name in BOOL_FIELDS:
+        return isinstance(value, bool)
+    if name in LIST_FIELDS:
+        return isinstance(value, list) and all(isinstance(item, str) for item in value)
+    if name in NESTED_FIELDS:
+        return isinstance(value, list) and all(
+            isinstance(item, dict) and set(item) <= set(NESTED_FIELDS[name]) and all(
+                isinstance(item[key], int) and not isinstance(item[key], bool)
+                if key in NESTED_INT_KEYS else isinstance(item[key], str)
+                for key in item
+            )
+            for item in value
+        )
+    return False
+
+
+def flatten_ad(ad: Dict) -> Dict:
+    """Publicité -> ligne à colonnes plates"""
+    # Champ connu mais de type inattendu : gardé tel quel dans `extra`
+    extra = {key: value for key, value in ad.items() if not _conforms(key, value)}
+
+    row = {
+        name: None if name in extra else ad.get(name)
+        for name in STRING_FIELDS + INT_FIELDS + BOOL_FIELDS + LIST_FIELDS
+    }
+
+    for field, subkeys in NESTED_FIELDS.items():
+        items = None if field in extra else ad.get(field)
+        for subkey, column in subkeys.items():
+            row[column] = None if items is None else [item.get(subkey) for item in items]
+
+    row["extra"] = json.dumps(extra, ensure_ascii=False) if extra else None
+    # Ordre et présence des champs d'origine (absents != vides)
+    row["_keys"] = list(ad.keys())
+    return row
+
+
+def unflatten_row(row: Dict) -> Dict:
+    """Ligne à colonnes plates -> publicité au format JSON d'origine"""
+    extra = json.loads(row["extra"]) if row.get("extra") else {}
+    keys = row.get("_keys") or [key for key in KNOWN_FIELDS if row.get(key) is not None]
+
+    ad = {}
+    for key in keys:
+        if key in extra:
+            ad[key] = extra[key]
+        elif key in NESTED_FIELDS:
+            subkeys = NESTED_FIELDS[key]
+            columns = {subkey: row.get(column) or [] for subkey, column in subkeys.items()}
+            count = max(len(values) for values in columns.values())
+            ad[key] = [
+                {
+                    subkey: values[i] for subkey, values in columns.items()
+                    # width/height n'existent que pour les images du DOM
+                    if i < len(values) and not (values[i] is None and subkey in NESTED_INT_KEYS)
+                }
+                for i in range(count)
+            ]
+        else:
+            ad[key] = row.get(key)
+    return ad
+
+
+def ads_to_table(ads: List[Dict], result: Optional[Dict] = None):
+    """
+    Construit une table Arrow
+
+    Args:
+        ads: Publicités (v1, réseau ou v2)
+        result: Résultat d'origine, gardé (sans les pubs) dans les métadonnées
+    """
+    pa = _require_pyarrow()
+
+    schema = arrow_schema()
+    if result is not None:
+        metadata = {key: value for key, value in result.items() if key != "ads"}
+        schema = schema.with_metadata({RESULT_METADATA_KEY: json.dumps(metadata, ensure_ascii=False)})
+    return pa.Table.from_pylist([flatten_ad(ad) for ad in ads], schema=schema)
+
+
+def table_to_ads(table) -> List[Dict]:
+    return [unflatten_row(row) for row in table.to_pylist()]
+
+
+def write_columnar(result: Dict, filename: str, ads: Optional[List[Dict]] = None):
+    """Écrit un résultat de scraping en Parquet (.parquet) ou Arrow IPC (.arrow/.feather)"""
+    table = ads_to_table(ads if ads is not None else result.get("ads", []), result)
+
+    if filename.lower().endswith(ARROW_EXTENSIONS):
+        import pyarrow.feather as feather
+        feather.write_feather(table, filename, compression="zstd")
+    else:
+        import pyarrow.parquet as pq
+        pq.write_table(table, filename, compression="zstd")
+
+
+def read_table(filename: str, columns: Optional[List[str]] = None):
+    """
+    Lit la table Arrow, éventuellement limitée à quelques colonnes
+
+    Exemple : read_table("ads.parquet", ["page_id", "platforms"]) ne lit que
+    ces deux colonnes sur disque.
+    """
+    _require_pyarrow()
+
+    if filename.lower().endswith(ARROW_EXTENSIONS):
+        import pyarrow.feather as feather
+        return feather.read_table(filename, columns=columns)
+
+    import pyarrow.parquet as pq
+    return pq.read_table(filename, columns=columns)
+
+
+def load_columnar_result(filename: str) -> Dict:
+    """Reconstitue le résultat JSON d'origine depuis un fichier Parquet / Arrow"""
+    table = read_table(filename)
+    metadata = (table.schema.metadata or {}).get(RESULT_METADATA_KEY)
+
+    result = json.loads(metadata) if metadata else {"success": True}
+    result["ads"] = table_to_ads(table)
+    result.setdefault("total_ads", len(result["ads"]))
+    return result
+
+
+def main():
+    import argparse
+
+    from ads_io import JsonlSink, is_jsonl, load_jsonl_results
+
+    parser = argparse.ArgumentParser(
+        description="Conversion JSON/JSONL <-> Parquet/Arrow des résultats Facebook Ads"
+    )
+    parser.add_argument("input", help="Fichier d'entrée (.json, .jsonl, .parquet, .arrow)")
+    parser.add_argument("output", help="Fichier de sortie (.parquet, .arrow, ou .json/.jsonl pour l'import)")
+    args = parser.parse_args()
+
+    try:
+        if is_columnar(args.input):
+            result = load_columnar_result(args.input)
+        elif is_jsonl(args.input):
+            result = load_jsonl_results(args.input)
+        else:
+            with open(args.input, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+
+        if is_columnar(args.output):
+            write_columnar(result, args.output)
+        elif is_jsonl(args.output):
+            with JsonlSink(args.output) as sink:
+                for ad in result.get("ads", []):
+                    sink.write_ad(ad)
+                sink.write_summary(result)
+        else:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
+    except ImportError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    print(f"✓ {len(result.get('ads', []))} publicités converties : {args.input} → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
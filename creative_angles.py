@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Analyse des angles créatifs d'un ensemble de publicités.
+
+Un seul passage sur les pubs : l'unicité des headlines, textes et CTAs est
+testée par ensembles (coût constant) tout en gardant l'ordre de première
+apparition, et les mots-clés sont comptés au fil de l'eau avec un motif
+précompilé. Le résultat est identique à l'ancienne implémentation par
+listes, quadratique sur les gros annonceurs.
+
+L'état de l'analyse (CreativeAnglesAccumulator) se met à jour pub par pub,
+se fusionne avec celui d'un autre run et se sérialise en JSON : les
+fenêtres d'un run découpé, ou les runs quotidiens successifs, donnent un
+bloc creative_angles commun sans relire les pubs.
+"""
+
+import json
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+
+WORD_PATTERN = re.compile(r'\b\w{4,}\b')
+
+COMMON_THEMES_LIMIT = 20
+
+# Mots gardés dans l'état écrit avec un résultat (l'état complet, qui grandit
+# avec le vocabulaire, reste en mémoire et dans les points de reprise)
+STATE_WORDS_LIMIT = 500
+
+
+class OrderedUnique:
+    """Valeurs uniques dans l'ordre de première apparition"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._seen = set()
+
+    def add(self, value: str):
+        if value not in self._seen:
+            self._seen.add(value)
+            self.values.append(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def update(self, values: Iterable[str]):
+        for value in values:
+            self.add(value)
+
+
+class CreativeAnglesAccumulator:
+    """État incrémental, fusionnable et sérialisable de l'analyse des angles"""
+
+    STATE_VERSION = 1
+
+    def __init__(self):
+        self.headlines = OrderedUnique()
+        self.body_texts = OrderedUnique()
+        self.ctas = OrderedUnique()
+        self.formats = {
+            "image_only": 0,
+            "video_only": 0,
+            "image_and_text": 0,
+            "video_and_text": 0
+        }
+        self.platforms: Dict[str, int] = {}
+        self.word_counts = Counter()
+        self.ads_count = 0
+
+    def add(self, ad: Dict):
+        """Intègre une publicité"""
+        self.ads_count += 1
+
+        for headline in ad.get("headlines", []):
+            self.headlines.add(headline)
+
+        bodies = ad.get("body_texts", [])
+        for body in bodies:
+            self.body_texts.add(body)
+            self.word_counts.update(WORD_PATTERN.findall(body.lower()))
+
+        for cta in ad.get("call_to_actions", []):
+            self.ctas.add(cta)
+
+        # Formats
+        has_image = len(ad.get("images", [])) > 0
+        has_video = len(ad.get("videos", [])) > 0
+        has_text = len(bodies) > 0
+
+        if has_image and not has_video and not has_text:
+            self.formats["image_only"] += 1
+        elif has_video and not has_image:
+            self.formats["video_only"] += 1
+        elif has_image and has_text:
+            self.formats["image_and_text"] += 1
+        elif has_video and has_text:
+            self.formats["video_and_text"] += 1
+
+        # Plateformes
+        for platform in ad.get("platforms", []):
+            self.platforms[platform] = self.platforms.get(platform, 0) + 1
+
+    def add_many(self, ads: Iterable[Dict]) -> "CreativeAnglesAccumulator":
+        for ad in ads:
+            self.add(ad)
+        return self
+
+    def merge(self, other: "CreativeAnglesAccumulator") -> "CreativeAnglesAccumulator":
+        """
+        Ajoute l'état d'un autre accumulateur (pubs distinctes de celles déjà vues)
+
+        Le résultat est celui qu'aurait donné l'analyse des pubs de self
+        suivies de celles de other.
+        """
+        self.headlines.update(other.headlines.values)
+        self.body_texts.update(other.body_texts.values)
+        self.ctas.update(other.ctas.values)
+        for name, count in other.formats.items():
+            self.formats[name] = self.formats.get(name, 0) + count
+        for platform, count in other.platforms.items():
+            self.platforms[platform] = self.platforms.get(platform, 0) + count
+        self.word_counts.update(other.word_counts)
+        self.ads_count += other.ads_count
+        return self
+
+    def result(self) -> Dict:
+        """Bloc creative_angles des résultats"""
+        return {
+            "unique_headlines": list(self.headlines.values),
+            "unique_body_texts": list(self.body_texts.values),
+            "unique_ctas": list(self.ctas.values),
+            "formats": dict(self.formats),
+            "platforms": dict(self.platforms),
+            # Mots-clés fréquents (à égalité, ordre de première apparition)
+            "common_themes": [
+                {"word": word, "count": count}
+                for word, count in self.word_counts.most_common(COMMON_THEMES_LIMIT)
+            ],
+            "total_unique_headlines": len(self.headlines),
+            "total_unique_body_texts": len(self.body_texts),
+            "total_unique_ctas": len(self.ctas),
+        }
+
+    def to_dict(self) -> Dict:
+        """État complet sérialisable en JSON (l'ordre des clés porte l'ordre d'apparition)"""
+        return {
+            "version": self.STATE_VERSION,
+            "ads_count": self.ads_count,
+            "headlines": list(self.headlines.values),
+            "body_texts": list(self.body_texts.values),
+            "ctas": list(self.ctas.values),
+            "formats": dict(self.formats),
+            "platforms": dict(self.platforms),
+            "word_counts": dict(self.word_counts),
+        }
+
+    def summary_state(self) -> Dict:
+        """
+        État compact écrit avec un résultat (creative_angles_state)
+
+        Sans les headlines, textes et CTAs, déjà dans le bloc creative_angles
+        du même résultat (voir from_result), et limité aux STATE_WORDS_LIMIT
+        mots les plus fréquents : les thèmes d'une fusion de résultats sont
+        exacts tant que chaque mot fréquent figure dans ces listes.
+        """
+        # Ordre de première apparition conservé (départage des égalités)
+        top_words = {word for word, _ in self.word_counts.most_common(STATE_WORDS_LIMIT)}
+        return {
+            "version": self.STATE_VERSION,
+            "ads_count": self.ads_count,
+            "formats": dict(self.formats),
+            "platforms": dict(self.platforms),
+            "word_counts": {word: count for word, count in self.word_counts.items() if word in top_words},
+            "word_counts_limit": STATE_WORDS_LIMIT,
+        }
+
+    @classmethod
+    def from_result(cls, result: Dict) -> Optional["CreativeAnglesAccumulator"]:
+        """État d'un résultat : creative_angles_state complété par creative_angles"""
+        state = result.get("creative_angles_state")
+        if not state:
+            return None
+        angles = result.get("creative_angles") or {}
+        return cls.from_dict(dict(
+            state,
+            headlines=state.get("headlines", angles.get("unique_headlines", [])),
+            body_texts=state.get("body_texts", angles.get("unique_body_texts", [])),
+            ctas=state.get("ctas", angles.get("unique_ctas", [])),
+        ))
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> "CreativeAnglesAccumulator":
+        accumulator = cls()
+        accumulator.ads_count = state.get("ads_count", 0)
+        accumulator.headlines.update(state.get("headlines", []))
+        accumulator.body_texts.update(state.get("body_texts", []))
+        accumulator.ctas.update(state.get("ctas", []))
+        accumulator.formats.update(state.get("formats", {}))
+        accumulator.platforms.update(state.get("platforms", {}))
+        accumulator.word_counts.update(state.get("word_counts", {}))
+        return accumulator
+
+
+def analyze_creative_angles(ads: Iterable[Dict]) -> Dict:
+    """
+    Analyse les différents angles créatifs utilisés
+
+    Args:
+        ads: Publicités (liste, ou itérateur sur un flux JSONL)
+
+    Returns:
+        Headlines, textes et CTAs uniques, formats, plateformes et mots-clés fréquents
+    """
+    return CreativeAnglesAccumulator().add_many(ads).result()
+
+
+def compact_angles_state(result: Dict) -> Dict:
+    """
+    Résultat prêt à écrire : état complet des angles remplacé par summary_state()
+
+    En mémoire, les résultats gardent l'état complet (to_dict) : les fusions
+    de fenêtres ou de jobs d'un même run restent exactes.
+    """
+    state = result.get("creative_angles_state")
+    if not state or "headlines" not in state:
+        return result
+    return dict(result, creative_angles_state=CreativeAnglesAccumulator.from_dict(state).summary_state())
+
+
+def load_angles_state(filename: str) -> Optional[CreativeAnglesAccumulator]:
+    """État des angles d'un fichier de résultats (JSON ou JSONL), sans garder les pubs"""
+    from ads_io import SUMMARY_RECORD, is_jsonl, iter_json_document, iter_jsonl
+
+    if is_jsonl(filename):
+        for record in iter_jsonl(filename):
+            if record.get("_record") == SUMMARY_RECORD and record.get("creative_angles_state"):
+                return CreativeAnglesAccumulator.from_result(record)
+        return None
+
+    fields = {}
+    for kind, value in iter_json_document(filename):
+        if kind == "field" and value[0] in ("creative_angles", "creative_angles_state"):
+            fields[value[0]] = value[1]
+    return CreativeAnglesAccumulator.from_result(fields)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Fusion des angles créatifs de plusieurs runs (sans relire les pubs)"
+    )
+    parser.add_argument("inputs", nargs="+", help="Résultats JSON / JSONL contenant creative_angles_state")
+    parser.add_argument("--output", default="creative_angles.json", help="Fichier de sortie (défaut: creative_angles.json)")
+    args = parser.parse_args()
+
+    merged = CreativeAnglesAccumulator()
+    for filename in args.inputs:
+        state = load_angles_state(filename)
+        if state is None:
+            print(f"⚠ Pas d'état d'angles créatifs dans {filename}, ignoré")
+            continue
+        merged.merge(state)
+        print(f"✓ {filename} : {state.ads_count} pubs")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "total_ads": merged.ads_count,
+            "creative_angles": merged.result(),
+            "creative_angles_state": merged.summary_state(),
+        }, f, indent=2, ensure_ascii=False)
+    print(f"✓ Angles fusionnés ({merged.ads_count} pubs) : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
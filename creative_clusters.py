@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Regroupement des créas quasi identiques en familles (MinHash / LSH).
+
+Une même créa est déclinée en nombreuses variantes ("Cette publicité a
+plusieurs versions", "5 publicités utilisent ce contenu...") : compter les
+textes exactement uniques surestime le nombre d'angles réellement testés.
+
+Le texte de chaque pub (sans les mentions de la bibliothèque) est découpé
+en n-grammes de mots, résumé par une signature MinHash, puis les
+signatures sont réparties dans des bandes LSH : seules les pubs qui
+partagent un seau de bande sont comparées, ce qui évite la comparaison de
+toutes les paires. Les textes identiques ne sont signés qu'une fois.
+
+    python creative_clusters.py facebook_ads.json --output familles.json
+"""
+
+import random
+import re
+import zlib
+from typing import Dict, Iterable, List
+
+from ad_index import AdIndex
+from ads_db import normalize_date
+
+
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+BANDS = 16
+# Similarité (Jaccard estimée) minimale entre deux textes d'une même famille
+SIMILARITY_THRESHOLD = 0.6
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# Mentions ajoutées par la bibliothèque, sans rapport avec la créa
+BOILERPLATE_PATTERN = re.compile(
+    r'^(?:'
+    r'actif|active|inactif|inactive|sponsoris[ée]|sponsored|plateformes|platforms'
+    r'|id dans la biblioth[èe]que.*|library id.*'
+    r'|d[ée]but de diffusion.*|started running.*'
+    r'|cette publicit[ée] a plusieurs versions|this ad has multiple versions'
+    r'|\d+ (?:publicit[ée]s|ads) (?:utilisent|use) ce.*|\d+ ads use this.*'
+    r'|transparence ue|ouvrir la liste d[ée]roulante|voir les d[ée]tails.*'
+    r')$',
+    re.IGNORECASE
+)
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def creative_text(ad: Dict) -> str:
+    """Texte de la créa d'une pub (v1, v2, réseau ou API Graph), sans les mentions de la bibliothèque"""
+    parts = []
+    for field in ("headlines", "body_texts", "ad_creative_link_titles", "ad_creative_bodies"):
+        parts.extend(ad.get(field) or [])
+    if not parts:
+        parts = ad.get("text_lines") or []
+
+    lines = []
+    for part in parts:
+        for line in str(part).replace("\u200b", "").splitlines():
+            line = line.strip()
+            if line and not BOILERPLATE_PATTERN.match(line):
+                lines.append(line)
+    return "\n".join(lines)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """Empreintes (32 bits) des n-grammes de mots d'un texte"""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return {zlib.crc32(gram.encode("utf-8")) for gram in grams}
+
+
+class MinHasher:
+    """Signatures MinHash de taille fixe (permutations universelles, graine fixe)"""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.permutations = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, hashes: set) -> tuple:
+        if not hashes:
+            return (MAX_HASH,) * self.num_perm
+        return tuple(
+            min((a * h + b) % MERSENNE_PRIME for h in hashes) & MAX_HASH
+            for a, b in self.permutations
+        )
+
+
+def similarity(sig_a: tuple, sig_b: tuple) -> float:
+    """Similarité de Jaccard estimée à partir de deux signatures"""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+class CreativeClusterer:
+    """
+    Familles de créas quasi identiques, construites pub par pub
+
+    Chaque texte distinct est signé une fois puis comparé, dans chacun de
+    ses seaux LSH, à un représentant par famille : les seaux grossissent avec
+    le nombre de familles et non de variantes, et le coût reste proche du
+    linéaire même sur des milliers de déclinaisons d'une même créa.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SIMILARITY_THRESHOLD,
+        num_perm: int = NUM_PERM,
+        bands: int = BANDS,
+        shingle_size: int = SHINGLE_SIZE
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple de bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+
+        self.texts: List[str] = []
+        self.signatures: List[tuple] = []
+        self._text_ids: Dict[str, int] = {}
+        self._buckets: Dict[tuple, List[int]] = {}
+        self._parents: List[int] = []
+        # Pubs : (id, texte, date de début, date de fin)
+        self.members: List[tuple] = []
+
+    def _find(self, text_id: int) -> int:
+        while self._parents[text_id] != text_id:
+            self._parents[text_id] = self._parents[self._parents[text_id]]
+            text_id = self._parents[text_id]
+        return text_id
+
+    def _union(self, a: int, b: int):
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a != root_b:
+            # Le texte apparu en premier reste la racine
+            self._parents[max(root_a, root_b)] = min(root_a, root_b)
+
+    def _add_text(self, text: str) -> int:
+        text_id = self._text_ids.get(text)
+        if text_id is not None:
+            return text_id
+
+        text_id = len(self.texts)
+        self._text_ids[text] = text_id
+        self.texts.append(text)
+        self._parents.append(text_id)
+        signature = self.hasher.signature(shingles(text, self.shingle_size))
+        self.signatures.append(signature)
+
+        keys = []
+        candidates = set()
+        for band in range(self.bands):
+            key = (band, signature[band * self.rows:(band + 1) * self.rows])
+            keys.append(key)
+            bucket = self._buckets.get(key)
+            if bucket:
+                candidates.update(self._representatives(bucket))
+
+        # Un représentant par famille et par seau : un texte proche d'une
+        # autre famille du seau la retrouve, sans revoir toutes ses variantes
+        for candidate in sorted(candidates):
+            if self._find(candidate) == self._find(text_id):
+                continue
+            if similarity(signature, self.signatures[candidate]) >= self.threshold:
+                self._union(candidate, text_id)
+
+        root = self._find(text_id)
+        for key in keys:
+            bucket = self._buckets.setdefault(key, [])
+            if all(self._find(member) != root for member in bucket):
+                bucket.append(text_id)
+        return text_id
+
+    def _representatives(self, bucket: List[int]) -> List[int]:
+        """Premier texte de chaque famille du seau (familles fusionnées depuis : un seul gardé)"""
+        roots = {}
+        for member in bucket:
+            roots.setdefault(self._find(member), member)
+        if len(roots) < len(bucket):
+            bucket[:] = roots.values()
+        return bucket
+
+    def add(self, ad: Dict):
+        text = creative_text(ad)
+        if not text:
+            return
+        self.members.append((
+            AdIndex.key_for(ad),
+            self._add_text(text),
+            normalize_date(ad.get("date_start") or ad.get("date_started") or ad.get("ad_delivery_start_time")),
+            normalize_date(ad.get("date_end") or ad.get("ad_delivery_stop_time")),
+        ))
+
+    def add_many(self, ads: Iterable[Dict]) -> "CreativeClusterer":
+        for ad in ads:
+            self.add(ad)
+        return self
+
+    def families(self, min_size: int = 1) -> List[Dict]:
+        """
+        Familles, des plus grandes aux plus petites
+
+        Chaque famille donne son texte représentatif (le plus fréquent),
+        le nombre de pubs et de textes distincts, la période de diffusion et
+        les IDs des pubs.
+        """
+        groups: Dict[int, Dict] = {}
+        for ad_id, text_id, date_start, date_end in self.members:
+            group = groups.setdefault(
+                self._find(text_id),
+                {"ad_ids": [], "texts": {}, "first_date": None, "last_date": None}
+            )
+            group["ad_ids"].append(ad_id)
+            group["texts"][text_id] = group["texts"].get(text_id, 0) + 1
+            for date in (date_start, date_end):
+                if date and (group["first_date"] is None or date < group["first_date"]):
+                    group["first_date"] = date
+                if date and (group["last_date"] is None or date > group["last_date"]):
+                    group["last_date"] = date
+
+        families = []
+        for group in groups.values():
+            if len(group["ad_ids"]) < min_size:
+                continue
+            representative = max(group["texts"].items(), key=lambda x: x[1])[0]
+            families.append({
+                "representative_text": self.texts[representative],
+                "ads_count": len(group["ad_ids"]),
+                "variants_count": len(group["texts"]),
+                "first_date": group["first_date"],
+                "last_date": group["last_date"],
+                "ad_ids": group["ad_ids"],
+            })
+
+        families.sort(key=lambda x: x["ads_count"], reverse=True)
+        for family_id, family in enumerate(families, 1):
+            family["family_id"] = family_id
+        return families
+
+
+def cluster_creatives(ads: Iterable[Dict], threshold: float = SIMILARITY_THRESHOLD) -> List[Dict]:
+    """Familles de créas d'un ensemble de pubs"""
+    return CreativeClusterer(threshold).add_many(ads).families()
+
+
+def main():
+    import argparse
+    import json
+
+    from ads_io import HEAVY_FIELDS, iter_json_ads, iter_jsonl_ads, is_jsonl
+
+    parser = argparse.ArgumentParser(description="Familles de créas quasi identiques (MinHash / LSH)")
+    parser.add_argument("input", help="Résultats JSON ou JSONL")
+    parser.add_argument("--output", default="creative_families.json", help="Fichier de sortie (défaut: creative_families.json)")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=SIMILARITY_THRESHOLD,
+        help=f"Similarité minimale entre textes d'une famille, de 0 à 1 (défaut: {SIMILARITY_THRESHOLD})"
+    )
+    args = parser.parse_args()
+
+    reader = iter_jsonl_ads if is_jsonl(args.input) else iter_json_ads
+    clusterer = CreativeClusterer(args.threshold).add_many(reader(args.input, drop_fields=HEAVY_FIELDS))
+    families = clusterer.families()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "total_ads": len(clusterer.members),
+            "unique_texts": len(clusterer.texts),
+            "total_families": len(families),
+            "families": families,
+        }, f, indent=2, ensure_ascii=False)
+
+    print(f"✓ {len(clusterer.members)} pubs, {len(clusterer.texts)} textes distincts, "
+          f"{len(families)} familles : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
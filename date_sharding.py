@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Découpage d'une période start_date..end_date en sous-fenêtres.
+
+Sur les gros annonceurs, un seul scroll infini s'arrête bien avant la fin
+(157 pubs sur 250 annoncées dans examples/facebook_ads_v2.json). On scrape
+plutôt plusieurs fenêtres de dates en parallèle ; une fenêtre dont le nombre
+de résultats annoncé dépasse ce qui a été récupéré est redécoupée, en
+proportion du nombre annoncé. Les résultats sont fusionnés avec
+déduplication par ID de bibliothèque.
+"""
+
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from ad_index import AdIndex
+from creative_angles import CreativeAnglesAccumulator
+
+
+DATE_FORMAT = "%Y-%m-%d"
+
+# Nombre de pubs visé par fenêtre : un scroll de cette taille va au bout
+DEFAULT_TARGET_PER_WINDOW = 120
+
+# Part minimale des résultats annoncés à récupérer pour qu'une fenêtre soit complète
+COMPLETENESS_THRESHOLD = 0.9
+
+
+def window_days(window: Tuple[str, str]) -> int:
+    """Nombre de jours (bornes incluses) d'une fenêtre"""
+    start = datetime.strptime(window[0], DATE_FORMAT)
+    end = datetime.strptime(window[1], DATE_FORMAT)
+    return (end - start).days + 1
+
+
+def split_date_range(start_date: str, end_date: str, parts: int) -> List[Tuple[str, str]]:
+    """
+    Découpe une période en `parts` fenêtres contiguës de tailles égales
+
+    Les bornes sont incluses ; on ne descend pas sous une fenêtre d'un jour.
+    """
+    start = datetime.strptime(start_date, DATE_FORMAT)
+    end = datetime.strptime(end_date, DATE_FORMAT)
+    total_days = (end - start).days + 1
+    parts = max(1, min(parts, total_days))
+
+    windows = []
+    for i in range(parts):
+        window_start = start + timedelta(days=(total_days * i) // parts)
+        window_end = start + timedelta(days=(total_days * (i + 1)) // parts - 1)
+        windows.append((window_start.strftime(DATE_FORMAT), window_end.strftime(DATE_FORMAT)))
+    return windows
+
+
+def shard_count(expected_total: Optional[int], target_per_window: int = DEFAULT_TARGET_PER_WINDOW) -> int:
+    """Nombre de fenêtres nécessaires pour un nombre de résultats annoncé"""
+    if not expected_total:
+        return 1
+    return max(1, math.ceil(expected_total / target_per_window))
+
+
+def is_incomplete(result: Dict, threshold: float = COMPLETENESS_THRESHOLD) -> bool:
+    """Une fenêtre est incomplète si elle a récupéré moins que `threshold` de l'annoncé"""
+    expected = result.get("expected_total")
+    if not result.get("success") or not expected:
+        return False
+    return result.get("total_ads", 0) < expected * threshold
+
+
+def merge_window_results(results: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Fusionne les publicités de plusieurs fenêtres
+
+    Returns:
+        (publicités dédupliquées, résumé par fenêtre)
+    """
+    ad_index = AdIndex()
+    windows = []
+
+    for result in results:
+        for ad in result.get("ads", []):
+            ad_index.add(ad)
+
+        query = result.get("query", {})
+        windows.append({
+            "start_date": query.get("start_date"),
+            "end_date": query.get("end_date"),
+            "success": result.get("success", False),
+            "total_ads": result.get("total_ads", 0),
+            "expected_total": result.get("expected_total"),
+            "error": result.get("error"),
+        })
+
+    windows.sort(key=lambda window: window["start_date"] or "")
+    return ad_index.ads(), windows
+
+
+class ShardedScraper:
+    """Scraping d'une période découpée en fenêtres, redécoupées à la demande"""
+
+    def __init__(
+        self,
+        batch,
+        initial_windows: int = 4,
+        target_per_window: int = DEFAULT_TARGET_PER_WINDOW,
+        max_rounds: int = 4
+    ):
+        """
+        Args:
+            batch: BatchScraper exécutant les fenêtres en parallèle
+            initial_windows: Nombre de fenêtres du premier passage
+            target_per_window: Nombre de pubs visé par fenêtre lors d'un redécoupage
+            max_rounds: Nombre maximum de passages de redécoupage
+        """
+        self.batch = batch
+        self.initial_windows = initial_windows
+        self.target_per_window = target_per_window
+        self.max_rounds = max_rounds
+
+    def run(self, job: Dict) -> Dict:
+        """Scrape un job (page_id, search_term, start_date, end_date, country) par fenêtres"""
+        jobs = [
+            dict(job, start_date=window[0], end_date=window[1])
+            for window in split_date_range(job["start_date"], job["end_date"], self.initial_windows)
+        ]
+
+        final_results = []
+        for round_num in range(self.max_rounds + 1):
+            print(f"\n[Fenêtres - passage {round_num + 1}] {len(jobs)} fenêtre(s)")
+            results = self.batch.run_jobs(jobs)
+
+            jobs = []
+            for result in results:
+                query = result.get("query", {})
+                window = (query.get("start_date"), query.get("end_date"))
+                can_split = window[0] and window[1] and window_days(window) > 1
+                if round_num < self.max_rounds and can_split and is_incomplete(result):
+                    # Redécoupage proportionnel au nombre de résultats annoncé
+                    parts = max(2, shard_count(result["expected_total"], self.target_per_window))
+                    print(f"  ↳ {window[0]} → {window[1]} : {result.get('total_ads', 0)}/"
+                          f"{result['expected_total']} pubs, découpage en {parts}")
+                    jobs.extend(
+                        dict(job, start_date=sub[0], end_date=sub[1])
+                        for sub in split_date_range(window[0], window[1], parts)
+                    )
+                else:
+                    final_results.append(result)
+
+            if not jobs:
+                break
+
+        all_ads, windows = merge_window_results(final_results)
+        succeeded = sum(1 for window in windows if window["success"])
+
+        # Fenêtres disjointes (chaque pub dans la fenêtre de sa date de début) :
+        # les états des angles se fusionnent sans relire les pubs
+        angles = CreativeAnglesAccumulator()
+        for result in final_results:
+            state = CreativeAnglesAccumulator.from_result(result)
+            if state:
+                angles.merge(state)
+
+        return {
+            "success": succeeded == len(windows),
+            "total_ads": len(all_ads),
+            "ads": all_ads,
+            "creative_angles": angles.result(),
+            "creative_angles_state": angles.to_dict(),
+            "query": {
+                "page_id": job.get("page_id"),
+                "search_term": job.get("search_term"),
+                "start_date": job["start_date"],
+                "end_date": job["end_date"],
+                "country": job.get("country", "FR")
+            },
+            "stats": {
+                "ads_in_range": len(all_ads),
+                "windows": windows,
+                "windows_failed": len(windows) - succeeded
+            },
+            "scraped_at": datetime.now().isoformat()
+        }
+
+
+def sharded_api_search(api, queries: List[Dict], windows: int = 4) -> Dict:
+    """
+    Recherches API découpées en fenêtres, toutes interrogées en parallèle
+
+    L'API n'annonce pas de total : les fenêtres servent ici à paralléliser
+    une pagination qui serait sinon strictement séquentielle.
+
+    Args:
+        api: FacebookAdsLibraryAPI
+        queries: Recherches (page_id, search_term, start_date, end_date, country)
+        windows: Nombre de fenêtres par recherche
+    """
+    window_queries = [
+        dict(query, start_date=window[0], end_date=window[1])
+        for query in queries
+        for window in split_date_range(query["start_date"], query["end_date"], windows)
+    ]
+    merged = api.search_many(window_queries)
+
+    ad_index = AdIndex()
+    for ad in merged["ads"]:
+        ad_index.add(ad)
+    merged["ads"] = ad_index.ads()
+    merged["total_ads"] = len(merged["ads"])
+    return merged
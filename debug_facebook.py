@@ -4,20 +4,21 @@
 from playwright.sync_api import sync_playwright
 import time
 
+from browser_daemon import launch_browser
+from playwright_utils import FeedWaiter
+
 url = "https://www.facebook.com/ads/library/?active_status=all&ad_type=all&country=FR&is_targeted_country=false&media_type=all&q=l%27indispensable%20probiotiques&search_type=page&start_date[min]=2025-01-01&start_date[max]=2026-01-01&view_all_page_id=2179133842361365"
 
 with sync_playwright() as p:
-    browser = p.chromium.launch(headless=True)
-    context = browser.new_context(
-        viewport={"width": 1920, "height": 1080},
-        user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-    )
+    # Navigateur partagé (browser_daemon.py) s'il tourne, sinon lancé pour ce debug
+    browser, options = launch_browser(p, headless=True)
+    context = browser.new_context(**options)
     page = context.new_page()
 
     print("Navigation vers la page...")
     page.goto(url, wait_until="networkidle", timeout=60000)
-    print("Page chargée, attente de 10 secondes...")
-    time.sleep(10)
+    print("Page chargée, attente du rendu du flux (10 secondes max)...")
+    FeedWaiter(page).wait(timeout=10.0, quiet=1.5)
 
     # Screenshot
     page.screenshot(path="facebook_page_debug.png", full_page=True)
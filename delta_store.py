@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Scraping différentiel : on ne récupère que ce qui a changé depuis le dernier run.
+
+Un stock local garde, pour chaque page, les pubs déjà collectées (clé de
+déduplication, empreinte du contenu, statut actif/inactif). La bibliothèque
+listant les pubs des plus récentes aux plus anciennes, une suite continue de
+pubs déjà connues et déjà inactives signifie que tout ce qui suit a déjà été
+collecté : le scroll (ou la pagination API) s'arrête là. Seules les pubs
+nouvelles ou modifiées sont renvoyées.
+"""
+
+import json
+import os
+import re
+import urllib.parse
+from datetime import datetime
+from typing import Dict, Optional
+
+from ad_index import AdIndex, content_digest
+
+
+# Nombre de pubs connues et inactives consécutives avant d'arrêter
+DEFAULT_STOP_AFTER = 10
+
+# Champs qui changent d'un run à l'autre sans que la pub change
+# (horodatage d'extraction, URLs de médias signées et temporaires, texte
+# brut de la carte et nombre de pubs partageant la créa)
+VOLATILE_FIELDS = {
+    "timestamp", "images", "videos", "source", "full_section", "full_text",
+    "ad_snapshot_url", "collation_count",
+}
+
+# Paramètres de suivi propres à une session, ajoutés aux liens de sortie
+SESSION_LINK_PARAMS = {"fbclid"}
+
+INACTIVE_PATTERN = re.compile(r'^\s*(?:Inactive|Inactif)\s*$', re.IGNORECASE | re.MULTILINE)
+ACTIVE_PATTERN = re.compile(r'^\s*(?:Active|Actif)\s*$', re.IGNORECASE | re.MULTILINE)
+
+
+def ad_is_active(ad: Dict) -> Optional[bool]:
+    """
+    Statut de diffusion d'une publicité, quelle que soit sa source
+
+    Returns:
+        True/False, ou None si le statut n'est pas connu
+    """
+    # Réponses réseau (GraphQL)
+    if isinstance(ad.get("is_active"), bool):
+        return ad["is_active"]
+
+    # API Graph : une date de fin passée signifie que la pub ne tourne plus
+    if "ad_delivery_start_time" in ad:
+        stop_time = ad.get("ad_delivery_stop_time")
+        if not stop_time:
+            return True
+        return stop_time[:10] >= datetime.now().strftime("%Y-%m-%d")
+
+    # DOM : libellé "Active" / "Inactive" de la carte
+    text = ad.get("full_text") or ""
+    if INACTIVE_PATTERN.search(text):
+        return False
+    if ACTIVE_PATTERN.search(text):
+        return True
+    return None
+
+
+def stable_link(url: str) -> str:
+    """
+    Lien de sortie d'une pub, indépendant de la session
+
+    Les liens du DOM passent par l.facebook.com/l.php?u=<cible>&h=<jeton> ;
+    le jeton change à chaque session : seule la cible est gardée, sans fbclid.
+    """
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.path == "/l.php" and parsed.netloc.endswith("facebook.com"):
+        target = urllib.parse.parse_qs(parsed.query).get("u")
+        if target:
+            parsed = urllib.parse.urlsplit(target[0])
+    query = [
+        (name, value) for name, value in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)
+        if name not in SESSION_LINK_PARAMS
+    ]
+    return urllib.parse.urlunsplit(parsed._replace(query=urllib.parse.urlencode(query)))
+
+
+def ad_fingerprint(ad: Dict) -> str:
+    """Empreinte du contenu d'une pub (hors champs volatils, liens sans jeton de session)"""
+    stable = {key: value for key, value in ad.items() if key not in VOLATILE_FIELDS}
+    if stable.get("external_links"):
+        stable["external_links"] = [
+            stable_link(link) if isinstance(link, str) else link for link in stable["external_links"]
+        ]
+    return content_digest(json.dumps(stable, sort_keys=True, ensure_ascii=False, default=str))
+
+
+class KnownAdsStore:
+    """Stock local des pubs déjà collectées, par page (fichier JSON)"""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.pages: Dict[str, Dict[str, Dict]] = {}
+        if os.path.exists(filename):
+            with open(filename, 'r', encoding='utf-8') as f:
+                self.pages = json.load(f).get("pages", {})
+
+    def known(self, page_id: str) -> Dict[str, Dict]:
+        """Pubs connues d'une page : clé -> {"fingerprint", "active", "last_seen"}"""
+        return self.pages.get(str(page_id), {})
+
+    def update(self, page_id: str, tracker: "DeltaTracker"):
+        """Enregistre les pubs vues pendant un run"""
+        self.pages.setdefault(str(page_id), {}).update(tracker.seen)
+
+    def save(self):
+        tmp_filename = self.filename + ".tmp"
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump({"pages": self.pages, "updated_at": datetime.now().isoformat()}, f, ensure_ascii=False)
+        os.replace(tmp_filename, self.filename)
+
+
+class DeltaTracker:
+    """Compare les pubs d'un run aux pubs connues d'une page"""
+
+    NEW = "new"
+    CHANGED = "changed"
+    UNCHANGED = "unchanged"
+
+    def __init__(self, known: Dict[str, Dict], stop_after: int = DEFAULT_STOP_AFTER):
+        """
+        Args:
+            known: Pubs connues de la page (KnownAdsStore.known)
+            stop_after: Nombre de pubs connues et inactives consécutives avant d'arrêter
+        """
+        self.known = known
+        self.stop_after = max(1, stop_after)
+        self.seen: Dict[str, Dict] = {}
+        self.counts = {self.NEW: 0, self.CHANGED: 0, self.UNCHANGED: 0}
+        self.known_inactive_run = 0
+
+    def observe(self, ad: Dict) -> str:
+        """
+        Classe une pub (new / changed / unchanged) et met à jour la suite
+        de pubs connues et inactives
+        """
+        key = AdIndex.key_for(ad)
+        active = ad_is_active(ad)
+        record = {
+            "fingerprint": ad_fingerprint(ad),
+            "active": active,
+            "last_seen": datetime.now().strftime("%Y-%m-%d"),
+        }
+        previous = self.known.get(key)
+        self.seen[key] = record
+
+        if previous is None:
+            status = self.NEW
+        elif previous.get("fingerprint") != record["fingerprint"]:
+            status = self.CHANGED
+        elif active is not None and previous.get("active") != active:
+            # Pub arrêtée (ou relancée) depuis le dernier run
+            status = self.CHANGED
+        else:
+            status = self.UNCHANGED
+
+        # Une pub inactive ne change plus : déjà inactive au dernier run et
+        # toujours identique, tout ce qui est plus ancien est déjà connu
+        if status == self.UNCHANGED and previous.get("active") is False and active is False:
+            self.known_inactive_run += 1
+        else:
+            self.known_inactive_run = 0
+
+        self.counts[status] += 1
+        return status
+
+    @property
+    def should_stop(self) -> bool:
+        return self.known_inactive_run >= self.stop_after
+
+    def stats(self) -> Dict:
+        return {
+            "new": self.counts[self.NEW],
+            "changed": self.counts[self.CHANGED],
+            "unchanged": self.counts[self.UNCHANGED],
+            "stopped_on_known": self.should_stop,
+        }
@@ -11,16 +11,186 @@ import urllib.parse
 import re
 from datetime import datetime
 from dateutil import parser as date_parser
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 import argparse
+import asyncio
+import os
+
+from ad_index import AdIndex, content_digest
+from ads_db import AdsDatabase, is_sqlite
+from ads_io import JsonlSink, is_jsonl, iter_jsonl_ads
+from checkpoint import Checkpoint, default_checkpoint_path
+from creative_angles import CreativeAnglesAccumulator, analyze_creative_angles, compact_angles_state
+from async_api import GRAPH_API_URL, AsyncFacebookAdsLibraryAPI, merge_results
+from delta_store import DEFAULT_STOP_AFTER, DeltaTracker, KnownAdsStore
+from http_cache import DEFAULT_CACHE_FILE, DEFAULT_TTL, HttpCache
+from date_sharding import ShardedScraper, sharded_api_search
+from network_capture import ResponseCapture
+from browser_daemon import launch_browser
+from playwright_utils import BLOCKING_PROFILES, MAX_BLOCKED_MEDIA_URLS, FeedWaiter, RequestBlocker
+
+# Nombre de résultats annoncé par la page ("250 résultats", "1,200 results")
+EXPECTED_TOTAL_JS = """
+    () => {
+        const match = document.body.innerText.match(/(\\d[\\d\\s.,\\u00a0\\u202f]*)\\s+(?:résultats?|results?)\\b/i);
+        return match ? match[1] : null;
+    }
+"""
+
+# Extraction des cartes de publicité dans la page
+EXTRACT_ADS_JS = """
+    ({incremental, blockedMedia, maxBlockedMedia}) => {
+        const ads = [];
+
+        // Médias bloqués (RequestBlocker) relevés au fil des extractions, bornés par page
+        const blockedSet = window.__fbBlockedMedia || (window.__fbBlockedMedia = new Set());
+        (blockedMedia || []).forEach(url => blockedSet.add(url));
+        while (blockedSet.size > (maxBlockedMedia || 0)) {
+            blockedSet.delete(blockedSet.values().next().value);
+        }
+        const adCards = document.querySelectorAll(incremental
+            ? '[data-testid="search_result_ad_card"]:not([data-fb-scraped]), [role="article"]:not([data-fb-scraped])'
+            : '[data-testid="search_result_ad_card"], [role="article"]');
+
+        adCards.forEach((card) => {
+            if (incremental) {
+                // Carte pas encore hydratée : on la reprendra au prochain scroll
+                if (!card.textContent.trim()) {
+                    return;
+                }
+                card.setAttribute('data-fb-scraped', '1');
+            }
+            try {
+                // ID dans la bibliothèque (empreinte calculée côté Python à défaut)
+                const idMatch = card.innerText.match(/(?:ID dans la biblioth[èe]que|Library ID)\\s*:\\s*(\\d+)/i);
+
+                const ad = {
+                    id: idMatch ? idMatch[1] : null,
+                    library_id: idMatch ? idMatch[1] : null,
+                    timestamp: Date.now(),
+                };
+
+                // Date de début (chercher "Started running on")
+                const dateMatch = card.innerText.match(/Started running on ([A-Za-z]+ \\d+, \\d{4})/i);
+                if (dateMatch) {
+                    ad.date_started = dateMatch[1];
+                }
+
+                // Titre/Headline
+                const headlines = [];
+                card.querySelectorAll('[class*="headline"], h3, h4, strong').forEach(el => {
+                    const text = el.innerText.trim();
+                    if (text && text.length > 5 && !headlines.includes(text)) {
+                        headlines.push(text);
+                    }
+                });
+                ad.headlines = headlines;
+
+                // Corps de texte
+                const bodies = [];
+                card.querySelectorAll('[class*="body"], p, div[dir="auto"]').forEach(el => {
+                    const text = el.innerText.trim();
+                    if (text && text.length > 20 && !bodies.some(b => b.includes(text))) {
+                        bodies.push(text);
+                    }
+                });
+                ad.body_texts = bodies;
+
+                // Images
+                const images = [];
+                card.querySelectorAll('img').forEach(img => {
+                    // Image bloquée : pas de dimensions, reconnue par son URL
+                    const blocked = blockedSet.has(img.currentSrc) || blockedSet.has(img.src);
+                    if (img.src && !img.src.includes('data:image') && (img.width > 50 || blocked)) {
+                        images.push({
+                            src: img.src,
+                            alt: img.alt || '',
+                            width: img.width,
+                            height: img.height
+                        });
+                    }
+                });
+                ad.images = images;
+
+                // Vidéos
+                const videos = [];
+                card.querySelectorAll('video').forEach(video => {
+                    if (video.src) {
+                        videos.push({
+                            src: video.src,
+                            poster: video.poster || ''
+                        });
+                    }
+                });
+                ad.videos = videos;
+
+                // Call to Action (boutons)
+                const ctas = [];
+                card.querySelectorAll('button, a[role="button"], [class*="cta"]').forEach(btn => {
+                    const text = btn.innerText.trim();
+                    if (text && text.length < 50) {
+                        ctas.push(text);
+                    }
+                });
+                ad.call_to_actions = ctas;
+
+                // Liens
+                const links = [];
+                card.querySelectorAll('a[href]').forEach(link => {
+                    if (link.href && !link.href.includes('facebook.com/ads')) {
+                        links.push(link.href);
+                    }
+                });
+                ad.external_links = links;
+
+                // Plateformes (Facebook, Instagram, etc.)
+                const platformMatch = card.innerText.match(/(Facebook|Instagram|Messenger|Audience Network)/gi);
+                if (platformMatch) {
+                    ad.platforms = [...new Set(platformMatch)];
+                }
+
+                // Texte complet pour analyse
+                ad.full_text = card.innerText;
+
+                // URL de la pub
+                const adLink = card.querySelector('a[href*="/ads/library"]');
+                if (adLink) {
+                    ad.ad_library_url = adLink.href;
+                }
+
+                ads.push(ad);
+            } catch (e) {
+                console.error('Erreur extraction pub:', e);
+            }
+        });
+
+        return ads;
+    }
+"""
 
 
 class FacebookAdsLibraryAPI:
     """Utilise l'API officielle de Facebook Ads Library"""
 
-    def __init__(self, access_token: str):
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str = GRAPH_API_URL,
+        concurrency: int = 8,
+        cache: Optional[HttpCache] = None
+    ):
         self.access_token = access_token
-        self.base_url = "https://graph.facebook.com/v18.0/ads_archive"
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.cache = cache
+
+    def _client(self) -> AsyncFacebookAdsLibraryAPI:
+        return AsyncFacebookAdsLibraryAPI(
+            self.access_token,
+            base_url=self.base_url,
+            concurrency=self.concurrency,
+            cache=self.cache
+        )
 
     def search_ads(
         self,
@@ -29,11 +199,16 @@ class FacebookAdsLibraryAPI:
         start_date: str,
         end_date: str,
         country: str = "FR",
-        limit: int = 500
+        limit: int = 500,
+        checkpoint: Optional[Checkpoint] = None,
+        resume: bool = False,
+        delta: Optional[DeltaTracker] = None
     ) -> Dict:
         """
         Recherche des publicités via l'API Facebook
 
+        Enveloppe synchrone de AsyncFacebookAdsLibraryAPI.search_ads.
+
         Args:
             page_id: ID de la page Facebook
             search_term: Terme de recherche
@@ -41,90 +216,214 @@ class FacebookAdsLibraryAPI:
             end_date: Date de fin (YYYY-MM-DD)
             country: Code pays (FR par défaut)
             limit: Nombre max de résultats par page
+            checkpoint: Point de reprise (curseur de pagination)
+            resume: Reprendre depuis le point de reprise existant
+            delta: Ne garder que les pubs nouvelles ou modifiées (scraping différentiel)
 
         Returns:
             Dict contenant les données des publicités
         """
-        import requests
+        async def run():
+            async with self._client() as client:
+                return await client.search_ads(
+                    page_id, search_term, start_date, end_date, country, limit,
+                    checkpoint=checkpoint, resume=resume, delta=delta
+                )
 
-        params = {
-            "access_token": self.access_token,
-            "search_page_ids": page_id,
-            "search_terms": search_term,
-            "ad_reached_countries": country,
-            "ad_active_status": "ALL",
-            "fields": ",".join([
-                "id",
-                "ad_creation_time",
-                "ad_creative_bodies",
-                "ad_creative_link_captions",
-                "ad_creative_link_descriptions",
-                "ad_creative_link_titles",
-                "ad_delivery_start_time",
-                "ad_delivery_stop_time",
-                "ad_snapshot_url",
-                "age_country_gender_reach_breakdown",
-                "beneficiary_payers",
-                "bylines",
-                "currency",
-                "delivery_by_region",
-                "demographic_distribution",
-                "estimated_audience_size",
-                "eu_total_reach",
-                "impressions",
-                "languages",
-                "page_id",
-                "page_name",
-                "publisher_platforms",
-                "spend",
-                "target_ages",
-                "target_gender",
-            ]),
-            "limit": limit,
-        }
+        return asyncio.run(run())
 
-        all_ads = []
-        url = self.base_url
+    def search_many(self, queries: List[Dict]) -> Dict:
+        """
+        Lance plusieurs recherches (page_id/pays...) en parallèle
 
-        try:
-            while url:
-                response = requests.get(url, params=params if url == self.base_url else None)
-                response.raise_for_status()
-                data = response.json()
+        Args:
+            queries: Liste de dicts avec les arguments de search_ads
 
-                if "data" in data:
-                    all_ads.extend(data["data"])
-                    print(f"Récupéré {len(all_ads)} publicités...")
+        Returns:
+            Dict regroupant les publicités et le statut de chaque recherche
+        """
+        async def run():
+            async with self._client() as client:
+                return await client.search_many(queries)
 
-                # Pagination
-                url = data.get("paging", {}).get("next")
-                params = None  # Les paramètres sont dans l'URL next
+        return merge_results(asyncio.run(run()))
 
-            return {
-                "success": True,
-                "total_ads": len(all_ads),
-                "ads": all_ads,
-                "query": {
-                    "page_id": page_id,
-                    "search_term": search_term,
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "country": country
-                }
-            }
 
-        except requests.exceptions.RequestException as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "message": "Erreur lors de la requête à l'API Facebook"
-            }
+class ScrollSession:
+    """
+    État d'un scraping par scroll : déduplication, filtrage par date et
+    conditions d'arrêt. Partagé par le scraper synchrone et le mode batch.
+    """
+
+    def __init__(
+        self,
+        start_dt: datetime,
+        end_dt: datetime,
+        parse_date: Callable[[str], Optional[datetime]],
+        incremental: bool = True,
+        verbose: bool = True,
+        on_new_ad: Optional[Callable[[Dict], None]] = None,
+        delta: Optional[DeltaTracker] = None
+    ):
+        """
+        Args:
+            start_dt: Début de la période
+            end_dt: Fin de la période
+            parse_date: Fonction de parsing de la date d'une publicité
+            incremental: Les extractions ne renvoient que les nouvelles cartes
+            verbose: Afficher la progression
+            on_new_ad: Appelé pour chaque nouvelle pub dans la période ; les pubs
+                       ne sont alors pas gardées en mémoire (seules leurs clés)
+            delta: Scraping différentiel : seules les pubs nouvelles ou modifiées
+                   sont gardées, arrêt sur une suite de pubs connues et inactives
+        """
+        self.start_dt = start_dt
+        self.end_dt = end_dt
+        self.parse_date = parse_date
+        self.incremental = incremental
+        self.verbose = verbose
+        self.on_new_ad = on_new_ad
+        self.delta = delta
+        # Pubs gardées en AdRecord (slots, chaînes internées) jusqu'à l'écriture du résultat
+        self.ad_index = AdIndex(keep_ads=on_new_ad is None, compact=True)
+        self.unchanged_keys = set()
+        self.out_of_range_keys = set()
+        # Angles créatifs mis à jour à chaque nouvelle pub (pas de relecture en fin de run)
+        self.angles = CreativeAnglesAccumulator()
+        self.previous_ad_count = 0
+        self.consecutive_no_new_ads = 0
+        self.network_scrolls = 0
+        self.scrolls = 0
+        self.expected_total = None
+        # Entrées de l'index déjà écrites dans le point de reprise
+        self.saved_entries = 0
+
+    @property
+    def out_of_range_count(self) -> int:
+        return len(self.out_of_range_keys)
+
+    @property
+    def collected_count(self) -> int:
+        """Pubs retenues (hors pubs connues et inchangées en mode différentiel)"""
+        return len(self.ad_index) - len(self.unchanged_keys)
+
+    def snapshot(self) -> Dict:
+        """État sérialisable pour un point de reprise (les pubs : voir unsaved_entries)"""
+        return {
+            "scrolls": self.scrolls,
+            "network_scrolls": self.network_scrolls,
+            "out_of_range_keys": sorted(self.out_of_range_keys),
+        }
+
+    def unsaved_entries(self) -> List[Dict]:
+        """
+        Pubs indexées depuis le point de reprise précédent, à ajouter à son fichier des pubs
+
+        Une pub non gardée (sortie JSONL, pub connue et inchangée) n'y figure
+        que par sa clé ; les angles se recalculent à partir des pubs.
+        """
+        entries = [
+            ad if ad is not None else (
+                {"_key": key, "unchanged": True} if key in self.unchanged_keys else {"_key": key}
+            )
+            for key, ad in self.ad_index.entries_since(self.saved_entries)
+        ]
+        self.saved_entries = len(self.ad_index)
+        return entries
+
+    def restore(self, state: Dict):
+        """Recharge un état sauvegardé par snapshot() et unsaved_entries()"""
+        for entry in state.get("ads") or []:
+            if "_key" in entry:
+                self.ad_index.add_key(entry["_key"])
+                if entry.get("unchanged"):
+                    self.unchanged_keys.add(entry["_key"])
+            elif self.ad_index.add(entry):
+                self.angles.add(entry)
+        self.saved_entries = len(self.ad_index)
+        self.out_of_range_keys.update(state.get("out_of_range_keys", []))
+        self.scrolls = state.get("scrolls", 0)
+        self.network_scrolls = state.get("network_scrolls", 0)
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def process(self, current_ads: List[Dict], from_network: bool = False) -> bool:
+        """
+        Intègre les publicités d'un scroll
+
+        Returns:
+            False si le scroll doit s'arrêter
+        """
+        self.scrolls += 1
+        if from_network:
+            self.network_scrolls += 1
+
+        # Filtrage par date
+        ads_in_range = []
+        ads_out_of_range = 0
+
+        for ad in current_ads:
+            ad_date = self.parse_date(ad.get("date_started", ""))
+            if ad_date:
+                if self.start_dt <= ad_date <= self.end_dt:
+                    # Éviter les doublons (index par ID de bibliothèque)
+                    if ad in self.ad_index:
+                        continue
+                    if self.delta and self.delta.observe(ad) == DeltaTracker.UNCHANGED:
+                        # Déjà collectée au run précédent : clé seulement
+                        key = AdIndex.key_for(ad)
+                        self.ad_index.add_key(key)
+                        self.unchanged_keys.add(key)
+                        continue
+                    if self.ad_index.add(ad):
+                        ads_in_range.append(ad)
+                        self.angles.add(ad)
+                        if self.on_new_ad:
+                            self.on_new_ad(ad)
+                elif ad_date < self.start_dt:
+                    ads_out_of_range += 1
+                    self.out_of_range_keys.add(AdIndex.key_for(ad))
+
+        self._log(f"  Nouvelles pubs dans période: {len(ads_in_range)}")
+        self._log(f"  Total récupéré: {self.collected_count}")
+        self._log(f"  Pubs hors période: {ads_out_of_range}")
+
+        if self.delta and self.delta.should_stop:
+            self._log(f"\n✓ {self.delta.known_inactive_run} pubs déjà connues et inactives à la suite - arrêt (différentiel)")
+            return False
+
+        # Conditions d'arrêt
+        # En mode incrémental, seules les nouvelles cartes sont renvoyées
+        if self.incremental:
+            no_new_cards = not current_ads
+        else:
+            no_new_cards = len(current_ads) == self.previous_ad_count
+        if no_new_cards:
+            self.consecutive_no_new_ads += 1
+            if self.consecutive_no_new_ads >= 3:
+                self._log("\n⚠ Pas de nouvelles pubs après 3 scrolls - arrêt")
+                return False
+        else:
+            self.consecutive_no_new_ads = 0
+
+        # Arrêter si on a beaucoup de pubs hors période
+        # (cumul en mode incrémental, les cartes n'étant vues qu'une fois)
+        loaded_out_of_range = self.out_of_range_count if self.incremental else ads_out_of_range
+        if loaded_out_of_range >= 5:
+            self._log(f"\n⚠ Trop de pubs hors période ({loaded_out_of_range}) - arrêt pour éviter de descendre trop loin")
+            return False
+
+        self.previous_ad_count = len(current_ads)
+        return True
 
 
 class FacebookAdsLibraryScraper:
     """Scrape la bibliothèque publicitaire Facebook avec Playwright"""
 
-    def __init__(self):
+    def __init__(self, base_url: str = "https://www.facebook.com/ads/library/"):
+        self.base_url = base_url
         try:
             from playwright.sync_api import sync_playwright
             self.playwright_available = True
@@ -140,7 +439,16 @@ class FacebookAdsLibraryScraper:
         country: str = "FR",
         headless: bool = True,
         max_scroll: int = 50,
-        scroll_pause: float = 2.5
+        scroll_pause: float = 2.5,
+        incremental: bool = True,
+        adaptive_wait: bool = True,
+        scroll_timeout: float = 10.0,
+        extraction: str = "network",
+        block_profile: str = "media",
+        sink: Optional[JsonlSink] = None,
+        checkpoint: Optional[Checkpoint] = None,
+        resume: bool = False,
+        delta: Optional[DeltaTracker] = None
     ) -> Dict:
         """
         Scrape les publicités avec Playwright - avec détection intelligente de date
@@ -153,7 +461,18 @@ class FacebookAdsLibraryScraper:
             country: Code pays
             headless: Mode sans interface graphique
             max_scroll: Nombre maximum de scrolls
-            scroll_pause: Pause entre chaque scroll (secondes)
+            scroll_pause: Pause fixe entre chaque scroll (secondes, si adaptive_wait=False)
+            incremental: N'extraire que les cartes apparues depuis le dernier scroll
+            adaptive_wait: Attendre le chargement effectif du flux plutôt qu'une pause fixe
+            scroll_timeout: Attente maximale après chaque scroll en mode adaptatif (secondes)
+            extraction: 'network' (réponses JSON interceptées, DOM en secours) ou 'dom'
+            block_profile: Requêtes interrompues pendant le scraping ('none', 'media', 'strict')
+            sink: Flux JSONL où écrire chaque pub dès son extraction (le résultat
+                  ne contient alors pas la liste "ads")
+            checkpoint: Point de reprise sauvegardé périodiquement pendant le scroll
+            resume: Reprendre depuis le point de reprise existant
+            delta: Ne garder que les pubs nouvelles ou modifiées par rapport au
+                   stock local, et s'arrêter sur une suite de pubs connues et inactives
 
         Returns:
             Dict contenant les données des publicités avec angles créatifs
@@ -179,223 +498,179 @@ class FacebookAdsLibraryScraper:
                 "message": "Utilisez le format YYYY-MM-DD"
             }
 
+        query = {
+            "page_id": page_id,
+            "search_term": search_term,
+            "start_date": start_date,
+            "end_date": end_date,
+            "country": country
+        }
+
+        session = ScrollSession(
+            start_dt, end_dt, self._parse_ad_date,
+            incremental=incremental,
+            on_new_ad=sink.write_ad if sink else None,
+            delta=delta
+        )
+
+        # Reprise : le flux n'étant pas strictement trié par date, on reparcourt
+        # toute la période ; les pubs déjà vues sont ignorées (clés restaurées)
+        state = checkpoint.load("scraper", query) if checkpoint and resume else None
+        if state:
+            session.restore(state)
+            if sink:
+                # Le flux JSONL peut contenir des pubs écrites après le dernier point
+                # de reprise : clés et angles sont reconstruits à partir du fichier
+                angles = CreativeAnglesAccumulator()
+                for ad in iter_jsonl_ads(sink.filename):
+                    session.ad_index.add_key(AdIndex.key_for(ad))
+                    angles.add(ad)
+                session.angles = angles
+            print(f"↻ Reprise après {session.scrolls} scrolls : {session.collected_count} pubs déjà collectées")
+
         # Construction de l'URL
         url = self._build_url(page_id, search_term, start_date, end_date, country)
-
-        all_ads = []
-        previous_ad_count = 0
-        consecutive_no_new_ads = 0
-        out_of_range_count = 0
+        query["url"] = url
 
         try:
             with sync_playwright() as p:
-                browser = p.chromium.launch(headless=headless)
-                context = browser.new_context(
-                    viewport={"width": 1920, "height": 1080},
-                    user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-                )
+                # Navigateur partagé (browser_daemon.py) s'il tourne, sinon lancé pour ce run
+                browser, options = launch_browser(p, headless=headless)
+                context = browser.new_context(**options)
+                blocker = RequestBlocker(block_profile).install(context)
                 page = context.new_page()
+                waiter = FeedWaiter(page, timeout=scroll_timeout) if adaptive_wait else None
+                capture = ResponseCapture(page) if extraction == "network" else None
 
                 print(f"Navigation vers: {url}")
                 page.goto(url, wait_until="networkidle", timeout=60000)
-                time.sleep(4)
+                if waiter:
+                    waiter.wait(timeout=15.0, quiet=1.5)
+                else:
+                    time.sleep(4)
+
+                session.expected_total = parse_expected_total(page.evaluate(EXPECTED_TOTAL_JS))
+                if session.expected_total:
+                    print(f"Total de résultats annoncés : {session.expected_total}")
 
                 # Scroll intelligent avec vérification des dates
                 for scroll_num in range(max_scroll):
                     print(f"\n[Scroll {scroll_num + 1}/{max_scroll}]")
 
-                    # Extraction des publicités actuellement visibles
-                    current_ads = self._extract_ads_from_page(page)
-
-                    # Filtrage par date
-                    ads_in_range = []
-                    ads_out_of_range = 0
-
-                    for ad in current_ads:
-                        ad_date = self._parse_ad_date(ad.get("date_started", ""))
-                        if ad_date:
-                            if start_dt <= ad_date <= end_dt:
-                                # Éviter les doublons
-                                if not any(existing["id"] == ad["id"] for existing in all_ads):
-                                    ads_in_range.append(ad)
-                            elif ad_date < start_dt:
-                                ads_out_of_range += 1
-
-                    all_ads.extend(ads_in_range)
-                    out_of_range_count += ads_out_of_range
-
-                    print(f"  Nouvelles pubs dans période: {len(ads_in_range)}")
-                    print(f"  Total récupéré: {len(all_ads)}")
-                    print(f"  Pubs hors période: {ads_out_of_range}")
-
-                    # Conditions d'arrêt
-                    if len(current_ads) == previous_ad_count:
-                        consecutive_no_new_ads += 1
-                        if consecutive_no_new_ads >= 3:
-                            print("\n⚠ Pas de nouvelles pubs après 3 scrolls - arrêt")
-                            break
-                    else:
-                        consecutive_no_new_ads = 0
-
-                    # Arrêter si on a beaucoup de pubs hors période
-                    if ads_out_of_range >= 5:
-                        print(f"\n⚠ Trop de pubs hors période ({ads_out_of_range}) - arrêt pour éviter de descendre trop loin")
+                    # Extraction : réponses réseau interceptées, DOM en secours
+                    current_ads = capture.drain() if capture else []
+                    from_network = bool(current_ads)
+                    if not from_network:
+                        current_ads = self._extract_ads_from_page(
+                            page,
+                            incremental=incremental,
+                            blocked_media=blocker.drain_media_urls()
+                        )
+
+                    keep_scrolling = session.process(current_ads, from_network=from_network)
+                    if sink:
+                        sink.flush()
+                    if checkpoint and checkpoint.due(session.scrolls):
+                        checkpoint.save("scraper", query, session.snapshot(), session.unsaved_entries())
+                    if not keep_scrolling:
                         break
 
-                    previous_ad_count = len(current_ads)
-
                     # Scroll vers le bas
                     page.evaluate("window.scrollBy(0, window.innerHeight)")
-                    time.sleep(scroll_pause)
+                    if waiter:
+                        waiter.wait()
+                    else:
+                        time.sleep(scroll_pause)
 
                 browser.close()
 
-            # Analyse des angles créatifs
-            creative_angles = self._analyze_creative_angles(all_ads)
-
-            return {
-                "success": True,
-                "total_ads": len(all_ads),
-                "ads": all_ads,
-                "creative_angles": creative_angles,
-                "query": {
-                    "page_id": page_id,
-                    "search_term": search_term,
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "country": country,
-                    "url": url
-                },
-                "stats": {
-                    "ads_in_range": len(all_ads),
-                    "ads_out_of_range": out_of_range_count,
-                    "scrolls_performed": scroll_num + 1
-                },
-                "scraped_at": datetime.now().isoformat()
-            }
+            result = self._build_result(session, query, blocker, sink)
+            if checkpoint:
+                checkpoint.clear()
+            return result
 
         except Exception as e:
             import traceback
-            return {
+            result = {
                 "success": False,
                 "error": str(e),
                 "traceback": traceback.format_exc(),
                 "message": f"Erreur lors du scraping: {str(e)}"
             }
+            if checkpoint:
+                checkpoint.save("scraper", query, session.snapshot(), session.unsaved_entries())
+                result["checkpoint"] = checkpoint.filename
+            return result
 
-    def _extract_ads_from_page(self, page) -> List[Dict]:
-        """Extrait toutes les publicités de la page actuelle"""
-        return page.evaluate("""
-            () => {
-                const ads = [];
-                const adCards = document.querySelectorAll('[data-testid="search_result_ad_card"], [role="article"]');
-
-                adCards.forEach((card) => {
-                    try {
-                        // ID unique basé sur le contenu
-                        const cardText = card.innerText.substring(0, 200);
-                        const cardHash = btoa(cardText).substring(0, 20);
-
-                        const ad = {
-                            id: cardHash,
-                            timestamp: Date.now(),
-                        };
-
-                        // Date de début (chercher "Started running on")
-                        const dateMatch = card.innerText.match(/Started running on ([A-Za-z]+ \\d+, \\d{4})/i);
-                        if (dateMatch) {
-                            ad.date_started = dateMatch[1];
-                        }
-
-                        // Titre/Headline
-                        const headlines = [];
-                        card.querySelectorAll('[class*="headline"], h3, h4, strong').forEach(el => {
-                            const text = el.innerText.trim();
-                            if (text && text.length > 5 && !headlines.includes(text)) {
-                                headlines.push(text);
-                            }
-                        });
-                        ad.headlines = headlines;
-
-                        // Corps de texte
-                        const bodies = [];
-                        card.querySelectorAll('[class*="body"], p, div[dir="auto"]').forEach(el => {
-                            const text = el.innerText.trim();
-                            if (text && text.length > 20 && !bodies.some(b => b.includes(text))) {
-                                bodies.push(text);
-                            }
-                        });
-                        ad.body_texts = bodies;
-
-                        // Images
-                        const images = [];
-                        card.querySelectorAll('img').forEach(img => {
-                            if (img.src && !img.src.includes('data:image') && img.width > 50) {
-                                images.push({
-                                    src: img.src,
-                                    alt: img.alt || '',
-                                    width: img.width,
-                                    height: img.height
-                                });
-                            }
-                        });
-                        ad.images = images;
-
-                        // Vidéos
-                        const videos = [];
-                        card.querySelectorAll('video').forEach(video => {
-                            if (video.src) {
-                                videos.push({
-                                    src: video.src,
-                                    poster: video.poster || ''
-                                });
-                            }
-                        });
-                        ad.videos = videos;
-
-                        // Call to Action (boutons)
-                        const ctas = [];
-                        card.querySelectorAll('button, a[role="button"], [class*="cta"]').forEach(btn => {
-                            const text = btn.innerText.trim();
-                            if (text && text.length < 50) {
-                                ctas.push(text);
-                            }
-                        });
-                        ad.call_to_actions = ctas;
-
-                        // Liens
-                        const links = [];
-                        card.querySelectorAll('a[href]').forEach(link => {
-                            if (link.href && !link.href.includes('facebook.com/ads')) {
-                                links.push(link.href);
-                            }
-                        });
-                        ad.external_links = links;
-
-                        // Plateformes (Facebook, Instagram, etc.)
-                        const platformMatch = card.innerText.match(/(Facebook|Instagram|Messenger|Audience Network)/gi);
-                        if (platformMatch) {
-                            ad.platforms = [...new Set(platformMatch)];
-                        }
-
-                        // Texte complet pour analyse
-                        ad.full_text = card.innerText;
-
-                        // URL de la pub
-                        const adLink = card.querySelector('a[href*="/ads/library"]');
-                        if (adLink) {
-                            ad.ad_library_url = adLink.href;
-                        }
-
-                        ads.push(ad);
-                    } catch (e) {
-                        console.error('Erreur extraction pub:', e);
-                    }
-                });
+    def _build_result(
+        self,
+        session: ScrollSession,
+        query: Dict,
+        blocker: RequestBlocker,
+        sink: Optional[JsonlSink] = None
+    ) -> Dict:
+        """Assemble le résultat d'un scraping (publicités, angles, statistiques)"""
+        if sink:
+            sink.flush()
+
+        result = {
+            "success": True,
+            "total_ads": session.collected_count,
+            "expected_total": session.expected_total,
+            "ads": None if sink else session.ad_index.ads(),
+            "creative_angles": session.angles.result(),
+            # État fusionnable avec d'autres runs (python creative_angles.py ...),
+            # complet en mémoire, réduit à l'écriture (compact_angles_state)
+            "creative_angles_state": session.angles.to_dict(),
+            "query": query,
+            "stats": {
+                "ads_in_range": session.collected_count,
+                "ads_out_of_range": session.out_of_range_count,
+                "scrolls_performed": session.scrolls,
+                "network_scrolls": session.network_scrolls,
+                "blocking": blocker.stats()
+            },
+            "scraped_at": datetime.now().isoformat()
+        }
+        if session.delta:
+            result["stats"]["delta"] = session.delta.stats()
+        if sink:
+            del result["ads"]
+            result["output_stream"] = sink.filename
+        return result
+
+    def _extract_ads_from_page(
+        self,
+        page,
+        incremental: bool = False,
+        blocked_media: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Extrait les publicités de la page actuelle
 
-                return ads;
-            }
-        """)
+        En mode incrémental, chaque carte traitée est marquée dans la page
+        (attribut data-fb-scraped) et seules les cartes nouvellement
+        attachées sont parcourues et renvoyées.
+
+        blocked_media : URLs des médias bloqués depuis l'extraction précédente
+        (RequestBlocker.drain_media_urls) ; ces images, non chargées donc sans
+        dimensions, sont conservées : seule leur URL nous intéresse.
+        """
+        ads = page.evaluate(EXTRACT_ADS_JS, {
+            "incremental": incremental,
+            "blockedMedia": blocked_media or [],
+            "maxBlockedMedia": MAX_BLOCKED_MEDIA_URLS,
+        })
+        return self._finalize_dom_ads(ads)
+
+    @staticmethod
+    def _finalize_dom_ads(ads: List[Dict]) -> List[Dict]:
+        """Complète les publicités extraites du DOM (empreinte à défaut d'ID)"""
+        for ad in ads:
+            if not ad.get("id"):
+                ad["id"] = content_digest(ad.get("full_text", ""))
+
+        return ads
 
     def _parse_ad_date(self, date_str: str) -> Optional[datetime]:
         """Parse la date d'une publicité"""
@@ -414,74 +689,7 @@ class FacebookAdsLibraryScraper:
 
     def _analyze_creative_angles(self, ads: List[Dict]) -> Dict:
         """Analyse les différents angles créatifs utilisés"""
-        angles = {
-            "unique_headlines": [],
-            "unique_body_texts": [],
-            "unique_ctas": [],
-            "formats": {
-                "image_only": 0,
-                "video_only": 0,
-                "image_and_text": 0,
-                "video_and_text": 0
-            },
-            "platforms": {},
-            "common_themes": []
-        }
-
-        all_text = []
-
-        for ad in ads:
-            # Headlines uniques
-            for headline in ad.get("headlines", []):
-                if headline not in angles["unique_headlines"]:
-                    angles["unique_headlines"].append(headline)
-
-            # Body texts uniques
-            for body in ad.get("body_texts", []):
-                if body not in angles["unique_body_texts"]:
-                    angles["unique_body_texts"].append(body)
-                all_text.append(body.lower())
-
-            # CTAs uniques
-            for cta in ad.get("call_to_actions", []):
-                if cta not in angles["unique_ctas"]:
-                    angles["unique_ctas"].append(cta)
-
-            # Formats
-            has_image = len(ad.get("images", [])) > 0
-            has_video = len(ad.get("videos", [])) > 0
-            has_text = len(ad.get("body_texts", [])) > 0
-
-            if has_image and not has_video and not has_text:
-                angles["formats"]["image_only"] += 1
-            elif has_video and not has_image:
-                angles["formats"]["video_only"] += 1
-            elif has_image and has_text:
-                angles["formats"]["image_and_text"] += 1
-            elif has_video and has_text:
-                angles["formats"]["video_and_text"] += 1
-
-            # Plateformes
-            for platform in ad.get("platforms", []):
-                angles["platforms"][platform] = angles["platforms"].get(platform, 0) + 1
-
-        # Détection de thèmes communs (mots-clés fréquents)
-        from collections import Counter
-        words = []
-        for text in all_text:
-            words.extend(re.findall(r'\b\w{4,}\b', text))
-
-        common_words = Counter(words).most_common(20)
-        angles["common_themes"] = [
-            {"word": word, "count": count}
-            for word, count in common_words
-        ]
-
-        angles["total_unique_headlines"] = len(angles["unique_headlines"])
-        angles["total_unique_body_texts"] = len(angles["unique_body_texts"])
-        angles["total_unique_ctas"] = len(angles["unique_ctas"])
-
-        return angles
+        return analyze_creative_angles(ads)
 
     def _build_url(
         self,
@@ -492,8 +700,6 @@ class FacebookAdsLibraryScraper:
         country: str
     ) -> str:
         """Construit l'URL de recherche Facebook Ads Library"""
-        base_url = "https://www.facebook.com/ads/library/"
-
         params = {
             "active_status": "all",
             "ad_type": "all",
@@ -507,7 +713,13 @@ class FacebookAdsLibraryScraper:
             "view_all_page_id": page_id
         }
 
-        return base_url + "?" + urllib.parse.urlencode(params)
+        return self.base_url + "?" + urllib.parse.urlencode(params)
+
+
+def parse_expected_total(text: Optional[str]) -> Optional[int]:
+    """Convertit le nombre de résultats annoncé ("1 200", "1,200") en entier"""
+    digits = re.sub(r'\D', '', text or "")
+    return int(digits) if digits else None
 
 
 def parse_url(url: str) -> Dict[str, str]:
@@ -534,6 +746,12 @@ def main():
         default="scraper",
         help="Méthode: 'api' (nécessite token) ou 'scraper' (Playwright)"
     )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        metavar="MANIFEST",
+        help="Manifeste JSON de plusieurs recherches à scraper en parallèle (voir config.batch.example.json)"
+    )
     parser.add_argument(
         "--url",
         type=str,
@@ -542,7 +760,7 @@ def main():
     parser.add_argument(
         "--page-id",
         type=str,
-        help="ID de la page Facebook"
+        help="ID de la page Facebook (API : plusieurs IDs séparés par des virgules)"
     )
     parser.add_argument(
         "--search-term",
@@ -563,27 +781,160 @@ def main():
         "--country",
         type=str,
         default="FR",
-        help="Code pays (défaut: FR)"
+        help="Code pays (défaut: FR ; API : plusieurs codes séparés par des virgules)"
     )
     parser.add_argument(
         "--token",
         type=str,
         help="Token d'accès Facebook (pour méthode API)"
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Requêtes API ou contextes navigateur simultanés (plusieurs --page-id/--country, ou --shards)"
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Découper la période en N fenêtres de dates traitées en parallèle "
+             "(scraper : fenêtres incomplètes redécoupées selon le total annoncé)"
+    )
     parser.add_argument(
         "--output",
         type=str,
         default="facebook_ads.json",
-        help="Fichier de sortie JSON"
+        help="Fichier de sortie JSON (.jsonl : une pub par ligne, écrite au fil du scraping ; "
+             ".db/.sqlite : base SQLite cumulée entre les runs)"
     )
     parser.add_argument(
         "--no-headless",
         action="store_true",
         help="Afficher le navigateur (scraper seulement)"
     )
+    parser.add_argument(
+        "--extraction",
+        choices=["network", "dom"],
+        default="network",
+        help="Extraction: 'network' (réponses JSON de la page, DOM en secours) ou 'dom' (scraper seulement)"
+    )
+    parser.add_argument(
+        "--block",
+        choices=list(BLOCKING_PROFILES),
+        default="media",
+        help="Requêtes interrompues: 'none', 'media' (images, vidéos, polices, traceurs) ou 'strict' (+ CSS)"
+    )
+    parser.add_argument(
+        "--fixed-wait",
+        action="store_true",
+        help="Pauses fixes entre les scrolls au lieu de l'attente adaptative (scraper seulement)"
+    )
+    parser.add_argument(
+        "--no-incremental",
+        action="store_true",
+        help="Réextraire toutes les cartes à chaque scroll (scraper seulement)"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Reprendre un run interrompu depuis son point de reprise (recherche simple, scraper ou API)"
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        metavar="FILE",
+        help="Fichier de reprise (défaut: <output>.checkpoint.json)"
+    )
+    parser.add_argument(
+        "--delta-store",
+        type=str,
+        metavar="FILE",
+        help="Stock local des pubs déjà collectées : ne récupérer que les pubs nouvelles ou modifiées"
+    )
+    parser.add_argument(
+        "--delta-stop",
+        type=int,
+        default=DEFAULT_STOP_AFTER,
+        help=f"Pubs connues et inactives consécutives avant d'arrêter (défaut: {DEFAULT_STOP_AFTER})"
+    )
+    parser.add_argument(
+        "--download-media",
+        type=str,
+        metavar="DIR",
+        help="Télécharger les images et vidéos des pubs dans DIR (un fichier par contenu) "
+             "et ajouter leurs chemins locaux aux pubs"
+    )
+    parser.add_argument(
+        "--api-cache",
+        type=str,
+        default=DEFAULT_CACHE_FILE,
+        metavar="FILE",
+        help=f"Cache disque des réponses de l'API (défaut: {DEFAULT_CACHE_FILE})"
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_TTL / 3600,
+        help=f"Durée de validité des réponses en cache, en heures (défaut: {DEFAULT_TTL // 3600})"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ne pas utiliser le cache de l'API"
+    )
+    parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Ignorer les réponses en cache et les remplacer par des réponses fraîches"
+    )
 
     args = parser.parse_args()
 
+    def archive_media(result: Dict):
+        """Archivage des médias, avant l'écriture des résultats"""
+        if not args.download_media:
+            return
+        if result.get("ads"):
+            from media_downloader import download_media
+
+            stats = download_media(result["ads"], args.download_media, concurrency=args.concurrency)
+            result["media"] = {"directory": args.download_media, **stats}
+        elif is_jsonl(args.output):
+            # Flux JSONL : les pubs sont déjà écrites au fil du scraping
+            print(f"⚠ --download-media : lancez python media_downloader.py {args.output} --media-dir {args.download_media}")
+
+    # Scraping différentiel : pubs connues par page
+    known_ads = KnownAdsStore(args.delta_store) if args.delta_store else None
+
+    # Mode batch : plusieurs recherches sur un pool de contextes navigateur
+    if args.batch:
+        from batch_scraper import load_manifest, run_batch
+
+        try:
+            manifest = load_manifest(args.batch)
+        except ValueError as e:
+            print(f"✗ Manifeste invalide : {e}")
+            return
+
+        result = run_batch(manifest, known_ads=known_ads)
+        archive_media(result)
+        result = compact_angles_state(result)
+        if is_sqlite(args.output):
+            with AdsDatabase(args.output) as db:
+                db.upsert_result(result)
+        else:
+            pretty_print = manifest.get("output", {}).get("pretty_print", True)
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2 if pretty_print else None, ensure_ascii=False)
+
+        if result.get("total_jobs"):
+            print(f"\n✓ {result['jobs_succeeded']}/{result['total_jobs']} jobs réussis, {result['total_ads']} publicités")
+            print(f"✓ Données sauvegardées dans: {args.output}")
+        else:
+            print(f"\n✗ Erreur: {result.get('message', 'Aucun job dans le manifeste')}")
+        return
+
     # Parse URL si fournie
     if args.url:
         params = parse_url(args.url)
@@ -608,26 +959,141 @@ def main():
     if not all([page_id, search_term, start_date, end_date]):
         parser.error("Fournissez soit --url, soit tous les paramètres (page-id, search-term, start-date, end-date)")
 
+    # Point de reprise : recherches simples uniquement (les modes parallèles
+    # relancent leurs fenêtres / requêtes en échec)
+    single_search = "," not in page_id and "," not in country and args.shards <= 1
+    checkpoint = None
+    if single_search:
+        checkpoint = Checkpoint(args.checkpoint or default_checkpoint_path(args.output))
+    elif args.resume:
+        print("⚠ --resume ignoré : reprise disponible pour une recherche simple seulement")
+    resume = bool(checkpoint and args.resume and os.path.exists(checkpoint.filename))
+
+    # Sortie JSONL : chaque pub est écrite dès son extraction (scraper simple),
+    # les autres modes écrivent leurs pubs en fin de run dans le même format.
+    # En reprise du scraper, le flux existant est complété.
+    sink = None
+    if is_jsonl(args.output):
+        append = resume and args.method == "scraper" and os.path.exists(args.output)
+        sink = JsonlSink(args.output, mode="a" if append else "w")
+
     # Exécution
     if args.method == "api":
         if not args.token:
             parser.error("La méthode API nécessite --token")
 
         print("Utilisation de l'API Facebook...")
-        api = FacebookAdsLibraryAPI(args.token)
-        result = api.search_ads(page_id, search_term, start_date, end_date, country)
+        cache = None
+        if not args.no_cache:
+            cache = HttpCache(args.api_cache, ttl=args.cache_ttl * 3600, refresh=args.refresh_cache)
+        api = FacebookAdsLibraryAPI(args.token, concurrency=args.concurrency, cache=cache)
+
+        # Plusieurs pages, pays et/ou fenêtres de dates : recherches en parallèle
+        page_ids = [value.strip() for value in page_id.split(",") if value.strip()]
+        countries = [value.strip() for value in country.split(",") if value.strip()]
+        queries = [
+            {
+                "page_id": query_page_id,
+                "search_term": search_term,
+                "start_date": start_date,
+                "end_date": end_date,
+                "country": query_country
+            }
+            for query_page_id in page_ids
+            for query_country in countries
+        ]
+        # Un suivi différentiel par recherche (les fenêtres d'une même
+        # recherche tournent en parallèle : pas de différentiel avec --shards)
+        if known_ads and args.shards <= 1:
+            for query in queries:
+                query["delta"] = DeltaTracker(known_ads.known(query["page_id"]), stop_after=args.delta_stop)
+        elif known_ads:
+            print("⚠ --delta-store ignoré avec --method api --shards")
+
+        if len(queries) > 1 or args.shards > 1:
+            result = sharded_api_search(api, queries, windows=args.shards)
+        else:
+            query = queries[0]
+            result = api.search_ads(
+                page_id, search_term, start_date, end_date, country,
+                checkpoint=checkpoint, resume=resume, delta=query.get("delta")
+            )
+
+        if result.get("success"):
+            for query in queries:
+                if "delta" in query:
+                    known_ads.update(query["page_id"], query["delta"])
+
+        if cache:
+            print(f"✓ Cache API : {cache.hits} pages relues en cache, {cache.misses} requêtes ({args.api_cache})")
+            cache.close()
+
+    elif args.shards > 1:
+        from batch_scraper import BatchScraper
+
+        print(f"Utilisation du scraper Playwright ({args.shards} fenêtres de dates)...")
+        batch = BatchScraper(
+            scraper_config={
+                "headless": not args.no_headless,
+                "incremental": not args.no_incremental,
+                "adaptive_wait": not args.fixed_wait,
+                "extraction": args.extraction,
+                "block_profile": args.block,
+            },
+            concurrency=args.concurrency,
+            known_ads=known_ads,
+            delta_stop_after=args.delta_stop
+        )
+        result = ShardedScraper(batch, initial_windows=args.shards).run({
+            "page_id": page_id,
+            "search_term": search_term,
+            "start_date": start_date,
+            "end_date": end_date,
+            "country": country
+        })
 
     else:  # scraper
         print("Utilisation du scraper Playwright...")
         scraper = FacebookAdsLibraryScraper()
+        delta = DeltaTracker(known_ads.known(page_id), stop_after=args.delta_stop) if known_ads else None
         result = scraper.search_ads(
             page_id, search_term, start_date, end_date, country,
-            headless=not args.no_headless
+            headless=not args.no_headless,
+            incremental=not args.no_incremental,
+            adaptive_wait=not args.fixed_wait,
+            extraction=args.extraction,
+            block_profile=args.block,
+            sink=sink,
+            checkpoint=checkpoint,
+            resume=resume,
+            delta=delta
         )
+        if delta and result.get("success"):
+            known_ads.update(page_id, delta)
+
+    # Le stock n'est mis à jour qu'après un run réussi (sinon les pubs du run
+    # en échec seraient considérées comme déjà collectées au run suivant)
+    if known_ads:
+        known_ads.save()
+
+    archive_media(result)
+    result = compact_angles_state(result)
 
     # Sauvegarde
-    with open(args.output, "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
+    if sink:
+        for ad in result.get("ads", []):
+            sink.write_ad(ad)
+        # Run à reprendre : pas de résumé, le flux reste marqué incomplet
+        if "checkpoint" not in result:
+            sink.write_summary(result)
+        sink.close()
+    elif is_sqlite(args.output):
+        # Base cumulée : les pubs déjà présentes sont mises à jour
+        with AdsDatabase(args.output) as db:
+            db.upsert_result(result)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
 
     if result.get("success"):
         print(f"\n✓ Succès ! {result.get('total_ads', 0)} publicités récupérées")
@@ -636,6 +1102,8 @@ def main():
         print(f"\n✗ Erreur: {result.get('message', 'Erreur inconnue')}")
         if "error" in result:
             print(f"  Détails: {result['error']}")
+        if "checkpoint" in result:
+            print(f"  Point de reprise: {result['checkpoint']} (relancez avec --resume)")
 
 
 if __name__ == "__main__":
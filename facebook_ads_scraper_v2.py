@@ -10,24 +10,143 @@ from datetime import datetime
 from playwright.sync_api import sync_playwright
 import time
 
-def scrape_facebook_ads(url, output_file="facebook_ads.json"):
-    """Scrape Facebook Ads Library avec une approche robuste"""
+from ad_record import AdRecord
+from ads_db import AdsDatabase, is_sqlite
+from ads_io import JsonlSink, is_jsonl
+from browser_daemon import launch_browser
+from playwright_utils import FeedWaiter, RequestBlocker
+
+SECTION_SPLIT = re.compile(r'(?=Inactive\s+ID dans la bibliothèque)')
+SECTION_ID = re.compile(r'ID dans la bibliothèque\s*:\s*(\d+)')
+SECTION_DATES = re.compile(r'(\d+\s+\w+\s+\d{4})\s*-\s*(\d+\s+\w+\s+\d{4})')
+
+# Texte des cartes de résultats pas encore lues, marquées au passage (comme
+# le mode incrémental de facebook_ads_scraper.py). null si la page n'a
+# aucune carte reconnue : on se rabat alors sur le texte de la page.
+NEW_SECTIONS_JS = """
+    () => {
+        const selector = '[data-testid="search_result_ad_card"], [role="article"]';
+        if (!document.querySelector(selector)) {
+            return null;
+        }
+        const texts = [];
+        document.querySelectorAll(
+            '[data-testid="search_result_ad_card"]:not([data-fb-scraped]), [role="article"]:not([data-fb-scraped])'
+        ).forEach((card) => {
+            const text = card.innerText;
+            // Carte pas encore hydratée : on la reprendra au prochain scroll
+            if (!/ID dans la biblioth/.test(text)) {
+                return;
+            }
+            card.setAttribute('data-fb-scraped', '1');
+            texts.push(text);
+        });
+        return texts;
+    }
+"""
+
+
+def parse_section(section, ad_id):
+    """Publicité extraite d'une section de texte (une carte)"""
+    # Extraire la date
+    date_match = SECTION_DATES.search(section)
+    date_start = date_match.group(1) if date_match else None
+    date_end = date_match.group(2) if date_match else None
+
+    # Extraire les plateformes
+    platforms = []
+    if 'Facebook' in section:
+        platforms.append('Facebook')
+    if 'Instagram' in section:
+        platforms.append('Instagram')
+    if 'Messenger' in section:
+        platforms.append('Messenger')
+
+    # Extraire le texte de la pub (après "Sponsorisé")
+    text_after_sponsored = section.split('Sponsorisé', 1)
+    ad_text = text_after_sponsored[1][:500].strip() if len(text_after_sponsored) > 1 else ""
+
+    # Lignes du texte
+    lines = [line.strip() for line in ad_text.split('\n') if line.strip()]
+
+    return {
+        "id": ad_id,
+        "date_start": date_start,
+        "date_end": date_end,
+        "platforms": platforms,
+        "text_preview": ad_text[:200],
+        "text_lines": lines[:10],  # Premières lignes
+        "full_section": section[:1000]  # Échantillon pour debug
+    }
+
+
+class SectionReader:
+    """
+    Sections de texte nouvelles à chaque scroll, chacune lue une seule fois
+
+    Seul le texte des cartes ajoutées depuis le scroll précédent est transféré
+    et découpé : le coût d'un scroll ne dépend plus de la longueur du flux.
+    Sans carte reconnue dans la page, le texte complet est relu mais seule la
+    partie au-delà de la dernière section déjà traitée est découpée.
+    """
+
+    def __init__(self, page, incremental=True):
+        self.page = page
+        self.incremental = incremental
+        self.consumed = 0
+
+    def read(self):
+        texts = self.page.evaluate(NEW_SECTIONS_JS) if self.incremental else None
+        if texts is not None:
+            return [section for text in texts for section in SECTION_SPLIT.split(text)]
+
+        current_text = self.page.inner_text('body')
+        if not self.incremental:
+            return SECTION_SPLIT.split(current_text)
+
+        if len(current_text) < self.consumed:
+            # Flux rechargé ou raccourci : on repart du début (doublons filtrés par ID)
+            self.consumed = 0
+        sections = SECTION_SPLIT.split(current_text[self.consumed:])
+        # La dernière section peut encore grandir : elle sera relue au prochain scroll
+        self.consumed = len(current_text) - len(sections[-1])
+        return sections
+
+
+def scrape_facebook_ads(url, output_file="facebook_ads.json", adaptive_wait=True, block_profile="media",
+                        incremental=True):
+    """Scrape Facebook Ads Library avec une approche robuste
+
+    Avec adaptive_wait, les pauses fixes sont remplacées par une attente
+    du chargement effectif du flux (mutations DOM + requêtes réseau).
+    Avec incremental, seules les cartes ajoutées depuis le scroll précédent
+    sont lues (voir SectionReader) au lieu de tout le texte de la page.
+    block_profile ('none', 'media', 'strict') interrompt les médias, polices
+    et traceurs : seul le texte est exploité ici.
+    Si output_file se termine par .jsonl, chaque pub y est écrite dès son
+    extraction et le résumé du run en dernière ligne ; avec .db/.sqlite, les
+    pubs sont ajoutées (ou mises à jour) dans la base SQLite.
+    """
+    sink = JsonlSink(output_file) if is_jsonl(output_file) else None
 
     with sync_playwright() as p:
         print("Lancement du navigateur...")
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-        )
+        browser, options = launch_browser(p, headless=True)
+        context = browser.new_context(**options)
+        blocker = RequestBlocker(block_profile).install(context)
         page = context.new_page()
+        waiter = FeedWaiter(page) if adaptive_wait else None
+        reader = SectionReader(page, incremental=incremental)
 
         print(f"Navigation vers: {url}")
         page.goto(url, timeout=60000)
 
         # Attendre que la page soit chargée
         print("Attente du chargement de la page...")
-        time.sleep(8)
+        if waiter:
+            waiter.wait(timeout=20.0, quiet=1.5)
+        else:
+            time.sleep(8)
 
         # Vérifier combien de résultats sont disponibles
         page_text = page.locator('body').inner_text()
@@ -44,11 +163,8 @@ def scrape_facebook_ads(url, output_file="facebook_ads.json"):
         for scroll_num in range(max_scrolls):
             print(f"\n[Scroll {scroll_num + 1}/{max_scrolls}]")
 
-            # Extraire le texte complet de la page
-            current_text = page.inner_text('body')
-
-            # Diviser en sections de publicités basées sur des patterns
-            ad_sections = re.split(r'(?=Inactive\s+ID dans la bibliothèque)', current_text)
+            # Sections de publicités apparues depuis le scroll précédent
+            ad_sections = reader.read()
 
             new_ads_this_scroll = 0
 
@@ -57,7 +173,7 @@ def scrape_facebook_ads(url, output_file="facebook_ads.json"):
                     continue
 
                 # Extraire l'ID de la pub
-                id_match = re.search(r'ID dans la bibliothèque\s*:\s*(\d+)', section)
+                id_match = SECTION_ID.search(section)
                 if not id_match:
                     continue
 
@@ -70,38 +186,13 @@ def scrape_facebook_ads(url, output_file="facebook_ads.json"):
                 ads_seen.add(ad_id)
                 new_ads_this_scroll += 1
 
-                # Extraire la date
-                date_match = re.search(r'(\d+\s+\w+\s+\d{4})\s*-\s*(\d+\s+\w+\s+\d{4})', section)
-                date_start = date_match.group(1) if date_match else None
-                date_end = date_match.group(2) if date_match else None
-
-                # Extraire les plateformes
-                platforms = []
-                if 'Facebook' in section:
-                    platforms.append('Facebook')
-                if 'Instagram' in section:
-                    platforms.append('Instagram')
-                if 'Messenger' in section:
-                    platforms.append('Messenger')
-
-                # Extraire le texte de la pub (après "Sponsorisé")
-                text_after_sponsored = section.split('Sponsorisé', 1)
-                ad_text = text_after_sponsored[1][:500].strip() if len(text_after_sponsored) > 1 else ""
-
-                # Lignes du texte
-                lines = [line.strip() for line in ad_text.split('\n') if line.strip()]
-
-                ad_data = {
-                    "id": ad_id,
-                    "date_start": date_start,
-                    "date_end": date_end,
-                    "platforms": platforms,
-                    "text_preview": ad_text[:200],
-                    "text_lines": lines[:10],  # Premières lignes
-                    "full_section": section[:1000]  # Échantillon pour debug
-                }
-
-                all_ads.append(ad_data)
+                ad_data = parse_section(section, ad_id)
+                all_ads.append(AdRecord.from_dict(ad_data))
+                if sink:
+                    sink.write_ad(ad_data)
+
+            if sink:
+                sink.flush()
 
             print(f"  Nouvelles pubs trouvées: {new_ads_this_scroll}")
             print(f"  Total accumulé: {len(all_ads)}")
@@ -122,7 +213,10 @@ def scrape_facebook_ads(url, output_file="facebook_ads.json"):
 
             # Scroll
             page.evaluate("window.scrollBy(0, window.innerHeight * 2)")
-            time.sleep(3)
+            if waiter:
+                waiter.wait()
+            else:
+                time.sleep(3)
 
         browser.close()
 
@@ -131,7 +225,7 @@ def scrape_facebook_ads(url, output_file="facebook_ads.json"):
         all_text_lines = []
 
         for ad in all_ads:
-            for line in ad.get('text_lines', []):
+            for line in ad.text_lines:
                 if 5 < len(line) < 100:
                     if line not in headlines:
                         headlines.append(line)
@@ -141,18 +235,28 @@ def scrape_facebook_ads(url, output_file="facebook_ads.json"):
             "success": True,
             "total_ads": len(all_ads),
             "expected_total": total_expected,
-            "ads": all_ads,
+            "ads": [ad.to_dict() for ad in all_ads],
             "analysis": {
                 "unique_text_lines": len(headlines),
                 "sample_headlines": headlines[:20]
             },
+            "blocking": blocker.stats(),
             "scraped_at": datetime.now().isoformat(),
             "url": url
         }
 
         # Sauvegarder
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        if sink:
+            sink.write_summary(result)
+            sink.close()
+        elif is_sqlite(output_file):
+            from facebook_ads_scraper import parse_url
+
+            with AdsDatabase(output_file) as db:
+                db.upsert_result(result, query=parse_url(url))
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
 
         print(f"\n✓ {len(all_ads)} publicités récupérées")
         print(f"✓ Sauvegardé dans: {output_file}")
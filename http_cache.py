@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Cache disque des réponses de l'API Graph (SQLite).
+
+Une réponse est identifiée par l'URL et ses paramètres normalisés (ordre
+indifférent, sans le token d'accès), curseur de pagination compris : relancer
+la même recherche dans la journée relit les pages depuis le disque, sans
+consommer de quota. Les entrées expirent après `ttl` secondes, et les moins
+récemment lues sont évincées au-delà de `max_bytes` (réponses compressées).
+"""
+
+import hashlib
+import sqlite3
+import time
+import urllib.parse
+import zlib
+from typing import Dict, Optional
+
+from ads_io import json_dumps, json_loads
+
+
+DEFAULT_CACHE_FILE = "graph_api_cache.db"
+DEFAULT_TTL = 12 * 3600
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+
+# Paramètres sans effet sur la réponse
+IGNORED_PARAMS = {"access_token", "appsecret_proof"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);
+"""
+
+
+def normalize_request(url: str, params: Optional[Dict] = None) -> str:
+    """URL canonique d'une requête : paramètres triés, token retiré"""
+    parsed = urllib.parse.urlparse(url)
+    query = urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)
+    query.extend((key, str(value)) for key, value in (params or {}).items())
+    query = sorted((key, value) for key, value in query if key not in IGNORED_PARAMS)
+    return urllib.parse.urlunparse(parsed._replace(query=urllib.parse.urlencode(query), fragment=""))
+
+
+class HttpCache:
+    """Cache de réponses JSON avec expiration et éviction LRU"""
+
+    def __init__(
+        self,
+        filename: str = DEFAULT_CACHE_FILE,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        refresh: bool = False
+    ):
+        """
+        Args:
+            filename: Base SQLite du cache
+            ttl: Durée de validité d'une réponse (secondes)
+            max_bytes: Taille maximale des réponses stockées (compressées)
+            refresh: Ignorer les réponses en cache, tout en enregistrant les nouvelles
+        """
+        self.filename = filename
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.conn = sqlite3.connect(filename)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        # Taille stockée, calculée à l'ouverture puis tenue à jour à chaque écriture
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def key_for(url: str, params: Optional[Dict] = None) -> str:
+        return hashlib.sha256(normalize_request(url, params).encode("utf-8")).hexdigest()
+
+    def get(self, url: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """Réponse en cache encore valide, ou None"""
+        if self.refresh:
+            self.misses += 1
+            return None
+
+        key = self.key_for(url, params)
+        row = self.conn.execute("SELECT body, created, size FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or now - row[1] > self.ttl:
+            if row is not None:
+                with self.conn:
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.total_bytes -= row[2]
+            self.misses += 1
+            return None
+
+        with self.conn:
+            self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return json_loads(zlib.decompress(row[0]))
+
+    def put(self, url: str, params: Optional[Dict], body: Dict):
+        """Enregistre une réponse, puis évince les plus anciennes si le cache est plein"""
+        data = zlib.compress(json_dumps(body).encode("utf-8"))
+        key = self.key_for(url, params)
+        now = time.time()
+        with self.conn:
+            replaced = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, url, body, size, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, normalize_request(url, params), data, len(data), now, now)
+            )
+        self.total_bytes += len(data) - (replaced[0] if replaced else 0)
+        self._evict()
+
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+
+        with self.conn:
+            # Expirées d'abord, puis les moins récemment lues
+            cutoff = time.time() - self.ttl
+            count, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses WHERE created < ?", (cutoff,)
+            ).fetchone()
+            self.conn.execute("DELETE FROM responses WHERE created < ?", (cutoff,))
+            self.evictions += count
+            self.total_bytes -= size
+
+            for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+                if self.total_bytes <= self.max_bytes:
+                    break
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.total_bytes -= size
+                self.evictions += 1
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM responses")
+        self.total_bytes = 0
+
+    def stats(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cache des réponses de l'API Graph")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_FILE, help=f"Base du cache (défaut: {DEFAULT_CACHE_FILE})")
+    parser.add_argument("--clear", action="store_true", help="Vider le cache")
+    args = parser.parse_args()
+
+    with HttpCache(args.cache) as cache:
+        if args.clear:
+            cache.clear()
+            print(f"✓ Cache vidé : {args.cache}")
+            return
+        count, size = cache.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        print(f"{args.cache} : {count} réponses, {size / 1024 / 1024:.1f} Mo")
+
+
+if __name__ == "__main__":
+    main()
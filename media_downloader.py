@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Archivage des médias des publicités (images, vidéos, miniatures).
+
+Les téléchargements tournent en parallèle sur une session HTTP partagée,
+sous une limite de concurrence. Chaque fichier est stocké une seule fois
+sous l'empreinte SHA-256 de son contenu (media/ab/abcd....jpg) :
+- une URL déjà téléchargée (ou en cours) n'est pas redemandée ;
+- deux URLs différentes au même contenu (variantes d'une même créa, URLs
+  signées du CDN qui changent d'un run à l'autre) partagent le même fichier.
+
+Le chemin local est ajouté aux pubs : images[].local_path,
+videos[].local_path et videos[].poster_local_path. L'index
+(media/index.json) garde la correspondance URL -> fichier entre les runs.
+
+Test sans Facebook : servir des fichiers avec `python -m http.server` et
+pointer les src des pubs sur http://localhost:8000/...
+"""
+
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import random
+import sys
+import urllib.parse
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rate_limit import RETRYABLE_STATUSES
+
+
+DEFAULT_MEDIA_DIR = "media"
+INDEX_FILENAME = "index.json"
+CHUNK_SIZE = 64 * 1024
+
+# (liste de la pub, champ URL, champ du chemin local)
+MEDIA_FIELDS = (
+    ("images", "src", "local_path"),
+    ("videos", "src", "local_path"),
+    ("videos", "poster", "poster_local_path"),
+)
+
+
+def media_urls(ad: Dict) -> List[str]:
+    """URLs HTTP(S) des médias d'une pub, sans doublon"""
+    urls = {}
+    for field, url_key, _ in MEDIA_FIELDS:
+        for item in ad.get(field) or []:
+            url = item.get(url_key) if isinstance(item, dict) else None
+            if url and url.startswith(("http://", "https://")):
+                urls[url] = None
+    return list(urls)
+
+
+def media_extension(url: str, content_type: Optional[str]) -> str:
+    """Extension du fichier : type MIME de la réponse, sinon chemin de l'URL"""
+    if content_type:
+        extension = mimetypes.guess_extension(content_type.split(";")[0].strip())
+        if extension:
+            return ".jpg" if extension in (".jpe", ".jpeg") else extension
+    extension = os.path.splitext(urllib.parse.urlparse(url).path)[1].lower()
+    return extension if 1 < len(extension) <= 5 else ""
+
+
+class MediaDownloader:
+    """Téléchargeur asynchrone avec stockage adressé par contenu"""
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_MEDIA_DIR,
+        concurrency: int = 8,
+        timeout: float = 60.0,
+        max_retries: int = 3,
+        verbose: bool = True
+    ):
+        """
+        Args:
+            directory: Dossier de stockage des médias
+            concurrency: Nombre maximum de téléchargements simultanés
+            timeout: Délai maximum par fichier (secondes)
+            max_retries: Nouveaux essais sur erreur réseau ou HTTP 429 / 5xx
+            verbose: Afficher la progression
+        """
+        self.directory = directory
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.verbose = verbose
+        self.index_filename = os.path.join(directory, INDEX_FILENAME)
+
+        # URL -> {"sha256", "path", "content_type", "size"}
+        self.index: Dict[str, Dict] = {}
+        if os.path.exists(self.index_filename):
+            with open(self.index_filename, 'r', encoding='utf-8') as f:
+                self.index = json.load(f).get("urls", {})
+
+        self.stats = {"downloaded": 0, "cached": 0, "deduplicated": 0, "failed": 0, "bytes": 0}
+        self._session = None
+        self._semaphore = None
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        import aiohttp
+
+        if self._session is None:
+            os.makedirs(self.directory, exist_ok=True)
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self.save_index()
+
+    def save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_filename = self.index_filename + ".tmp"
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump({"urls": self.index}, f, ensure_ascii=False)
+        os.replace(tmp_filename, self.index_filename)
+
+    def _cached(self, url: str) -> Optional[Dict]:
+        entry = self.index.get(url)
+        if entry and os.path.exists(entry["path"]):
+            return entry
+        return None
+
+    async def _fetch(self, url: str) -> Tuple[str, str, Optional[str], int]:
+        """Télécharge vers un fichier temporaire en calculant l'empreinte au fil de l'eau"""
+        import aiohttp
+
+        attempt = 0
+        while True:
+            tmp_filename = os.path.join(self.directory, f".{os.getpid()}.{id(asyncio.current_task())}.part")
+            try:
+                async with self._semaphore:
+                    async with self._session.get(url) as response:
+                        if response.status in RETRYABLE_STATUSES and attempt < self.max_retries:
+                            reason = f"HTTP {response.status}"
+                        else:
+                            response.raise_for_status()
+                            digest = hashlib.sha256()
+                            size = 0
+                            with open(tmp_filename, 'wb') as f:
+                                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                                    digest.update(chunk)
+                                    f.write(chunk)
+                                    size += len(chunk)
+                            return tmp_filename, digest.hexdigest(), response.headers.get("Content-Type"), size
+
+            except BaseException as e:
+                # Aucun fichier partiel laissé (disque plein, annulation...) ;
+                # seules les erreurs réseau sont retentées
+                if os.path.exists(tmp_filename):
+                    os.remove(tmp_filename)
+                retryable = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+                if not isinstance(e, retryable) or attempt >= self.max_retries:
+                    raise
+                reason = str(e) or e.__class__.__name__
+
+            delay = random.uniform(0, min(30.0, 2 ** attempt))
+            if self.verbose:
+                print(f"  ⚠ {reason} - nouvel essai {attempt + 1}/{self.max_retries} dans {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _download(self, url: str) -> Optional[Dict]:
+        import aiohttp
+
+        try:
+            tmp_filename, sha256, content_type, size = await self._fetch(url)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            self.stats["failed"] += 1
+            if self.verbose:
+                print(f"  ✗ {url[:80]} : {str(e) or e.__class__.__name__}")
+            return None
+
+        path = os.path.join(self.directory, sha256[:2], sha256 + media_extension(url, content_type))
+        if os.path.exists(path):
+            # Même contenu qu'un fichier déjà stocké (autre URL)
+            os.remove(tmp_filename)
+            self.stats["deduplicated"] += 1
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_filename, path)
+            self.stats["downloaded"] += 1
+            self.stats["bytes"] += size
+
+        entry = {"sha256": sha256, "path": path, "content_type": content_type, "size": size}
+        self.index[url] = entry
+        return entry
+
+    async def fetch(self, url: str) -> Optional[Dict]:
+        """
+        Entrée d'index d'une URL (téléchargée une seule fois)
+
+        Returns:
+            {"sha256", "path", "content_type", "size"}, ou None en cas d'échec
+        """
+        entry = self._cached(url)
+        if entry:
+            self.stats["cached"] += 1
+            return entry
+
+        # Même URL demandée par plusieurs pubs en même temps : un seul téléchargement
+        task = self._pending.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._download(url))
+            self._pending[url] = task
+        else:
+            self.stats["cached"] += 1
+        try:
+            return await task
+        finally:
+            self._pending.pop(url, None)
+
+    async def download_ads(self, ads: Iterable[Dict]) -> List[Dict]:
+        """Télécharge les médias des pubs et y ajoute leurs chemins locaux"""
+        await self.open()
+        ads = list(ads)
+
+        urls = list(dict.fromkeys(url for ad in ads for url in media_urls(ad)))
+        if self.verbose:
+            print(f"Téléchargement de {len(urls)} médias ({self.concurrency} simultanés)...")
+
+        entries = dict(zip(urls, await asyncio.gather(*[self.fetch(url) for url in urls])))
+
+        for ad in ads:
+            for field, url_key, path_key in MEDIA_FIELDS:
+                for item in ad.get(field) or []:
+                    entry = entries.get(item.get(url_key)) if isinstance(item, dict) else None
+                    if entry:
+                        item[path_key] = entry["path"]
+
+        self.save_index()
+        if self.verbose:
+            print(f"✓ Médias : {self.stats['downloaded']} téléchargés, {self.stats['deduplicated']} doublons "
+                  f"de contenu, {self.stats['cached']} déjà présents, {self.stats['failed']} en échec")
+        return ads
+
+
+def download_media(
+    ads: List[Dict],
+    directory: str = DEFAULT_MEDIA_DIR,
+    concurrency: int = 8,
+    verbose: bool = True
+) -> Dict:
+    """
+    Version synchrone : télécharge les médias des pubs (modifiées sur place)
+
+    Returns:
+        Statistiques (downloaded, cached, deduplicated, failed, bytes)
+    """
+    async def run():
+        async with MediaDownloader(directory, concurrency=concurrency, verbose=verbose) as downloader:
+            await downloader.download_ads(ads)
+            return downloader.stats
+
+    return asyncio.run(run())
+
+
+def main():
+    import argparse
+
+    from ads_io import JsonlSink, is_jsonl, load_json_results, load_jsonl_results
+
+    parser = argparse.ArgumentParser(description="Archivage des médias des publicités (stockage par empreinte)")
+    parser.add_argument("input", help="Résultats JSON ou JSONL")
+    parser.add_argument("--media-dir", default=DEFAULT_MEDIA_DIR, help=f"Dossier des médias (défaut: {DEFAULT_MEDIA_DIR})")
+    parser.add_argument("--concurrency", type=int, default=8, help="Téléchargements simultanés (défaut: 8)")
+    parser.add_argument("--output", help="Résultats complétés des chemins locaux (défaut: le fichier d'entrée)")
+    args = parser.parse_args()
+
+    output = args.output or args.input
+    result = load_jsonl_results(args.input) if is_jsonl(args.input) else load_json_results(args.input)
+
+    try:
+        stats = download_media(result.get("ads", []), args.media_dir, concurrency=args.concurrency)
+    except ImportError:
+        print("✗ aiohttp non installé : pip install aiohttp")
+        sys.exit(1)
+    result["media"] = {"directory": args.media_dir, **stats}
+
+    if is_jsonl(output):
+        with JsonlSink(output) as sink:
+            for ad in result.get("ads", []):
+                sink.write_ad(ad)
+            sink.write_summary(result)
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"✓ Chemins locaux ajoutés : {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Extraction des publicités à partir des réponses réseau de la bibliothèque.
+
+Pendant le scroll, la page Ads Library récupère les résultats sous forme de
+JSON (GraphQL). Plutôt que de relire le texte rendu, on intercepte ces
+réponses et on convertit directement chaque noeud "ad_archive_id" en
+enregistrement au format du scraper (mêmes clés que l'extraction DOM, plus
+les champs que le texte rendu ne donne pas : page, statut, format...).
+"""
+
+import json
+import re
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# Réponses réseau susceptibles de contenir des résultats
+CAPTURE_URL_MARKERS = ("/api/graphql", "/ads/library/async")
+
+PLATFORM_NAMES = {
+    "FACEBOOK": "Facebook",
+    "INSTAGRAM": "Instagram",
+    "MESSENGER": "Messenger",
+    "AUDIENCE_NETWORK": "Audience Network",
+    "THREADS": "Threads",
+    "WHATSAPP": "WhatsApp",
+}
+
+# Noms de mois anglais indépendants de la locale (format "January 1, 2025")
+MONTH_NAMES = (
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December"
+)
+
+JSON_SCRIPT_PATTERN = re.compile(
+    r'<script[^>]+type="application/json"[^>]*>(.*?)</script>',
+    re.DOTALL
+)
+
+AD_LIBRARY_URL = "https://www.facebook.com/ads/library/?id={}"
+
+
+def parse_payload(text: str) -> List:
+    """
+    Décode le corps d'une réponse : JSON simple, préfixe anti-XSSI
+    "for (;;);" ou plusieurs documents JSON séparés par des retours à la ligne
+    """
+    if not text:
+        return []
+
+    text = text.strip()
+    if text.startswith("for (;;);"):
+        text = text[len("for (;;);"):]
+
+    try:
+        return [json.loads(text)]
+    except ValueError:
+        pass
+
+    documents = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            documents.append(json.loads(line))
+        except ValueError:
+            continue
+    return documents
+
+
+def parse_html_payload(html: str) -> List:
+    """Décode les blocs <script type="application/json"> d'un document HTML"""
+    documents = []
+    for block in JSON_SCRIPT_PATTERN.findall(html or ""):
+        try:
+            documents.append(json.loads(block))
+        except ValueError:
+            continue
+    return documents
+
+
+def iter_ad_nodes(obj) -> Iterator[Dict]:
+    """Parcourt un document JSON et renvoie les noeuds de publicité"""
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            if "ad_archive_id" in current and isinstance(current.get("snapshot"), dict):
+                yield current
+                continue
+            stack.extend(reversed(list(current.values())))
+        elif isinstance(current, list):
+            stack.extend(reversed(current))
+
+
+def _format_timestamp(timestamp) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Timestamp Unix -> ("January 1, 2025", "2025-01-01")
+
+    En heure locale, comme la date affichée par la page (le contexte navigateur
+    n'impose pas de fuseau) et les bornes --start-date / --end-date.
+    """
+    if not timestamp:
+        return None, None
+    try:
+        dt = datetime.fromtimestamp(int(timestamp))
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None, None
+    return f"{MONTH_NAMES[dt.month - 1]} {dt.day}, {dt.year}", dt.strftime("%Y-%m-%d")
+
+
+def _text(value) -> str:
+    """Texte d'un champ snapshot (chaîne ou {"text": ...})"""
+    if isinstance(value, dict):
+        value = value.get("text")
+    return value.strip() if isinstance(value, str) else ""
+
+
+def _append_unique(values: List, value):
+    if value and value not in values:
+        values.append(value)
+
+
+def ad_record_from_node(node: Dict) -> Dict:
+    """Convertit un noeud GraphQL en enregistrement publicitaire"""
+    snapshot = node.get("snapshot") or {}
+    ad_id = str(node["ad_archive_id"])
+
+    headlines, bodies, ctas, links = [], [], [], []
+    images, videos = [], []
+    link_descriptions, captions = [], []
+    seen_media = set()
+
+    # Le snapshot principal puis les cartes d'un carrousel
+    parts = [snapshot] + list(snapshot.get("cards") or [])
+    for part in parts:
+        _append_unique(headlines, _text(part.get("title")))
+        _append_unique(bodies, _text(part.get("body")))
+        _append_unique(ctas, _text(part.get("cta_text")))
+        _append_unique(links, _text(part.get("link_url")))
+        _append_unique(link_descriptions, _text(part.get("link_description")))
+        _append_unique(captions, _text(part.get("caption")))
+
+        image_url = part.get("original_image_url") or part.get("resized_image_url")
+        if image_url and image_url not in seen_media:
+            seen_media.add(image_url)
+            images.append({"src": image_url, "alt": ""})
+
+        video_url = part.get("video_hd_url") or part.get("video_sd_url")
+        if video_url and video_url not in seen_media:
+            seen_media.add(video_url)
+            videos.append({"src": video_url, "poster": part.get("video_preview_image_url") or ""})
+
+    for image in list(snapshot.get("images") or []) + list(snapshot.get("extra_images") or []):
+        image_url = image.get("original_image_url") or image.get("resized_image_url")
+        if image_url and image_url not in seen_media:
+            seen_media.add(image_url)
+            images.append({"src": image_url, "alt": ""})
+
+    for video in list(snapshot.get("videos") or []) + list(snapshot.get("extra_videos") or []):
+        video_url = video.get("video_hd_url") or video.get("video_sd_url")
+        if video_url and video_url not in seen_media:
+            seen_media.add(video_url)
+            videos.append({"src": video_url, "poster": video.get("video_preview_image_url") or ""})
+
+    platforms = []
+    for platform in node.get("publisher_platform") or []:
+        _append_unique(platforms, PLATFORM_NAMES.get(platform, str(platform).title()))
+
+    date_started, date_start = _format_timestamp(node.get("start_date"))
+    _, date_end = _format_timestamp(node.get("end_date"))
+
+    ad = {
+        "id": ad_id,
+        "library_id": ad_id,
+        "source": "network",
+        "page_id": str(node.get("page_id") or snapshot.get("page_id") or ""),
+        "page_name": node.get("page_name") or snapshot.get("page_name") or "",
+        "is_active": node.get("is_active"),
+        "date_start": date_start,
+        "date_end": date_end,
+        "headlines": headlines,
+        "body_texts": bodies,
+        "images": images,
+        "videos": videos,
+        "call_to_actions": ctas,
+        "external_links": links,
+        "platforms": platforms,
+        "display_format": snapshot.get("display_format"),
+        "link_descriptions": link_descriptions,
+        "captions": captions,
+        "collation_id": node.get("collation_id"),
+        "collation_count": node.get("collation_count"),
+        "full_text": "\n".join(headlines + bodies + link_descriptions + ctas),
+        "ad_library_url": AD_LIBRARY_URL.format(ad_id),
+    }
+    if date_started:
+        ad["date_started"] = date_started
+
+    return ad
+
+
+def extract_ads_from_documents(documents: List) -> List[Dict]:
+    """Enregistrements de toutes les publicités présentes dans des documents JSON"""
+    ads = []
+    for document in documents:
+        for node in iter_ad_nodes(document):
+            ads.append(ad_record_from_node(node))
+    return ads
+
+
+class ResponseCapture:
+    """Intercepte les réponses de la page et en extrait les publicités"""
+
+    def __init__(self, page, url_markers: Tuple[str, ...] = CAPTURE_URL_MARKERS):
+        """
+        Args:
+            page: Page Playwright (API synchrone), avant la navigation
+            url_markers: Fragments d'URL des réponses à analyser
+        """
+        self.url_markers = url_markers
+        self.total_ads = 0
+        self.responses_parsed = 0
+        self._pending = []
+        page.on("response", self._on_response)
+
+    def _on_response(self, response):
+        # Le corps est lu plus tard, hors du gestionnaire d'événement
+        resource_type = response.request.resource_type
+        if resource_type == "document" or any(marker in response.url for marker in self.url_markers):
+            self._pending.append(response)
+
+    def _parse_response(self, response, body: str) -> List[Dict]:
+        if response.request.resource_type == "document":
+            documents = parse_html_payload(body)
+        else:
+            documents = parse_payload(body)
+
+        self.responses_parsed += 1
+        return extract_ads_from_documents(documents)
+
+    def drain(self) -> List[Dict]:
+        """Analyse les réponses reçues depuis le dernier appel"""
+        pending, self._pending = self._pending, []
+        ads = []
+
+        for response in pending:
+            try:
+                body = response.text()
+            except Exception:
+                # Réponse indisponible (redirection, page fermée...)
+                continue
+            ads.extend(self._parse_response(response, body))
+
+        self.total_ads += len(ads)
+        return ads
+
+    async def drain_async(self) -> List[Dict]:
+        """drain() pour l'API asynchrone de Playwright"""
+        pending, self._pending = self._pending, []
+        ads = []
+
+        for response in pending:
+            try:
+                body = await response.text()
+            except Exception:
+                continue
+            ads.extend(self._parse_response(response, body))
+
+        self.total_ads += len(ads)
+        return ads
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Utilitaires Playwright partagés par les scrapers Facebook Ads Library.
+
+FeedWaiter remplace les pauses fixes (time.sleep) par une attente adaptative :
+on rend la main dès que de nouveaux noeuds sont attachés au DOM et que les
+requêtes du flux sont terminées, avec un délai plafond.
+
+RequestBlocker interrompt les médias, polices et traceurs pendant le scroll ;
+les URLs des médias restent dans le DOM et les réponses JSON, donc dans les
+champs images/videos des publicités.
+"""
+
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+
+# Navigateur : options communes à tous les contextes
+CONTEXT_OPTIONS = {
+    "viewport": {"width": 1920, "height": 1080},
+    "user_agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
+}
+
+# URLs de médias bloqués gardées par page pour l'extraction DOM (les plus récentes)
+MAX_BLOCKED_MEDIA_URLS = 5000
+
+# Requêtes réseau considérées comme du chargement de flux
+FEED_RESOURCE_TYPES = ("xhr", "fetch")
+FEED_URL_MARKERS = ("/api/graphql", "/ads/library/async")
+
+
+MUTATION_COUNTER_JS = """
+    () => {
+        if (!window.__fbFeedObserver) {
+            window.__fbFeedMutations = 0;
+            window.__fbFeedObserver = new MutationObserver((mutations) => {
+                for (const mutation of mutations) {
+                    for (const node of mutation.addedNodes) {
+                        if (node.nodeType === Node.ELEMENT_NODE) {
+                            window.__fbFeedMutations++;
+                        }
+                    }
+                }
+            });
+            window.__fbFeedObserver.observe(document.documentElement, {childList: true, subtree: true});
+        }
+        return window.__fbFeedMutations;
+    }
+"""
+
+
+def is_feed_request(request) -> bool:
+    """Indique si une requête correspond au chargement du flux de pubs"""
+    if request.resource_type not in FEED_RESOURCE_TYPES:
+        return False
+    return any(marker in request.url for marker in FEED_URL_MARKERS)
+
+
+class FeedWaiter:
+    """Attente adaptative : mutations DOM + requêtes du flux, avec plafond"""
+
+    def __init__(
+        self,
+        page,
+        timeout: float = 10.0,
+        quiet: float = 0.6,
+        poll: float = 0.1,
+        request_filter: Optional[Callable] = None
+    ):
+        """
+        Args:
+            page: Page Playwright (API synchrone)
+            timeout: Attente maximale par appel (secondes)
+            quiet: Durée sans mutation ni requête en cours pour considérer le flux stable
+            poll: Intervalle de vérification (secondes)
+            request_filter: Prédicat sur les requêtes à suivre (défaut: is_feed_request)
+        """
+        self.page = page
+        self.timeout = timeout
+        self.quiet = quiet
+        self.poll = poll
+        self.request_filter = request_filter or is_feed_request
+        self._inflight = set()
+
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_request_done)
+        page.on("requestfailed", self._on_request_done)
+
+    def _on_request(self, request):
+        if self.request_filter(request):
+            self._inflight.add(request)
+
+    def _on_request_done(self, request):
+        self._inflight.discard(request)
+
+    def _mutation_count(self) -> int:
+        # Réinstallé automatiquement après une navigation
+        return self.page.evaluate(MUTATION_COUNTER_JS)
+
+    def wait(self, timeout: Optional[float] = None, quiet: Optional[float] = None) -> bool:
+        """
+        Attend que le flux se stabilise
+
+        Returns:
+            True si de nouveaux noeuds ont été attachés pendant l'attente
+        """
+        timeout = self.timeout if timeout is None else timeout
+        quiet = self.quiet if quiet is None else quiet
+
+        start = time.monotonic()
+        baseline = last_count = self._mutation_count()
+        last_change = start
+
+        while True:
+            # wait_for_timeout laisse Playwright traiter les événements réseau
+            self.page.wait_for_timeout(self.poll * 1000)
+            count = self._mutation_count()
+            now = time.monotonic()
+
+            if count != last_count:
+                last_count = count
+                last_change = now
+
+            if not self._inflight and now - last_change >= quiet:
+                break
+            if now - start >= timeout:
+                break
+
+        return last_count != baseline
+
+
+class AsyncFeedWaiter(FeedWaiter):
+    """FeedWaiter pour l'API asynchrone de Playwright (mode batch)"""
+
+    async def _mutation_count_async(self) -> int:
+        return await self.page.evaluate(MUTATION_COUNTER_JS)
+
+    async def wait(self, timeout: Optional[float] = None, quiet: Optional[float] = None) -> bool:
+        timeout = self.timeout if timeout is None else timeout
+        quiet = self.quiet if quiet is None else quiet
+
+        start = time.monotonic()
+        baseline = last_count = await self._mutation_count_async()
+        last_change = start
+
+        while True:
+            await self.page.wait_for_timeout(self.poll * 1000)
+            count = await self._mutation_count_async()
+            now = time.monotonic()
+
+            if count != last_count:
+                last_count = count
+                last_change = now
+
+            if not self._inflight and now - last_change >= quiet:
+                break
+            if now - start >= timeout:
+                break
+
+        return last_count != baseline
+
+
+# Profils de blocage des requêtes : on ne garde que les URLs et le texte,
+# inutile de télécharger les médias, polices et traceurs
+TRACKING_URL_MARKERS = (
+    "facebook.com/tr",
+    "/ajax/bz",
+    "/ajax/bnzai",
+    "/logging/",
+    "connect.facebook.net",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+)
+
+BLOCKING_PROFILES = {
+    "none": {
+        "resource_types": (),
+        "url_markers": (),
+    },
+    "media": {
+        "resource_types": ("image", "media", "font"),
+        "url_markers": TRACKING_URL_MARKERS,
+    },
+    # Bloque aussi les feuilles de style : plus rapide, mais la mise en page
+    # (et donc le chargement au scroll) peut en souffrir
+    "strict": {
+        "resource_types": ("image", "media", "font", "stylesheet"),
+        "url_markers": TRACKING_URL_MARKERS,
+    },
+}
+
+
+class RequestBlocker:
+    """
+    Interrompt les requêtes inutiles via page.route
+
+    Les URLs des médias bloqués restent dans le DOM (img.src, video.src).
+    Elles sont aussi relevées (MAX_BLOCKED_MEDIA_URLS au plus) et transmises
+    à l'extraction (drain_media_urls) : une image bloquée, donc sans
+    dimensions, est reconnue par son URL et gardée quelle que soit sa taille.
+    """
+
+    def __init__(self, profile: str = "media"):
+        if profile not in BLOCKING_PROFILES:
+            raise ValueError(
+                f"Profil de blocage inconnu: {profile} "
+                f"(choix: {', '.join(BLOCKING_PROFILES)})"
+            )
+        self.profile = profile
+        self.resource_types = BLOCKING_PROFILES[profile]["resource_types"]
+        self.url_markers = BLOCKING_PROFILES[profile]["url_markers"]
+        self.blocked_count = 0
+        self.blocked_media = 0
+        # Médias bloqués depuis la dernière extraction (file bornée)
+        self._pending_media_urls = deque(maxlen=MAX_BLOCKED_MEDIA_URLS)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.resource_types or self.url_markers)
+
+    def install(self, target):
+        """Installe le routage sur une page ou un contexte Playwright"""
+        if self.enabled:
+            target.route("**/*", self._handle)
+        return self
+
+    async def install_async(self, target):
+        """Installe le routage (API asynchrone de Playwright)"""
+        if self.enabled:
+            await target.route("**/*", self._handle_async)
+        return self
+
+    def should_block(self, request) -> bool:
+        if request.resource_type in self.resource_types:
+            return True
+        return any(marker in request.url for marker in self.url_markers)
+
+    def _record(self, request):
+        self.blocked_count += 1
+        if request.resource_type in ("image", "media"):
+            self.blocked_media += 1
+            self._pending_media_urls.append(request.url)
+
+    def drain_media_urls(self) -> List[str]:
+        """URLs des médias bloqués depuis l'appel précédent (paramètre blockedMedia de l'extraction)"""
+        urls = list(self._pending_media_urls)
+        self._pending_media_urls.clear()
+        return urls
+
+    def _handle(self, route):
+        if not self.should_block(route.request):
+            route.continue_()
+            return
+        self._record(route.request)
+        route.abort()
+
+    async def _handle_async(self, route):
+        if not self.should_block(route.request):
+            await route.continue_()
+            return
+        self._record(route.request)
+        await route.abort()
+
+    def stats(self) -> Dict:
+        return {
+            "profile": self.profile,
+            "requests_blocked": self.blocked_count,
+            "media_requests_blocked": self.blocked_media,
+        }
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Ordonnancement des requêtes Graph API en fonction des quotas.
+
+Un token bucket limite le débit ; son taux s'ajuste (AIMD) à partir des
+en-têtes d'utilisation renvoyés par Graph (X-App-Usage,
+X-Business-Use-Case-Usage, X-Ad-Account-Usage) pour rester juste sous le
+quota. Les erreurs transitoires (429, 5xx, codes de limitation Graph) sont
+réessayées avec un backoff exponentiel à jitter.
+"""
+
+import asyncio
+import json
+import random
+import time
+from typing import Dict, Optional, Tuple
+
+
+# Codes d'erreur Graph signalant une limitation de débit
+RATE_LIMIT_ERROR_CODES = {4, 17, 32, 613, 80000, 80001, 80002, 80003, 80004, 80005, 80006, 80008, 80009, 80014}
+
+# Codes d'erreur Graph transitoires ("is_transient")
+TRANSIENT_ERROR_CODES = {1, 2}
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_usage_headers(headers) -> Tuple[Optional[float], float]:
+    """
+    Lit les en-têtes d'utilisation Graph
+
+    Returns:
+        (utilisation maximale en %, ou None si absente ; secondes avant
+         de retrouver l'accès, 0 si non bloqué)
+    """
+    usage = None
+    regain_seconds = 0.0
+
+    def track(value):
+        nonlocal usage
+        if isinstance(value, (int, float)):
+            usage = value if usage is None else max(usage, value)
+
+    raw = headers.get("X-App-Usage") or headers.get("x-app-usage")
+    if raw:
+        try:
+            for key in ("call_count", "total_time", "total_cputime"):
+                track(json.loads(raw).get(key))
+        except (ValueError, AttributeError):
+            pass
+
+    raw = headers.get("X-Business-Use-Case-Usage") or headers.get("x-business-use-case-usage")
+    if raw:
+        try:
+            for entries in json.loads(raw).values():
+                for entry in entries:
+                    for key in ("call_count", "total_time", "total_cputime"):
+                        track(entry.get(key))
+                    minutes = entry.get("estimated_time_to_regain_access") or 0
+                    regain_seconds = max(regain_seconds, float(minutes) * 60)
+        except (ValueError, AttributeError, TypeError):
+            pass
+
+    raw = headers.get("X-Ad-Account-Usage") or headers.get("x-ad-account-usage")
+    if raw:
+        try:
+            data = json.loads(raw)
+            track(data.get("acc_id_util_pct"))
+            if data.get("acc_id_util_pct", 0) >= 100:
+                regain_seconds = max(regain_seconds, float(data.get("reset_time_duration") or 0))
+        except (ValueError, AttributeError, TypeError):
+            pass
+
+    return usage, regain_seconds
+
+
+def graph_error_code(body) -> Optional[int]:
+    """Code d'erreur Graph d'une réponse JSON ({"error": {"code": ...}})"""
+    if isinstance(body, dict) and isinstance(body.get("error"), dict):
+        code = body["error"].get("code")
+        return code if isinstance(code, int) else None
+    return None
+
+
+def is_rate_limited(status: int, body=None) -> bool:
+    return status == 429 or graph_error_code(body) in RATE_LIMIT_ERROR_CODES
+
+
+def is_retryable(status: int, body=None) -> bool:
+    """Indique si une réponse en erreur mérite un nouvel essai"""
+    if status in RETRYABLE_STATUSES or is_rate_limited(status, body):
+        return True
+    if isinstance(body, dict) and isinstance(body.get("error"), dict):
+        error = body["error"]
+        return bool(error.get("is_transient")) or error.get("code") in TRANSIENT_ERROR_CODES
+    return False
+
+
+class TokenBucket:
+    """Token bucket asynchrone : `rate` jetons/seconde, `capacity` en rafale"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RateLimitScheduler:
+    """Débit adaptatif piloté par les en-têtes d'utilisation, avec backoff"""
+
+    def __init__(
+        self,
+        rate: float = 5.0,
+        min_rate: float = 0.2,
+        max_rate: float = 20.0,
+        burst: float = 5.0,
+        target_usage: float = 80.0,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 60.0
+    ):
+        """
+        Args:
+            rate: Débit initial (requêtes/seconde)
+            min_rate: Débit plancher
+            max_rate: Débit plafond
+            burst: Nombre de requêtes autorisées en rafale
+            target_usage: Utilisation du quota (%) au-delà de laquelle on ralentit
+            max_retries: Nombre maximum de nouveaux essais par requête
+            backoff_base: Délai de base du backoff exponentiel (secondes)
+            backoff_cap: Délai maximum du backoff (secondes)
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.target_usage = target_usage
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.last_usage = None
+        self.paused_until = 0.0
+        self.retries = 0
+        self.throttled = 0
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def _set_rate(self, rate: float):
+        self.bucket.rate = min(self.max_rate, max(self.min_rate, rate))
+
+    async def acquire(self):
+        """Attend un créneau d'envoi (pause de quota puis token bucket)"""
+        delay = self.paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.bucket.acquire()
+
+    def observe(self, headers):
+        """Ajuste le débit d'après les en-têtes d'utilisation d'une réponse"""
+        usage, regain_seconds = parse_usage_headers(headers)
+        if regain_seconds > 0:
+            self.pause(regain_seconds)
+
+        if usage is None:
+            return
+        self.last_usage = usage
+
+        if usage >= self.target_usage:
+            # Diminution multiplicative, d'autant plus forte qu'on approche 100%
+            headroom = max(0.0, 100.0 - usage) / max(1.0, 100.0 - self.target_usage)
+            self._set_rate(self.rate * max(0.25, 0.5 * headroom))
+        else:
+            # Augmentation additive tant qu'il reste de la marge
+            self._set_rate(self.rate + 0.5)
+
+    def pause(self, seconds: float):
+        """Suspend tous les envois pendant `seconds`"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def penalize(self):
+        """Réaction à une réponse de limitation (429 / code Graph)"""
+        self.throttled += 1
+        self._set_rate(self.rate * 0.5)
+
+    def retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Backoff exponentiel à jitter complet (Retry-After prioritaire)"""
+        self.retries += 1
+        if retry_after:
+            try:
+                return min(self.backoff_cap, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def stats(self) -> Dict:
+        return {
+            "rate": round(self.rate, 3),
+            "last_usage": self.last_usage,
+            "retries": self.retries,
+            "throttled": self.throttled,
+        }
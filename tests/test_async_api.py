@@ -0,0 +1,127 @@
+import asyncio
+import json
+import urllib.parse
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from async_api import AsyncFacebookAdsLibraryAPI, merge_results
+from conftest import LocalServer
+from rate_limit import RateLimitScheduler
+
+
+TOKEN = "secret-token"
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def fast_scheduler():
+    return RateLimitScheduler(rate=1000, burst=1000, max_retries=2, backoff_base=0.01)
+
+
+class FakeGraph:
+    """
+    Faux endpoint ads_archive : pages de 2 pubs chaînées par paging.next
+
+    failures: {numéro de page: [réponses à renvoyer avant la bonne]}
+    """
+
+    def __init__(self, pages=3, failures=None):
+        self.pages = pages
+        self.failures = {page: list(responses) for page, responses in (failures or {}).items()}
+        self.url = None
+
+    def page_body(self, page, query):
+        body = {"data": [
+            {"id": f"{query['search_page_ids'][0]}-{page}-{i}", "ad_delivery_start_time": "2025-01-0%d" % (page + 1)}
+            for i in range(2)
+        ]}
+        if page + 1 < self.pages:
+            # Comme l'API Graph : URL complète, token compris
+            next_query = {"after": str(page + 1), "access_token": TOKEN, "search_page_ids": query["search_page_ids"][0]}
+            body["paging"] = {"next": f"{self.url}/ads_archive?{urllib.parse.urlencode(next_query)}"}
+        return json.dumps(body)
+
+    def __call__(self, path):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(path).query)
+        assert query["access_token"] == [TOKEN]
+        page = int(query.get("after", ["0"])[0])
+        if self.failures.get(page):
+            return self.failures[page].pop(0)
+        return 200, JSON_HEADERS, self.page_body(page, query)
+
+
+def run_search(graph, **kwargs):
+    async def run():
+        with LocalServer(graph) as server:
+            graph.url = server.url
+            async with AsyncFacebookAdsLibraryAPI(
+                TOKEN, base_url=f"{server.url}/ads_archive", verbose=False, scheduler=fast_scheduler()
+            ) as api:
+                result = await api.search_ads("123", "", "2025-01-01", "2025-12-31", **kwargs)
+                return result, server.requests, api.scheduler
+
+    return asyncio.run(run())
+
+
+def test_follows_pagination_in_order():
+    result, requests, _ = run_search(FakeGraph(pages=3))
+    assert result["success"] is True
+    assert [ad["id"] for ad in result["ads"]] == ["123-0-0", "123-0-1", "123-1-0", "123-1-1", "123-2-0", "123-2-1"]
+    assert len(requests) == 3
+    query = urllib.parse.parse_qs(urllib.parse.urlparse(requests[0]).query)
+    assert query["ad_delivery_date_min"] == ["2025-01-01"]
+    assert query["ad_reached_countries"] == ["FR"]
+
+
+def test_retries_only_the_failing_page():
+    graph = FakeGraph(pages=3, failures={
+        1: [(503, JSON_HEADERS, '{"error": {"message": "busy"}}')],
+        # Corps tronqué avec un statut 200
+        2: [(200, JSON_HEADERS, '{"data": [{"id": ')],
+    })
+    result, requests, scheduler = run_search(graph)
+    assert result["success"] is True
+    assert result["total_ads"] == 6
+    assert len(requests) == 5
+    assert scheduler.retries == 2
+
+
+def test_rate_limit_error_is_retried():
+    graph = FakeGraph(pages=2, failures={
+        1: [(400, JSON_HEADERS, '{"error": {"code": 613, "message": "Calls to this api have exceeded the rate limit."}}')],
+    })
+    result, _, scheduler = run_search(graph)
+    assert result["success"] is True
+    assert result["total_ads"] == 4
+    assert scheduler.throttled >= 1
+
+
+def test_failed_page_keeps_previous_pages():
+    graph = FakeGraph(pages=3, failures={1: [(400, JSON_HEADERS, '{"error": {"code": 100, "message": "bad"}}')]})
+    result, _, _ = run_search(graph)
+    assert result["success"] is False
+    assert [ad["id"] for ad in result["ads"]] == ["123-0-0", "123-0-1"]
+    assert "after=1" in result["failed_page_url"]
+    assert TOKEN not in result["failed_page_url"]
+
+
+def test_invalid_json_after_retries_is_a_query_error():
+    invalid = (200, JSON_HEADERS, "<html>Erreur</html>")
+    graph = FakeGraph(pages=3, failures={1: [invalid] * 3})
+    result, requests, _ = run_search(graph)
+    assert result["success"] is False
+    assert "JSON" in result["error"]
+    assert result["total_ads"] == 2
+    assert len(requests) == 4
+
+
+def test_merge_keeps_ads_of_failed_queries():
+    merged = merge_results([
+        {"success": True, "ads": [{"id": "1"}]},
+        {"success": False, "error": "HTTP 400", "ads": [{"id": "2"}]},
+    ])
+    assert [ad["id"] for ad in merged["ads"]] == ["1", "2"]
+    assert merged["success"] is False
+    assert merged["queries_failed"] == 1
+    assert merged["error"] == "HTTP 400"
@@ -0,0 +1,53 @@
+import os
+
+from checkpoint import Checkpoint
+
+
+QUERY = {"page_id": "123", "start_date": "2025-01-01", "end_date": "2025-01-31", "country": "FR"}
+
+
+def ad(i):
+    return {"library_id": str(i), "headlines": [f"Titre {i}"]}
+
+
+def test_ads_are_appended_not_rewritten(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "ads.json.checkpoint.json"))
+    checkpoint.save("api", QUERY, {"pages": 1}, new_ads=[ad(0), ad(1)])
+    state_size = os.path.getsize(checkpoint.filename)
+    checkpoint.save("api", QUERY, {"pages": 2}, new_ads=[ad(2)])
+
+    assert checkpoint.ads_filename == str(tmp_path / "ads.json.checkpoint.ads.jsonl")
+    with open(checkpoint.ads_filename, encoding="utf-8") as f:
+        assert len(f.readlines()) == 3
+    # L'état ne contient pas les pubs : sa taille ne grandit pas avec le run
+    assert os.path.getsize(checkpoint.filename) == state_size
+
+    state = Checkpoint(checkpoint.filename).load("api", QUERY)
+    assert state["pages"] == 2
+    assert state["ads"] == [ad(0), ad(1), ad(2)]
+
+
+def test_ads_written_after_the_last_state_are_dropped(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "run.checkpoint.json"))
+    checkpoint.save("scraper", QUERY, {"scrolls": 5}, new_ads=[ad(0)])
+    # Run interrompu entre l'ajout des pubs et l'écriture de l'état
+    with open(checkpoint.ads_filename, "a", encoding="utf-8") as f:
+        f.write('{"library_id": "1"}\n{"library_id": "2", "head')
+
+    resumed = Checkpoint(checkpoint.filename)
+    assert resumed.load("scraper", QUERY)["ads"] == [ad(0)]
+    resumed.save("scraper", QUERY, {"scrolls": 10}, new_ads=[ad(3)])
+    assert Checkpoint(checkpoint.filename).load("scraper", QUERY)["ads"] == [ad(0), ad(3)]
+
+    resumed.clear()
+    assert not os.listdir(tmp_path)
+
+
+def test_new_run_overwrites_the_ads_of_a_previous_one(tmp_path):
+    filename = str(tmp_path / "run.checkpoint.json")
+    Checkpoint(filename).save("scraper", QUERY, {"scrolls": 5}, new_ads=[ad(0), ad(1)])
+
+    # Sans --resume : aucun chargement, le premier point de reprise repart de zéro
+    Checkpoint(filename).save("scraper", QUERY, {"scrolls": 5}, new_ads=[ad(7)])
+
+    assert Checkpoint(filename).load("scraper", QUERY)["ads"] == [ad(7)]
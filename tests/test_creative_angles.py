@@ -0,0 +1,48 @@
+from creative_angles import (
+    STATE_WORDS_LIMIT,
+    CreativeAnglesAccumulator,
+    compact_angles_state,
+)
+
+
+def make_ads(start, count):
+    """Pubs au vocabulaire plat : chaque mot n'apparaît que dans quelques pubs"""
+    return [
+        {
+            "headlines": [f"Titre{i % 7}"],
+            "body_texts": [f"motclef{i} motclef{i + 1} commun{i % 3}"],
+            "platforms": ["Facebook"],
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def result_for(ads):
+    angles = CreativeAnglesAccumulator().add_many(ads)
+    return {"creative_angles": angles.result(), "creative_angles_state": angles.to_dict()}
+
+
+def test_in_process_merge_is_exact_beyond_the_written_word_limit():
+    first, second = make_ads(0, 400), make_ads(400, 400)
+
+    merged = CreativeAnglesAccumulator()
+    for result in (result_for(first), result_for(second)):
+        merged.merge(CreativeAnglesAccumulator.from_result(result))
+
+    expected = CreativeAnglesAccumulator().add_many(first + second)
+    assert merged.to_dict() == expected.to_dict()
+    assert merged.result() == expected.result()
+
+
+def test_written_result_keeps_a_compact_state():
+    result = result_for(make_ads(0, 800))
+
+    written = compact_angles_state(result)
+
+    state = written["creative_angles_state"]
+    assert "headlines" not in state
+    assert len(state["word_counts"]) == STATE_WORDS_LIMIT
+    assert state["ads_count"] == 800
+    # Le résultat en mémoire garde l'état complet
+    assert "headlines" in result["creative_angles_state"]
+    assert compact_angles_state(written) is written
@@ -0,0 +1,56 @@
+import random
+
+from creative_clusters import BANDS, CreativeClusterer
+
+
+BASE = (
+    "Découvrez notre nouvelle collection printemps été avec des pièces uniques "
+    "fabriquées en France livraison offerte dès cinquante euros retours gratuits "
+    "pendant trente jours et paiement en trois fois sans frais"
+).split()
+OTHER = "Inscrivez-vous à notre atelier cuisine gratuit ce samedi places limitées"
+
+
+def variants(count, seed=0):
+    """Déclinaisons d'une même créa : un mot remplacé par variante"""
+    rng = random.Random(seed)
+    for i in range(count):
+        words = list(BASE)
+        words[rng.randrange(len(words))] = f"mot{i}"
+        yield {"library_id": str(i), "headlines": [" ".join(words)]}
+
+
+def count_lookups(monkeypatch, ads):
+    """Nombre de textes examinés (recherches union-find) pour regrouper les pubs"""
+    calls = []
+    original = CreativeClusterer._find
+
+    def counting(self, text_id):
+        calls.append(text_id)
+        return original(self, text_id)
+
+    monkeypatch.setattr(CreativeClusterer, "_find", counting)
+    clusterer = CreativeClusterer().add_many(ads)
+    monkeypatch.setattr(CreativeClusterer, "_find", original)
+    return clusterer, len(calls)
+
+
+def test_near_duplicates_form_one_family_apart_from_other_creatives():
+    ads = list(variants(200))
+    ads.append({"library_id": "other", "headlines": [OTHER]})
+    ads.append({"library_id": "other-2", "headlines": [OTHER + " !"]})
+
+    families = CreativeClusterer().add_many(ads).families()
+
+    assert [family["ads_count"] for family in families] == [200, 2]
+    assert families[1]["ad_ids"] == ["other", "other-2"]
+
+
+def test_work_grows_linearly_with_variants(monkeypatch):
+    clusterer, small = count_lookups(monkeypatch, variants(1000))
+    _, large = count_lookups(monkeypatch, variants(4000))
+
+    assert len(clusterer.families()) == 1
+    # Un représentant par famille dans chaque seau : pas de parcours de toutes les variantes
+    assert large <= 5 * small
+    assert large <= 4000 * BANDS * 4
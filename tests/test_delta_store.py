@@ -0,0 +1,36 @@
+from delta_store import DeltaTracker, ad_fingerprint, stable_link
+
+
+REDIRECT = "https://l.facebook.com/l.php?u=https%3A%2F%2Fshop.example%2Fpromo%3Fref%3Dad%26fbclid%3D{token}&h={token}"
+
+
+def dom_ad(token, status="Actif", collation_count=3):
+    return {
+        "library_id": "123",
+        "headlines": ["Soldes d'hiver"],
+        "body_texts": ["Jusqu'à -50% sur toute la boutique"],
+        "external_links": [REDIRECT.format(token=token)],
+        "collation_count": collation_count,
+        "full_text": f"{status}\nID dans la bibliothèque : 123\nSession {token}",
+    }
+
+
+def test_redirect_links_keep_only_their_target():
+    assert stable_link(REDIRECT.format(token="AT0xyz")) == "https://shop.example/promo?ref=ad"
+    assert stable_link("https://shop.example/promo") == "https://shop.example/promo"
+
+
+def test_fingerprint_ignores_session_tokens_and_counters():
+    assert ad_fingerprint(dom_ad("AT0abc")) == ad_fingerprint(dom_ad("AT0def", collation_count=5))
+
+    changed = dom_ad("AT0abc")
+    changed["headlines"] = ["Soldes de printemps"]
+    assert ad_fingerprint(changed) != ad_fingerprint(dom_ad("AT0abc"))
+
+
+def test_rescrape_is_unchanged_until_the_ad_stops():
+    first = DeltaTracker({})
+    assert first.observe(dom_ad("AT0abc")) == DeltaTracker.NEW
+
+    assert DeltaTracker(first.seen).observe(dom_ad("AT0def")) == DeltaTracker.UNCHANGED
+    assert DeltaTracker(first.seen).observe(dom_ad("AT0def", status="Inactif")) == DeltaTracker.CHANGED
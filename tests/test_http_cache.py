@@ -0,0 +1,53 @@
+import time
+
+from http_cache import HttpCache
+
+
+URL = "https://graph.facebook.com/v18.0/ads_archive"
+
+
+def stored_bytes(cache):
+    return cache.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+
+def body(page, words=200):
+    return {"data": [{"id": f"{page}-{i}", "text": f"réponse {page} mot{i}"} for i in range(words)]}
+
+
+def test_running_total_follows_every_write(tmp_path):
+    filename = str(tmp_path / "cache.db")
+    with HttpCache(filename) as cache:
+        for page in range(5):
+            cache.put(URL, {"after": str(page), "access_token": "secret"}, body(page))
+        assert cache.total_bytes == stored_bytes(cache)
+
+        # Même requête (token différent) : l'entrée est remplacée, pas ajoutée
+        cache.put(URL, {"after": "0", "access_token": "other"}, body(0, words=10))
+        assert cache.total_bytes == stored_bytes(cache)
+        assert cache.get(URL, {"after": "0"}) == body(0, words=10)
+
+    with HttpCache(filename, ttl=-1) as cache:
+        # Total relu à l'ouverture ; une entrée expirée lue est supprimée
+        assert cache.total_bytes == stored_bytes(cache) > 0
+        assert cache.get(URL, {"after": "1"}) is None
+        assert cache.total_bytes == stored_bytes(cache)
+
+        cache.clear()
+        assert cache.total_bytes == 0
+
+
+def test_least_recently_read_entries_are_evicted(tmp_path):
+    with HttpCache(str(tmp_path / "cache.db")) as cache:
+        cache.put(URL, {"after": "0"}, body(0))
+        entry_size = cache.total_bytes
+        cache.max_bytes = int(entry_size * 2.5)
+
+        cache.put(URL, {"after": "1"}, body(1))
+        time.sleep(0.01)
+        cache.get(URL, {"after": "0"})
+        cache.put(URL, {"after": "2"}, body(2))
+
+        assert cache.evictions == 1
+        assert cache.get(URL, {"after": "1"}) is None
+        assert cache.get(URL, {"after": "0"}) is not None
+        assert cache.total_bytes == stored_bytes(cache) <= cache.max_bytes
@@ -0,0 +1,135 @@
+import asyncio
+import builtins
+import io
+import os
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import media_downloader
+from conftest import LocalServer
+from media_downloader import MediaDownloader, download_media, media_urls
+
+
+IMAGE = b"\xff\xd8\xff\xe0" + b"jpeg" * 100
+OTHER = b"\x89PNG\r\n\x1a\n" + b"png" * 100
+VIDEO = b"\x00\x00\x00\x18ftypmp42" + b"mp4" * 100
+
+
+class FakeCdn:
+    """Médias servis localement ; /flaky.jpg répond 503 une première fois"""
+
+    FILES = {
+        "/a.jpg": ("image/jpeg", IMAGE),
+        # Même contenu sous une autre URL (URL signée différente d'un run à l'autre)
+        "/a-signed.jpg?oh=123": ("image/jpeg", IMAGE),
+        "/b": ("image/png", OTHER),
+        "/v.mp4": ("video/mp4", VIDEO),
+        "/flaky.jpg": ("image/jpeg", OTHER + b"flaky"),
+    }
+
+    def __init__(self):
+        self.flaky_failures = 1
+
+    def __call__(self, path):
+        if path == "/flaky.jpg" and self.flaky_failures:
+            self.flaky_failures -= 1
+            return 503, {}, b"busy"
+        if path not in self.FILES:
+            return 404, {}, b"not found"
+        content_type, body = self.FILES[path]
+        return 200, {"Content-Type": content_type}, body
+
+
+def make_ads(base):
+    return [
+        {"id": "1", "images": [{"src": f"{base}/a.jpg"}, {"src": f"{base}/b"}],
+         "videos": [{"src": f"{base}/v.mp4", "poster": f"{base}/a.jpg"}]},
+        {"id": "2", "images": [{"src": f"{base}/a.jpg"}, {"src": f"{base}/a-signed.jpg?oh=123"}]},
+        {"id": "3", "images": [{"src": f"{base}/missing.jpg"}, {"src": "data:image/gif;base64,R0lGOD"}]},
+    ]
+
+
+def run_download(tmp_path, ads):
+    return download_media(ads, str(tmp_path / "media"), concurrency=4, verbose=False)
+
+
+def test_media_urls_are_unique_and_http_only():
+    ads = make_ads("http://cdn")
+    assert media_urls(ads[0]) == ["http://cdn/a.jpg", "http://cdn/b", "http://cdn/v.mp4"]
+    assert media_urls(ads[2]) == ["http://cdn/missing.jpg"]
+
+
+def test_downloads_each_url_once_and_dedups_content(tmp_path):
+    with LocalServer(FakeCdn()) as server:
+        ads = make_ads(server.url)
+        stats = run_download(tmp_path, ads)
+
+        # a.jpg est référencée trois fois mais demandée une seule fois
+        assert sorted(server.requests) == sorted(["/a.jpg", "/a-signed.jpg?oh=123", "/b", "/v.mp4", "/missing.jpg"])
+
+    assert stats["downloaded"] == 3
+    assert stats["deduplicated"] == 1
+    assert stats["failed"] == 1
+
+    first, second = ads[0], ads[1]
+    image_path = first["images"][0]["local_path"]
+    # Stockage adressé par contenu : media/ab/abcd....jpg
+    assert os.path.basename(os.path.dirname(image_path)) == os.path.basename(image_path)[:2]
+    assert image_path.endswith(".jpg")
+    assert first["images"][1]["local_path"].endswith(".png")
+    assert first["videos"][0]["local_path"].endswith(".mp4")
+    assert first["videos"][0]["poster_local_path"] == image_path
+    # Autre URL, même contenu : même fichier
+    assert second["images"][1]["local_path"] == image_path
+    assert "local_path" not in ads[2]["images"][0]
+
+    with open(image_path, "rb") as f:
+        assert f.read() == IMAGE
+    assert not [name for name in os.listdir(tmp_path / "media") if name.endswith(".part")]
+
+
+def test_index_is_reused_between_runs(tmp_path):
+    with LocalServer(FakeCdn()) as server:
+        run_download(tmp_path, make_ads(server.url))
+        requests_after_first_run = len(server.requests)
+
+        ads = make_ads(server.url)
+        stats = run_download(tmp_path, ads)
+
+        # Seule l'URL en échec est redemandée
+        assert server.requests[requests_after_first_run:] == ["/missing.jpg"]
+    assert stats["downloaded"] == 0
+    assert stats["cached"] == 4
+    assert os.path.exists(ads[1]["images"][1]["local_path"])
+
+
+def test_transient_error_is_retried(tmp_path):
+    async def run(base):
+        async with MediaDownloader(str(tmp_path / "media"), verbose=False, max_retries=2) as downloader:
+            return await downloader.fetch(f"{base}/flaky.jpg"), downloader.stats
+
+    with LocalServer(FakeCdn()) as server:
+        entry, stats = asyncio.run(run(server.url))
+        assert server.requests == ["/flaky.jpg", "/flaky.jpg"]
+    assert entry["size"] == len(OTHER + b"flaky")
+    assert stats["downloaded"] == 1
+
+
+def test_write_error_leaves_no_partial_file(tmp_path, monkeypatch):
+    class FullDisk(io.FileIO):
+        def write(self, data):
+            raise OSError(28, "No space left on device")
+
+    def fake_open(name, mode="r", *args, **kwargs):
+        if str(name).endswith(".part"):
+            return FullDisk(name, mode)
+        return builtins.open(name, mode, *args, **kwargs)
+
+    monkeypatch.setattr(media_downloader, "open", fake_open, raising=False)
+    with LocalServer(FakeCdn()) as server:
+        stats = run_download(tmp_path, [{"id": "1", "images": [{"src": f"{server.url}/a.jpg"}]}])
+
+    assert stats["failed"] == 1
+    assert not [name for name in os.listdir(tmp_path / "media") if name.endswith(".part")]
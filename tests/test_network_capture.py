@@ -0,0 +1,119 @@
+import os
+
+from conftest import FIXTURES
+from network_capture import (
+    ResponseCapture,
+    extract_ads_from_documents,
+    parse_html_payload,
+    parse_payload,
+)
+
+
+def load_fixture_ads():
+    with open(os.path.join(FIXTURES, "ads_library_search.graphql.txt"), encoding="utf-8") as f:
+        return extract_ads_from_documents(parse_payload(f.read()))
+
+
+def test_parse_payload_prefix_and_streamed_documents():
+    with open(os.path.join(FIXTURES, "ads_library_search.graphql.txt"), encoding="utf-8") as f:
+        documents = parse_payload(f.read())
+    assert len(documents) == 2
+    assert documents[1]["extensions"]["is_final"] is True
+
+
+def test_extracts_every_ad_in_feed_order(local_timezone):
+    ads = load_fixture_ads()
+    assert [ad["id"] for ad in ads] == [
+        "1122334455667788", "1122334455667799", "2233445566778899", "3344556677889900"
+    ]
+    assert all(ad["source"] == "network" for ad in ads)
+    assert ads[0]["library_id"] == ads[0]["id"]
+    assert ads[0]["ad_library_url"] == "https://www.facebook.com/ads/library/?id=1122334455667788"
+
+
+def test_image_ad_fields(local_timezone):
+    ad = load_fixture_ads()[0]
+    assert ad["page_id"] == "2179133842361365"
+    assert ad["headlines"] == ["Probiotiques : -20% cette semaine"]
+    assert ad["body_texts"] == ["Votre flore intestinale mérite le meilleur. 🌿"]
+    assert ad["call_to_actions"] == ["Acheter"]
+    assert ad["external_links"] == ["https://lindispensable.fr/probiotiques"]
+    assert ad["platforms"] == ["Facebook", "Instagram"]
+    assert ad["collation_count"] == 2
+    # Même image listée deux fois : gardée une seule fois, en pleine résolution
+    assert ad["images"] == [{"src": "https://scontent.example/img/a.jpg", "alt": ""}]
+
+
+def test_start_date_uses_local_time(local_timezone):
+    # 2024-12-31 23:00 UTC = 1er janvier 2025 à minuit à Paris, comme l'afficherait la page
+    ad = load_fixture_ads()[0]
+    assert ad["date_start"] == "2025-01-01"
+    assert ad["date_started"] == "January 1, 2025"
+
+
+def test_carousel_and_inactive_ad(local_timezone):
+    ad = load_fixture_ads()[2]
+    assert ad["is_active"] is False
+    assert ad["date_end"] == "2024-07-01"
+    assert ad["headlines"] == ["Ventre plat", "Cure 3 mois"]
+    assert ad["body_texts"] == ["Trois gélules par jour.", "Digestion apaisée"]
+    assert ad["call_to_actions"] == ["En savoir plus"]
+    assert [image["src"] for image in ad["images"]] == [
+        "https://scontent.example/img/c1.jpg", "https://scontent.example/img/c2.jpg"
+    ]
+    assert ad["platforms"] == ["Instagram", "Audience Network"]
+
+
+def test_video_ad(local_timezone):
+    ad = load_fixture_ads()[3]
+    assert ad["display_format"] == "VIDEO"
+    assert ad["videos"] == [{
+        "src": "https://video.example/v/hd.mp4",
+        "poster": "https://scontent.example/img/poster.jpg",
+    }]
+
+
+def test_html_document_payload():
+    html = (
+        '<html><script type="application/json" data-sjs>{"require": [{"ad_archive_id": "42", '
+        '"snapshot": {"title": "Hello"}}]}</script><script type="application/json">not json</script></html>'
+    )
+    ads = extract_ads_from_documents(parse_html_payload(html))
+    assert [(ad["id"], ad["headlines"]) for ad in ads] == [("42", ["Hello"])]
+
+
+class FakeRequest:
+    def __init__(self, resource_type):
+        self.resource_type = resource_type
+
+
+class FakeResponse:
+    def __init__(self, url, body, resource_type="xhr"):
+        self.url = url
+        self.request = FakeRequest(resource_type)
+        self._body = body
+
+    def text(self):
+        if self._body is None:
+            raise RuntimeError("body unavailable")
+        return self._body
+
+
+class FakePage:
+    def on(self, event, handler):
+        self.handler = handler
+
+
+def test_response_capture_drains_only_feed_responses():
+    with open(os.path.join(FIXTURES, "ads_library_search.graphql.txt"), encoding="utf-8") as f:
+        payload = f.read()
+
+    page = FakePage()
+    capture = ResponseCapture(page)
+    page.handler(FakeResponse("https://www.facebook.com/api/graphql/", payload))
+    page.handler(FakeResponse("https://www.facebook.com/ajax/bz", payload))
+    page.handler(FakeResponse("https://www.facebook.com/api/graphql/", None))
+
+    assert len(capture.drain()) == 4
+    assert capture.total_ads == 4
+    assert capture.drain() == []
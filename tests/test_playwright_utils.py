@@ -0,0 +1,48 @@
+from playwright_utils import MAX_BLOCKED_MEDIA_URLS, RequestBlocker
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+
+
+class FakeRoute:
+    def __init__(self, url, resource_type):
+        self.request = FakeRequest(url, resource_type)
+        self.outcome = None
+
+    def abort(self):
+        self.outcome = "aborted"
+
+    def continue_(self):
+        self.outcome = "continued"
+
+
+def route(blocker, url, resource_type):
+    fake = FakeRoute(url, resource_type)
+    blocker._handle(fake)
+    return fake.outcome
+
+
+def test_blocked_media_urls_are_handed_to_the_next_extraction():
+    blocker = RequestBlocker("media")
+
+    assert route(blocker, "https://scontent.example/creative.jpg", "image") == "aborted"
+    assert route(blocker, "https://video.example/ad.mp4", "media") == "aborted"
+    assert route(blocker, "https://fonts.example/a.woff2", "font") == "aborted"
+    assert route(blocker, "https://www.facebook.com/api/graphql/", "xhr") == "continued"
+
+    assert blocker.drain_media_urls() == ["https://scontent.example/creative.jpg", "https://video.example/ad.mp4"]
+    assert blocker.drain_media_urls() == []
+    assert blocker.stats() == {"profile": "media", "requests_blocked": 3, "media_requests_blocked": 2}
+
+
+def test_pending_media_urls_are_bounded():
+    blocker = RequestBlocker("media")
+    for i in range(MAX_BLOCKED_MEDIA_URLS + 10):
+        route(blocker, f"https://scontent.example/{i}.jpg", "image")
+
+    urls = blocker.drain_media_urls()
+    assert len(urls) == MAX_BLOCKED_MEDIA_URLS
+    assert urls[-1] == f"https://scontent.example/{MAX_BLOCKED_MEDIA_URLS + 9}.jpg"